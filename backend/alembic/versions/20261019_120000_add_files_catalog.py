@@ -0,0 +1,47 @@
+"""add_files_catalog
+
+Revision ID: 4c7e2a9b1d35
+Revises: {new_revision_id}
+Create Date: 2026-10-19 12:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '4c7e2a9b1d35'
+down_revision = '{new_revision_id}'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create files table, the per-user catalog of uploaded files
+    op.create_table(
+        'files',
+        sa.Column('id', postgresql.UUID(), nullable=False),
+        sa.Column('user_id', postgresql.UUID(), nullable=False),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('lines', sa.Integer(), nullable=False),
+        sa.Column('message_count', sa.Integer(), nullable=True),
+        sa.Column('participants', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('first_message_at', sa.DateTime(), nullable=True),
+        sa.Column('last_message_at', sa.DateTime(), nullable=True),
+        sa.Column('attachment_count', sa.Integer(), nullable=False),
+        sa.Column('uploaded_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'filename', name='uq_files_user_id_filename')
+    )
+
+    # Listing pages are read newest first per user
+    op.create_index('ix_files_user_id_uploaded_at', 'files', ['user_id', 'uploaded_at'])
+
+
+def downgrade():
+    op.drop_index('ix_files_user_id_uploaded_at', table_name='files')
+    op.drop_table('files')
@@ -0,0 +1,28 @@
+"""add_files_ingest_status
+
+Revision ID: 8d1f3b6a2e47
+Revises: 4c7e2a9b1d35
+Create Date: 2026-10-19 13:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d1f3b6a2e47'
+down_revision = '4c7e2a9b1d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Background ingest stage of every cataloged file; files cataloged before are already summarized
+    op.add_column('files', sa.Column('ingest_status', sa.String(), nullable=False, server_default='ready'))
+    op.alter_column('files', 'ingest_status', server_default=None)
+    op.add_column('files', sa.Column('ingest_error', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('files', 'ingest_error')
+    op.drop_column('files', 'ingest_status')
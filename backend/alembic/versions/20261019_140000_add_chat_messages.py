@@ -0,0 +1,52 @@
+"""add_chat_messages
+
+Revision ID: b52e9c7d4f18
+Revises: 8d1f3b6a2e47
+Create Date: 2026-10-19 14:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e9c7d4f18'
+down_revision = '8d1f3b6a2e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create chat_sources table, one row per chat export content loaded into chat_messages
+    op.create_table(
+        'chat_sources',
+        sa.Column('source', sa.String(length=64), nullable=False),
+        sa.Column('senders', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.Column('loaded_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('source')
+    )
+
+    # Create chat_messages table; every key leads with source so it can be partitioned by it
+    op.create_table(
+        'chat_messages',
+        sa.Column('source', sa.String(length=64), nullable=False),
+        sa.Column('entry', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.Column('sender_id', sa.Integer(), nullable=False),
+        sa.Column('length', sa.Integer(), nullable=False),
+        sa.Column('is_message', sa.Boolean(), nullable=False),
+        sa.Column('content', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['source'], ['chat_sources.source'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('source', 'entry')
+    )
+    op.create_index('ix_chat_messages_source_timestamp', 'chat_messages', ['source', 'timestamp'])
+    op.create_index('ix_chat_messages_source_sender_id', 'chat_messages', ['source', 'sender_id'])
+
+
+def downgrade():
+    op.drop_index('ix_chat_messages_source_sender_id', table_name='chat_messages')
+    op.drop_index('ix_chat_messages_source_timestamp', table_name='chat_messages')
+    op.drop_table('chat_messages')
+    op.drop_table('chat_sources')
@@ -0,0 +1,47 @@
+"""add_research_default_analyses
+
+Revision ID: e3a7c1f95b20
+Revises: b52e9c7d4f18
+Create Date: 2026-10-19 15:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a7c1f95b20'
+down_revision = 'b52e9c7d4f18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One stored analysis per research source plus the merged graph, in order
+    op.add_column('network_analyses', sa.Column('source_type', sa.String(), nullable=True))
+    op.add_column('network_analyses', sa.Column('source_id', sa.String(), nullable=True))
+    op.add_column('network_analyses', sa.Column('position', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.add_column('network_analyses', sa.Column('directed', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+    op.add_column('network_analyses', sa.Column('version', sa.String(length=64), nullable=True))
+    op.add_column('network_analyses', sa.Column('error', sa.String(), nullable=True))
+    op.create_index(op.f('ix_network_analyses_research_id'), 'network_analyses', ['research_id'])
+
+    # Nodes and links keep the order of the graph they belong to
+    op.add_column('nodes', sa.Column('position', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.create_index(op.f('ix_nodes_analysis_id'), 'nodes', ['analysis_id'])
+    op.add_column('links', sa.Column('position', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.create_index(op.f('ix_links_analysis_id'), 'links', ['analysis_id'])
+
+
+def downgrade():
+    op.drop_index(op.f('ix_links_analysis_id'), table_name='links')
+    op.drop_column('links', 'position')
+    op.drop_index(op.f('ix_nodes_analysis_id'), table_name='nodes')
+    op.drop_column('nodes', 'position')
+    op.drop_index(op.f('ix_network_analyses_research_id'), table_name='network_analyses')
+    op.drop_column('network_analyses', 'error')
+    op.drop_column('network_analyses', 'version')
+    op.drop_column('network_analyses', 'directed')
+    op.drop_column('network_analyses', 'position')
+    op.drop_column('network_analyses', 'source_id')
+    op.drop_column('network_analyses', 'source_type')
@@ -1,21 +1,40 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, status, Query
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession, async_session
-from typing import Annotated
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Optional
 
 from domain.repositories.user_repository import UserRepository
 from domain.repositories.research_repository import ResearchRepository
 from domain.repositories.file_repository import FileRepository
+from domain.repositories.file_catalog_repository import FileCatalogRepository
+from domain.repositories.chat_message_repository import ChatMessageRepository
+from domain.repositories.network_analysis_repository import NetworkAnalysisRepository
+from domain.repositories.thread_repository import ThreadRepository
 from application.services.auth_service import AuthService
 from application.services.user_service import UserService
 from application.services.research_service import ResearchService
 from application.services.file_service import FileService
+from application.services.ingest_progress import ingest_progress
+from application.services.ingest_service import IngestService
 from application.services.network_service import NetworkService
-from infrastructure.persistence.database import get_db_session
+from application.services.research_analysis_service import ResearchAnalysisService
+from application.services.research_precompute_service import ResearchPrecomputeService
+from application.services.wikipedia_network_service import WikipediaNetworkService
+from application.dtos.activity_dto import ActivityQueryDTO
+from application.dtos.network_dto import NetworkAnalysisRequestDTO
+from application.dtos.text_stats_dto import TextStatsQueryDTO
+from config.settings import settings
+from infrastructure.cache.analysis_cache import AnalysisCache, analysis_cache
+from infrastructure.persistence.database import async_session_factory, get_db_session
 from infrastructure.persistence.file_storage import FileStorage
 from infrastructure.persistence.repositories.user_repository import SQLAlchemyUserRepository
 from infrastructure.persistence.repositories.research_repository import SQLAlchemyResearchRepository
 from infrastructure.persistence.repositories.file_repository import LocalFileRepository
+from infrastructure.persistence.repositories.file_catalog_repository import SQLAlchemyFileCatalogRepository
+from infrastructure.persistence.repositories.chat_message_repository import SQLAlchemyChatMessageRepository
+from infrastructure.persistence.repositories.network_analysis_repository import SQLAlchemyNetworkAnalysisRepository
+from infrastructure.persistence.repositories.thread_repository import SQLAlchemyThreadRepository
 from infrastructure.security.password_service import PasswordService
 from infrastructure.security.jwt_service import JWTService
 
@@ -39,10 +58,80 @@ def get_user_repository(session: DBSession) -> UserRepository:
 def get_research_repository(session: DBSession) -> ResearchRepository:
     return SQLAlchemyResearchRepository(session)
 
+def get_thread_repository(session: DBSession) -> ThreadRepository:
+    return SQLAlchemyThreadRepository(session)
+
+def get_network_analysis_repository(session: DBSession) -> NetworkAnalysisRepository:
+    return SQLAlchemyNetworkAnalysisRepository(session)
+
+def get_file_catalog_repository(session: DBSession) -> FileCatalogRepository:
+    return SQLAlchemyFileCatalogRepository(session)
+
+@asynccontextmanager
+async def file_catalog_scope() -> AsyncIterator[FileCatalogRepository]:
+    """File catalog on a session of its own, committed on exit, for work outside of requests"""
+    async with async_session_factory() as session:
+        async with session.begin():
+            yield SQLAlchemyFileCatalogRepository(session)
+
+def get_chat_message_repository(session: DBSession) -> Optional[ChatMessageRepository]:
+    """Chat entries in the database, ``None`` unless ``CHAT_MESSAGES_IN_DB`` is enabled"""
+    return SQLAlchemyChatMessageRepository(session) if settings.CHAT_MESSAGES_IN_DB else None
+
+@asynccontextmanager
+async def chat_message_scope() -> AsyncIterator[ChatMessageRepository]:
+    """Chat entries on a session of their own, committed on exit, for work outside of requests"""
+    async with async_session_factory() as session:
+        async with session.begin():
+            yield SQLAlchemyChatMessageRepository(session)
+
+@asynccontextmanager
+async def research_analysis_scope() -> AsyncIterator[ResearchAnalysisService]:
+    """Research analysis on a session of its own, committed on exit, for work outside of requests"""
+    async with async_session_factory() as session:
+        async with session.begin():
+            thread_repository = SQLAlchemyThreadRepository(session)
+            messages = SQLAlchemyChatMessageRepository(session) if settings.CHAT_MESSAGES_IN_DB else None
+            yield ResearchAnalysisService(
+                SQLAlchemyResearchRepository(session),
+                thread_repository,
+                NetworkService(LocalFileRepository(), analysis_cache, ingest=ingest_progress, messages=messages),
+                WikipediaNetworkService(thread_repository, analysis_cache),
+                SQLAlchemyNetworkAnalysisRepository(session)
+            )
+
 def get_file_repository() -> FileRepository:
     return LocalFileRepository()
 
+def get_upload_storage() -> FileStorage:
+    return FileStorage(settings.FILE_STORAGE_ROOT)
+
+def get_analysis_cache() -> AnalysisCache:
+    return analysis_cache
+
 # Application services
+_ingest_service: Optional[IngestService] = None
+
+def get_ingest_service() -> IngestService:
+    """The process-wide background ingest queue"""
+    global _ingest_service
+    if _ingest_service is None:
+        # Its own network service never waits on ingest progress, which it makes itself
+        _ingest_service = IngestService(
+            NetworkService(LocalFileRepository(), analysis_cache), file_catalog_scope,
+            chat_message_scope if settings.CHAT_MESSAGES_IN_DB else None
+        )
+    return _ingest_service
+
+_research_precompute_service: Optional[ResearchPrecomputeService] = None
+
+def get_research_precompute_service() -> ResearchPrecomputeService:
+    """The process-wide background precomputation of default research analyses"""
+    global _research_precompute_service
+    if _research_precompute_service is None:
+        _research_precompute_service = ResearchPrecomputeService(research_analysis_scope)
+    return _research_precompute_service
+
 def get_auth_service(
     user_repository: Annotated[UserRepository, Depends(get_user_repository)],
     password_service: Annotated[PasswordService, Depends(get_password_service)],
@@ -61,14 +150,127 @@ def get_research_service(
     return ResearchService(research_repository)
 
 def get_file_service(
-    file_storage: Annotated[FileStorage, Depends(get_file_repository)]
+    file_storage: Annotated[FileStorage, Depends(get_file_repository)],
+    upload_storage: Annotated[FileStorage, Depends(get_upload_storage)],
+    catalog: Annotated[FileCatalogRepository, Depends(get_file_catalog_repository)],
+    ingest: Annotated[IngestService, Depends(get_ingest_service)],
+    messages: Annotated[Optional[ChatMessageRepository], Depends(get_chat_message_repository)]
 ) -> FileService:
-    return FileService(file_storage)
+    return FileService(file_storage, upload_storage, catalog, ingest, messages)
 
 def get_network_service(
-    file_repository: Annotated[FileRepository, Depends(get_file_repository)]
+    file_repository: Annotated[FileRepository, Depends(get_file_repository)],
+    cache: Annotated[AnalysisCache, Depends(get_analysis_cache)],
+    messages: Annotated[Optional[ChatMessageRepository], Depends(get_chat_message_repository)]
 ) -> NetworkService:
-    return NetworkService(file_repository)
+    return NetworkService(file_repository, cache, ingest=ingest_progress, messages=messages)
+
+def get_research_analysis_service(
+    research_repository: Annotated[ResearchRepository, Depends(get_research_repository)],
+    thread_repository: Annotated[ThreadRepository, Depends(get_thread_repository)],
+    network_service: Annotated[NetworkService, Depends(get_network_service)],
+    cache: Annotated[AnalysisCache, Depends(get_analysis_cache)],
+    analysis_repository: Annotated[NetworkAnalysisRepository, Depends(get_network_analysis_repository)]
+) -> ResearchAnalysisService:
+    return ResearchAnalysisService(
+        research_repository, thread_repository, network_service, WikipediaNetworkService(thread_repository, cache),
+        analysis_repository
+    )
+
+# Request parameters
+def get_network_analysis_params(
+    start_date: Optional[str] = Query(None),
+    start_time: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    end_time: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None),
+    limit_type: str = Query("first"),
+    min_length: Optional[int] = Query(None),
+    max_length: Optional[int] = Query(None),
+    keywords: Optional[str] = Query(None),
+    min_messages: Optional[int] = Query(None),
+    max_messages: Optional[int] = Query(None),
+    active_users: Optional[int] = Query(None),
+    selected_users: Optional[str] = Query(None),
+    username: Optional[str] = Query(None),
+    anonymize: bool = Query(False),
+    edge_model: str = Query("previous"),
+    reply_window: Optional[int] = Query(None, ge=1),
+    reply_window_seconds: Optional[int] = Query(None, ge=1),
+    decay_half_life: Optional[float] = Query(None, gt=0),
+    latency: bool = Query(False),
+    layout: bool = Query(False),
+    layout_iterations: Optional[int] = Query(None, ge=1),
+    max_nodes: Optional[int] = Query(None, ge=1),
+    community: Optional[str] = Query(None),
+    metrics: bool = Query(False),
+    parallel_betweenness: bool = Query(False),
+    betweenness_workers: Optional[int] = Query(None, ge=1)
+) -> NetworkAnalysisRequestDTO:
+    """Collect network analysis filters from the query string"""
+    return NetworkAnalysisRequestDTO(
+        start_date=start_date,
+        start_time=start_time,
+        end_date=end_date,
+        end_time=end_time,
+        limit=limit,
+        limit_type=limit_type,
+        min_length=min_length,
+        max_length=max_length,
+        keywords=keywords,
+        min_messages=min_messages,
+        max_messages=max_messages,
+        active_users=active_users,
+        selected_users=selected_users,
+        username=username,
+        anonymize=anonymize,
+        edge_model=edge_model,
+        reply_window=reply_window,
+        reply_window_seconds=reply_window_seconds,
+        decay_half_life=decay_half_life,
+        latency=latency,
+        layout=layout,
+        layout_iterations=layout_iterations,
+        max_nodes=max_nodes,
+        community=community,
+        metrics=metrics,
+        parallel_betweenness=parallel_betweenness,
+        betweenness_workers=betweenness_workers
+    )
+
+def get_activity_query(
+    granularity: str = Query("day"),
+    users: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    per_user: bool = Query(False)
+) -> ActivityQueryDTO:
+    """Collect activity rollup query options from the query string"""
+    return ActivityQueryDTO(
+        granularity=granularity,
+        users=users,
+        start_date=start_date,
+        end_date=end_date,
+        per_user=per_user
+    )
+
+def get_text_stats_query(
+    k: int = Query(20, ge=1),
+    users: Optional[str] = Query(None),
+    start_date: Optional[str] = Query(None),
+    end_date: Optional[str] = Query(None),
+    per_user: bool = Query(False),
+    per_bucket: bool = Query(False)
+) -> TextStatsQueryDTO:
+    """Collect term statistics query options from the query string"""
+    return TextStatsQueryDTO(
+        k=k,
+        users=users,
+        start_date=start_date,
+        end_date=end_date,
+        per_user=per_user,
+        per_bucket=per_bucket
+    )
 
 # Authentication dependencies
 async def get_current_user_id(
@@ -7,7 +7,8 @@ from domain.exceptions.domain_exceptions import (
     EntityNotFoundException,
     ValidationException,
     BusinessRuleException,
-    AuthorizationException
+    AuthorizationException,
+    UploadTooLargeException
 )
 
 
@@ -52,6 +53,14 @@ async def authorization_exception_handler(_request: Request, exc: Exception) ->
     )
 
 
+async def upload_too_large_handler(_request: Request, exc: Exception) -> JSONResponse:
+    """Handler for uploads over the size limit"""
+    return JSONResponse(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        content={"detail": str(exc)},
+    )
+
+
 async def jwt_exception_handler(_request: Request, exc: Exception) -> JSONResponse:
     """Handler for JWT exceptions"""
     return JSONResponse(
@@ -68,4 +77,5 @@ def register_exception_handlers(app: FastAPI) -> None:
     app.add_exception_handler(ValidationException, validation_exception_handler)
     app.add_exception_handler(BusinessRuleException, business_rule_exception_handler)
     app.add_exception_handler(AuthorizationException, authorization_exception_handler)
+    app.add_exception_handler(UploadTooLargeException, upload_too_large_handler)
     app.add_exception_handler(JWTError, jwt_exception_handler)
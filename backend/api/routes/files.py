@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from typing import Annotated, List
+import re
 
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status, UploadFile, File
+from fastapi.responses import StreamingResponse
+from typing import Annotated, List, Optional, Tuple
+
+from application.dtos.file_dto import (
+    AttachmentDTO, FileListDTO, FileUploadDTO, UploadChunkDTO, UploadCompleteDTO, UploadSessionCreateDTO, UploadSessionDTO
+)
 from application.services.file_service import FileService
 from api.dependencies import get_file_service, get_current_user_id
+from config.settings import settings
+from domain.exceptions.domain_exceptions import DomainException
 
 router = APIRouter(prefix="/files", tags=["Files"])
 
@@ -14,10 +22,59 @@ async def upload_file(
         file: UploadFile = File(...)
 
 ):
-    """Upload a file"""
+    """Upload a chat file or a WhatsApp zip export (only its chat text is stored), streamed to disk in chunks"""
+    try:
+        stored = await file_service.upload_file(file, current_user_id)
+        return {
+            "message": "File uploaded successfully!",
+            "filename": stored.filename,
+            "size": stored.size,
+            "lines": stored.lines,
+            "sha256": stored.sha256,
+            "attachments": stored.attachments
+        }
+    except DomainException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.post("/uploads", response_model=UploadSessionDTO, status_code=status.HTTP_201_CREATED)
+async def create_upload_session(
+        data: UploadSessionCreateDTO,
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Start a resumable upload; chunks are then sent with PUT in any order"""
+    return await file_service.create_upload_session(data, current_user_id)
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionDTO)
+async def get_upload_session(
+        upload_id: str,
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Received and missing chunks of a resumable upload, to resume after an interruption"""
+    return await file_service.upload_session(upload_id, current_user_id)
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}", response_model=UploadChunkDTO)
+async def upload_chunk(
+        upload_id: str,
+        index: int,
+        request: Request,
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Store one chunk of a resumable upload, streamed from the raw request body"""
     try:
-        filename = await file_service.upload_file(file, current_user_id)
-        return {"message": "File uploaded successfully!", "filename": filename}
+        return await file_service.upload_chunk(upload_id, index, request.stream(), current_user_id)
+    except DomainException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -25,13 +82,104 @@ async def upload_file(
         )
 
 
-@router.get("", response_model=List[str])
+@router.post("/uploads/{upload_id}/complete", response_model=FileUploadDTO, status_code=status.HTTP_201_CREATED)
+async def complete_upload(
+        upload_id: str,
+        data: UploadCompleteDTO,
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Assemble the chunks of a resumable upload into a file, checked against its SHA-256"""
+    try:
+        return await file_service.complete_upload(upload_id, data, current_user_id)
+    except DomainException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_200_OK)
+async def abort_upload(
+        upload_id: str,
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Abort a resumable upload and discard its chunks"""
+    await file_service.abort_upload(upload_id, current_user_id)
+    return {"message": f"Upload '{upload_id}' aborted", "success": True}
+
+
+@router.get("", response_model=FileListDTO)
 async def list_files(
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        offset: int = Query(0, ge=0),
+        limit: int = Query(settings.FILES_PAGE_SIZE, ge=1, le=settings.FILES_MAX_PAGE_SIZE)
+):
+    """List the current user's files with message counts, participants and date ranges, newest first"""
+    return await file_service.list_files(current_user_id, offset, limit)
+
+
+def _byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """``[start, end)`` of a single ``bytes=start-end`` (or suffix ``bytes=-n``) range, ``None`` for the whole file"""
+    if not range_header:
+        return None
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last) + 1, size) if last else size
+    else:
+        start, end = max(size - int(last), 0), size
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail=f"Range '{range_header}' not satisfiable for {size} bytes",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+@router.get("/{filename}/content")
+async def download_file(
+        filename: str,
+        file_service: Annotated[FileService, Depends(get_file_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        range_header: Annotated[Optional[str], Header(alias="Range")] = None
+):
+    """Stream a file, or the single byte range asked for with a ``Range`` header"""
+    size = await file_service.get_file_size(filename, current_user_id)
+    if size is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File '{filename}' not found"
+        )
+
+    byte_range = _byte_range(range_header, size)
+    start, end = byte_range or (0, size)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start)}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+    return StreamingResponse(
+        file_service.stream_file(filename, current_user_id, start, end),
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        media_type="application/octet-stream",
+        headers=headers
+    )
+
+
+@router.get("/{filename}/attachments", response_model=List[AttachmentDTO])
+async def list_attachments(
+        filename: str,
         file_service: Annotated[FileService, Depends(get_file_service)],
         current_user_id: Annotated[str, Depends(get_current_user_id)]
 ):
-    """List all files for current user"""
-    return await file_service.list_files(current_user_id)
+    """Media file names and sizes of a chat uploaded as a zip export, with the entry that sent each"""
+    return await file_service.get_attachments(filename, current_user_id)
 
 
 @router.delete("/{filename}", status_code=status.HTTP_200_OK)
@@ -41,7 +189,7 @@ async def delete_file(
         current_user_id: Annotated[str, Depends(get_current_user_id)]
 ):
     """Delete a file"""
-    success = await file_service.delete_file(filename)
+    success = await file_service.delete_file(filename, current_user_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
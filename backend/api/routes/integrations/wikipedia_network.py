@@ -1,64 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import Annotated, Optional
+from fastapi.responses import StreamingResponse
+from typing import Annotated
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.analytics.batch import ndjson
+from application.analytics.export import get_export_format
 from application.services.wikipedia_network_service import WikipediaNetworkService
-from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO
-from api.dependencies import get_db_session, get_current_user_id
+from application.dtos.activity_dto import ActivityHeatmapDTO, ActivityQueryDTO, ActivitySeriesDTO
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkBatchRequestDTO, NetworkDiffDTO, NetworkDiffRequestDTO, NetworkGraphDTO
+from api.dependencies import (
+    get_db_session, get_current_user_id, get_analysis_cache, get_network_analysis_params, get_activity_query
+)
 from domain.repositories.thread_repository import ThreadRepository
+from infrastructure.cache.analysis_cache import AnalysisCache
 from infrastructure.persistence.repositories.thread_repository import SQLAlchemyThreadRepository
 
 router = APIRouter(prefix="/wikipedia/network", tags=["Wikipedia Analysis"])
 
 async def get_wikipedia_network_service(
-    db_session: Annotated[AsyncSession, Depends(get_db_session)]
+    db_session: Annotated[AsyncSession, Depends(get_db_session)],
+    cache: Annotated[AnalysisCache, Depends(get_analysis_cache)]
 ) -> WikipediaNetworkService:
     """Dependency for Wikipedia network service"""
     thread_repository = SQLAlchemyThreadRepository(db_session)
-    return WikipediaNetworkService(thread_repository)
+    return WikipediaNetworkService(thread_repository, cache)
 
 @router.get("/{thread_id}", response_model=NetworkGraphDTO)
 async def analyze_wikipedia_thread(
     thread_id: str,
     network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
     current_user_id: Annotated[str, Depends(get_current_user_id)],
-    start_date: Optional[str] = Query(None),
-    start_time: Optional[str] = Query(None),
-    end_date: Optional[str] = Query(None),
-    end_time: Optional[str] = Query(None),
-    limit: Optional[int] = Query(None),
-    limit_type: str = Query("first"),
-    min_length: Optional[int] = Query(None),
-    max_length: Optional[int] = Query(None),
-    keywords: Optional[str] = Query(None),
-    min_messages: Optional[int] = Query(None),
-    max_messages: Optional[int] = Query(None),
-    active_users: Optional[int] = Query(None),
-    selected_users: Optional[str] = Query(None),
-    username: Optional[str] = Query(None),
-    anonymize: bool = Query(False)
+    request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)]
 ):
     """Analyze a Wikipedia thread and generate network graph"""
     try:
-        # Create request DTO
-        request = NetworkAnalysisRequestDTO(
-            start_date=start_date,
-            start_time=start_time,
-            end_date=end_date,
-            end_time=end_time,
-            limit=limit,
-            limit_type=limit_type,
-            min_length=min_length,
-            max_length=max_length,
-            keywords=keywords,
-            min_messages=min_messages,
-            max_messages=max_messages,
-            active_users=active_users,
-            selected_users=selected_users,
-            username=username,
-            anonymize=anonymize
-        )
-
         # Perform analysis
         return await network_service.analyze_wikipedia_thread(thread_id, request)
     except ValueError as e:
@@ -67,4 +42,182 @@ async def analyze_wikipedia_thread(
         raise HTTPException(
             status_code=500,
             detail=f"Analysis failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/{thread_id}/supernodes/{supernode_id}", response_model=NetworkGraphDTO)
+async def expand_wikipedia_supernode(
+    thread_id: str,
+    supernode_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)]
+):
+    """Expand a supernode of a coarsened (max_nodes) thread network into its members"""
+    try:
+        return await network_service.expand_supernode(thread_id, supernode_id, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
+@router.get("/{thread_id}/top", response_model=NetworkGraphDTO)
+async def top_wikipedia_nodes(
+    thread_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+    metric: str = Query("degree"),
+    k: int = Query(20, ge=1)
+):
+    """Get the k highest ranked thread participants by a metric"""
+    try:
+        return await network_service.top_nodes(thread_id, request, metric, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Query failed: {str(e)}"
+        )
+
+@router.get("/{thread_id}/ego/{node_id}", response_model=NetworkGraphDTO)
+async def wikipedia_ego_network(
+    thread_id: str,
+    node_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+    radius: int = Query(1, ge=1)
+):
+    """Get the thread participants within radius hops of a participant"""
+    try:
+        return await network_service.ego_network(thread_id, request, node_id, radius)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Query failed: {str(e)}"
+        )
+
+@router.get("/{thread_id}/kcore", response_model=NetworkGraphDTO)
+async def wikipedia_k_core(
+    thread_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+    k: int = Query(2, ge=0)
+):
+    """Get the k-core subgraph of a thread network"""
+    try:
+        return await network_service.k_core(thread_id, request, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Query failed: {str(e)}"
+        )
+
+@router.post("/{thread_id}/batch")
+async def analyze_wikipedia_thread_batch(
+    thread_id: str,
+    data: NetworkBatchRequestDTO,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Analyze a Wikipedia thread under many parameter sets, streaming NDJSON results as they complete"""
+    try:
+        results = await network_service.analyze_batch(thread_id, data.requests)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
+    return StreamingResponse(ndjson(results), media_type="application/x-ndjson")
+
+@router.post("/{thread_id}/diff", response_model=NetworkDiffDTO)
+async def diff_wikipedia_thread(
+    thread_id: str,
+    data: NetworkDiffRequestDTO,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Compare the networks of a Wikipedia thread under two sets of analysis parameters"""
+    try:
+        return await network_service.diff(thread_id, data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Diff failed: {str(e)}"
+        )
+
+@router.get("/{thread_id}/activity", response_model=ActivitySeriesDTO)
+async def wikipedia_activity_series(
+    thread_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    query: Annotated[ActivityQueryDTO, Depends(get_activity_query)]
+):
+    """Get thread message volume per hour, day or week, in total or per participant"""
+    try:
+        return await network_service.activity_series(thread_id, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Query failed: {str(e)}"
+        )
+
+@router.get("/{thread_id}/activity/heatmap", response_model=ActivityHeatmapDTO)
+async def wikipedia_activity_heatmap(
+    thread_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    query: Annotated[ActivityQueryDTO, Depends(get_activity_query)]
+):
+    """Get thread message counts by weekday and hour of day"""
+    try:
+        return await network_service.activity_heatmap(thread_id, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Query failed: {str(e)}"
+        )
+
+@router.get("/{thread_id}/export")
+async def export_wikipedia_thread(
+    thread_id: str,
+    network_service: Annotated[WikipediaNetworkService, Depends(get_wikipedia_network_service)],
+    current_user_id: Annotated[str, Depends(get_current_user_id)],
+    request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+    export_format: str = Query("gexf", alias="format")
+):
+    """Stream a Wikipedia thread network as GEXF, GraphML or CSV"""
+    try:
+        fmt = get_export_format(export_format)
+        graph = await network_service.analyze_wikipedia_thread(thread_id, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Export failed: {str(e)}"
+        )
+
+    return StreamingResponse(
+        fmt.writer(graph),
+        media_type=fmt.media_type,
+        headers={"Content-Disposition": f'attachment; filename="thread_{thread_id}.{fmt.extension}"'}
+    )
@@ -1,9 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from typing import Annotated, Optional
+from fastapi.responses import StreamingResponse
+from typing import Annotated
 
+from application.analytics.batch import ndjson
+from application.analytics.export import get_export_format
 from application.services.network_service import NetworkService
-from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO
-from api.dependencies import get_network_service, get_current_user_id
+from application.dtos.activity_dto import ActivityHeatmapDTO, ActivityQueryDTO, ActivitySeriesDTO
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkBatchRequestDTO, NetworkDiffDTO, NetworkDiffRequestDTO, NetworkGraphDTO
+from application.dtos.text_stats_dto import TextStatsDTO, TextStatsQueryDTO
+from domain.entities.file import storage_name
+from api.dependencies import get_network_service, get_current_user_id, get_network_analysis_params, get_activity_query, get_text_stats_query
 
 router = APIRouter(prefix="/analyze/network", tags=["Network Analysis"])
 
@@ -13,49 +19,222 @@ async def analyze_network(
         filename: str,
         network_service: Annotated[NetworkService, Depends(get_network_service)],
         current_user_id: Annotated[str, Depends(get_current_user_id)],
-        start_date: Optional[str] = Query(None),
-        start_time: Optional[str] = Query(None),
-        end_date: Optional[str] = Query(None),
-        end_time: Optional[str] = Query(None),
-        limit: Optional[int] = Query(None),
-        limit_type: str = Query("first"),
-        min_length: Optional[int] = Query(None),
-        max_length: Optional[int] = Query(None),
-        keywords: Optional[str] = Query(None),
-        min_messages: Optional[int] = Query(None),
-        max_messages: Optional[int] = Query(None),
-        active_users: Optional[int] = Query(None),
-        selected_users: Optional[str] = Query(None),
-        username: Optional[str] = Query(None),
-        anonymize: bool = Query(False)
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)]
 ):
     """Analyze a chat file and generate network graph"""
     try:
-        # Create request DTO
-        request = NetworkAnalysisRequestDTO(
-            start_date=start_date,
-            start_time=start_time,
-            end_date=end_date,
-            end_time=end_time,
-            limit=limit,
-            limit_type=limit_type,
-            min_length=min_length,
-            max_length=max_length,
-            keywords=keywords,
-            min_messages=min_messages,
-            max_messages=max_messages,
-            active_users=active_users,
-            selected_users=selected_users,
-            username=username,
-            anonymize=anonymize
+        # Perform analysis
+        return await network_service.analyze_network(storage_name(current_user_id, filename), request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis failed: {str(e)}, current user: {current_user_id}"
         )
 
-        # Perform analysis
-        return await network_service.analyze_network(filename, request)
+
+@router.get("/{filename}/supernodes/{supernode_id}", response_model=NetworkGraphDTO)
+async def expand_supernode(
+        filename: str,
+        supernode_id: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)]
+):
+    """Expand a supernode of a coarsened (max_nodes) network into its members"""
+    try:
+        return await network_service.expand_supernode(storage_name(current_user_id, filename), supernode_id, request)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Analysis failed: {str(e)}, current user: {current_user_id}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/{filename}/top", response_model=NetworkGraphDTO)
+async def top_nodes(
+        filename: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+        metric: str = Query("degree"),
+        k: int = Query(20, ge=1)
+):
+    """Get the k highest ranked users by a metric and the links among them"""
+    try:
+        return await network_service.top_nodes(storage_name(current_user_id, filename), request, metric, k)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.get("/{filename}/ego/{node_id}", response_model=NetworkGraphDTO)
+async def ego_network(
+        filename: str,
+        node_id: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+        radius: int = Query(1, ge=1)
+):
+    """Get the users within radius hops of a user"""
+    try:
+        return await network_service.ego_network(storage_name(current_user_id, filename), request, node_id, radius)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.get("/{filename}/kcore", response_model=NetworkGraphDTO)
+async def k_core(
+        filename: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+        k: int = Query(2, ge=0)
+):
+    """Get the k-core subgraph of the network"""
+    try:
+        return await network_service.k_core(storage_name(current_user_id, filename), request, k)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.post("/{filename}/batch")
+async def analyze_network_batch(
+        filename: str,
+        data: NetworkBatchRequestDTO,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Analyze a chat file under many parameter sets, streaming NDJSON results as they complete"""
+    try:
+        results = await network_service.analyze_batch(storage_name(current_user_id, filename), data.requests)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis failed: {str(e)}, current user: {current_user_id}"
+        )
+
+    return StreamingResponse(ndjson(results), media_type="application/x-ndjson")
+
+
+@router.post("/{filename}/diff", response_model=NetworkDiffDTO)
+async def diff_network(
+        filename: str,
+        data: NetworkDiffRequestDTO,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)]
+):
+    """Compare the networks of a chat file under two sets of analysis parameters"""
+    try:
+        return await network_service.diff(storage_name(current_user_id, filename), data)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Diff failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.get("/{filename}/activity", response_model=ActivitySeriesDTO)
+async def activity_series(
+        filename: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        query: Annotated[ActivityQueryDTO, Depends(get_activity_query)]
+):
+    """Get message volume per hour, day or week, in total or per user"""
+    try:
+        return await network_service.activity_series(storage_name(current_user_id, filename), query)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.get("/{filename}/activity/heatmap", response_model=ActivityHeatmapDTO)
+async def activity_heatmap(
+        filename: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        query: Annotated[ActivityQueryDTO, Depends(get_activity_query)]
+):
+    """Get message counts by weekday and hour of day"""
+    try:
+        return await network_service.activity_heatmap(storage_name(current_user_id, filename), query)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.get("/{filename}/terms", response_model=TextStatsDTO)
+async def text_stats(
+        filename: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        query: Annotated[TextStatsQueryDTO, Depends(get_text_stats_query)]
+):
+    """Get the top terms and vocabulary size of a chat, in total, per user or per time bucket"""
+    try:
+        return await network_service.text_stats(storage_name(current_user_id, filename), query)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Query failed: {str(e)}, current user: {current_user_id}"
+        )
+
+
+@router.get("/{filename}/export")
+async def export_network(
+        filename: str,
+        network_service: Annotated[NetworkService, Depends(get_network_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)],
+        export_format: str = Query("gexf", alias="format")
+):
+    """Stream the analyzed network as GEXF, GraphML or CSV"""
+    try:
+        fmt = get_export_format(export_format)
+        graph = await network_service.analyze_network(storage_name(current_user_id, filename), request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Export failed: {str(e)}, current user: {current_user_id}"
+        )
+
+    return StreamingResponse(
+        fmt.writer(graph),
+        media_type=fmt.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt.extension}"'}
+    )
@@ -1,9 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from typing import Annotated, List
 
+from application.services.research_analysis_service import ResearchAnalysisService
+from application.services.research_precompute_service import ResearchPrecomputeService
 from application.services.research_service import ResearchService
-from application.dtos.research_dto import ResearchCreateDTO, ResearchResponseDTO, ResearchUpdateDTO
-from api.dependencies import get_research_service, get_current_user_id
+from application.dtos.network_dto import NetworkAnalysisRequestDTO
+from application.dtos.research_dto import ResearchAnalysisDTO, ResearchCreateDTO, ResearchResponseDTO, ResearchUpdateDTO
+from api.dependencies import (
+    DBSession, get_research_service, get_current_user_id, get_research_analysis_service, get_network_analysis_params,
+    get_research_precompute_service
+)
+from infrastructure.persistence.database import after_commit
 
 router = APIRouter(prefix="/research", tags=["Research"])
 
@@ -12,10 +19,14 @@ router = APIRouter(prefix="/research", tags=["Research"])
 async def create_research(
         data: ResearchCreateDTO,
         research_service: Annotated[ResearchService, Depends(get_research_service)],
+        precompute: Annotated[ResearchPrecomputeService, Depends(get_research_precompute_service)],
+        session: DBSession,
         current_user_id: Annotated[str, Depends(get_current_user_id)]
 ):
-    """Create a new research project"""
-    return await research_service.create_research(current_user_id, data)
+    """Create a new research project, precomputing its default analysis once it is committed"""
+    research = await research_service.create_research(current_user_id, data)
+    after_commit(session, lambda: precompute.schedule(research.id))
+    return research
 
 
 @router.get("", response_model=List[ResearchResponseDTO])
@@ -54,9 +65,11 @@ async def update_research(
         research_id: str,
         data: ResearchUpdateDTO,
         research_service: Annotated[ResearchService, Depends(get_research_service)],
+        precompute: Annotated[ResearchPrecomputeService, Depends(get_research_precompute_service)],
+        session: DBSession,
         current_user_id: Annotated[str, Depends(get_current_user_id)]
 ):
-    """Update a research project"""
+    """Update a research project, precomputing its default analysis again once it is committed"""
     # First check ownership
     research = await research_service.get_research(research_id)
     if not research:
@@ -70,6 +83,8 @@ async def update_research(
 
     # Then update
     updated = await research_service.update_research(research_id, data)
+    if updated:
+        after_commit(session, lambda: precompute.schedule(research_id))
     return updated
 
 
@@ -94,4 +109,34 @@ async def delete_research(
     # Then delete
     success = await research_service.delete_research(research_id)
     if not success:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete research")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete research")
+
+
+@router.get("/{research_id}/analysis", response_model=ResearchAnalysisDTO)
+async def analyze_research(
+        research_id: str,
+        research_service: Annotated[ResearchService, Depends(get_research_service)],
+        analysis_service: Annotated[ResearchAnalysisService, Depends(get_research_analysis_service)],
+        current_user_id: Annotated[str, Depends(get_current_user_id)],
+        request: Annotated[NetworkAnalysisRequestDTO, Depends(get_network_analysis_params)]
+):
+    """Analyze all chat files and Wikipedia threads of a research project, separately and merged"""
+    research = await research_service.get_research(research_id)
+    if not research:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Research not found")
+
+    if research.user_id != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have access to this research"
+        )
+
+    try:
+        return await analysis_service.analyze_research(research_id, request)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis failed: {str(e)}, current user: {current_user_id}"
+        )
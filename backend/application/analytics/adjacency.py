@@ -0,0 +1,71 @@
+from typing import Dict, List, Optional
+
+import networkx as nx
+import numpy as np
+from scipy import sparse
+
+from application.dtos.network_dto import NetworkGraphDTO
+
+
+class CompactGraph:
+    """Integer-indexed adjacency of a network graph
+
+    Nodes are interned to positions ``0..n-1`` once, edges are kept as parallel
+    ``sources``/``targets``/``weights`` arrays and as a symmetric CSR matrix, so
+    the array-based algorithms can share one build instead of each walking a
+    NetworkX graph.
+    """
+
+    def __init__(self, node_ids: List[str], sources: np.ndarray, targets: np.ndarray, weights: np.ndarray):
+        self.node_ids = node_ids
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.sources = sources
+        self.targets = targets
+        self.weights = weights
+
+        n = len(node_ids)
+        matrix = sparse.coo_matrix(
+            (np.concatenate([weights, weights]),
+             (np.concatenate([sources, targets]), np.concatenate([targets, sources]))),
+            shape=(n, n)
+        )
+        self.matrix: sparse.csr_matrix = matrix.tocsr()
+        self.matrix.sum_duplicates()
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.sources)
+
+    def neighbors(self, i: int) -> np.ndarray:
+        """Indices of the nodes adjacent to node ``i``"""
+        return self.matrix.indices[self.matrix.indptr[i]:self.matrix.indptr[i + 1]]
+
+    @classmethod
+    def from_graph(cls, graph: NetworkGraphDTO) -> "CompactGraph":
+        """Intern the nodes and links of a graph DTO"""
+        node_ids = [node.id for node in graph.nodes]
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+        links = [link for link in graph.links if link.source in index and link.target in index]
+        sources = np.fromiter((index[link.source] for link in links), dtype=np.int64, count=len(links))
+        targets = np.fromiter((index[link.target] for link in links), dtype=np.int64, count=len(links))
+        weights = np.fromiter((link.weight for link in links), dtype=np.float64, count=len(links))
+
+        return cls(node_ids, sources, targets, weights)
+
+    @classmethod
+    def from_networkx(cls, g: nx.Graph, weight: Optional[str] = "weight") -> "CompactGraph":
+        """Intern the nodes and edges of a NetworkX graph (unit weights if ``weight`` is None)"""
+        node_ids = list(g.nodes())
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        edges = list(g.edges(data=weight, default=1)) if weight else [(u, v, 1) for u, v in g.edges()]
+
+        sources = np.fromiter((index[u] for u, _, _ in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((index[v] for _, v, _ in edges), dtype=np.int64, count=len(edges))
+        weights = np.fromiter((w for _, _, w in edges), dtype=np.float64, count=len(edges))
+
+        return cls(node_ids, sources, targets, weights)
@@ -0,0 +1,44 @@
+from typing import Any, Dict, Hashable, Optional
+
+from application.analytics.adjacency import CompactGraph
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO
+
+# Request fields that only post-process an analysis
+PRESENTATION_OPTIONS = ("layout", "layout_iterations", "max_nodes", "community", "metrics")
+
+# Request fields that change how an analysis is computed but not its result
+EXECUTION_OPTIONS = ("parallel_betweenness", "betweenness_workers")
+
+# Neither kind may affect the analysis cache key
+CACHE_KEY_EXCLUDED = PRESENTATION_OPTIONS + EXECUTION_OPTIONS
+
+
+def fresh_run(params: Optional[NetworkAnalysisRequestDTO]) -> bool:
+    """Whether a request must compute its analysis instead of reusing a cached or memoized one
+
+    Execution options do not change the result, but a parallel betweenness
+    request asks for the timing of its own run. Its result still replaces the
+    cached one.
+    """
+    return bool(params and params.parallel_betweenness)
+
+
+class GraphAnalysis:
+    """A computed network graph together with the artefacts derived from it
+
+    This is the unit stored in the analysis cache. Derived results (layouts and
+    similar) are kept in ``derived`` so repeated views of the same analysis do
+    not recompute them.
+    """
+
+    def __init__(self, graph: NetworkGraphDTO):
+        self.graph = graph
+        self.derived: Dict[Hashable, Any] = {}
+        self._adjacency: Optional[CompactGraph] = None
+
+    @property
+    def adjacency(self) -> CompactGraph:
+        """Compact adjacency of the graph, built on first use"""
+        if self._adjacency is None:
+            self._adjacency = CompactGraph.from_graph(self.graph)
+        return self._adjacency
@@ -0,0 +1,80 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Dict, Hashable, List
+
+from pydantic import TypeAdapter
+
+from application.analytics.analysis import GraphAnalysis, fresh_run
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkBatchResultDTO, NetworkGraphDTO
+from config.settings import settings
+from infrastructure.cache.analysis_cache import AnalysisCache
+
+_RESULT_ADAPTER = TypeAdapter(NetworkBatchResultDTO)
+
+
+def _error(e: Exception) -> str:
+    return str(e) if isinstance(e, ValueError) else f"Analysis failed: {str(e)}"
+
+
+def evaluate_batch(
+        requests: List[NetworkAnalysisRequestDTO],
+        cache: AnalysisCache,
+        cache_key: Callable[[NetworkAnalysisRequestDTO], Hashable],
+        analyze: Callable[[NetworkAnalysisRequestDTO], NetworkGraphDTO],
+        present: Callable[[GraphAnalysis, NetworkAnalysisRequestDTO], NetworkGraphDTO]
+) -> AsyncIterator[NetworkBatchResultDTO]:
+    """Evaluate many parameter sets against source data loaded once, yielding results as they complete
+
+    ``analyze`` builds a graph from the shared in-memory data, ``present``
+    applies the presentation options of one parameter set. Parameter sets
+    that only differ in presentation or execution options share a cache key
+    and are grouped, so every distinct analysis is computed once. Groups run
+    in a pool of ``BATCH_WORKERS`` threads (the numpy filtering and sparse
+    kernels release the GIL), and a failing parameter set is reported in its
+    result instead of aborting the batch.
+    """
+    if not requests:
+        raise ValueError("A batch needs at least one parameter set")
+    if len(requests) > settings.BATCH_MAX_REQUESTS:
+        raise ValueError(f"A batch takes at most {settings.BATCH_MAX_REQUESTS} parameter sets")
+
+    groups: Dict[Hashable, List[int]] = {}
+    for index, params in enumerate(requests):
+        groups.setdefault(cache_key(params), []).append(index)
+
+    def evaluate(key: Hashable, indices: List[int]) -> List[NetworkBatchResultDTO]:
+        try:
+            analysis = None if any(fresh_run(requests[index]) for index in indices) else cache.get(key)
+            if analysis is None:
+                analysis = GraphAnalysis(analyze(requests[indices[0]]))
+                cache.put(key, analysis)
+        except Exception as e:
+            return [NetworkBatchResultDTO(index=index, error=_error(e)) for index in indices]
+
+        results = []
+        for index in indices:
+            try:
+                results.append(NetworkBatchResultDTO(index=index, graph=present(analysis, requests[index])))
+            except Exception as e:
+                results.append(NetworkBatchResultDTO(index=index, error=_error(e)))
+        return results
+
+    async def results() -> AsyncIterator[NetworkBatchResultDTO]:
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, min(settings.BATCH_WORKERS, len(groups))))
+        try:
+            pending = [loop.run_in_executor(executor, evaluate, key, indices) for key, indices in groups.items()]
+            for completed in asyncio.as_completed(pending):
+                for result in await completed:
+                    yield result
+        finally:
+            # A client that disconnects mid-stream cancels the groups that have not started
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    return results()
+
+
+async def ndjson(results: AsyncIterator[NetworkBatchResultDTO]) -> AsyncIterator[bytes]:
+    """Serialize batch results as newline-delimited JSON, one line per result"""
+    async for result in results:
+        yield _RESULT_ADAPTER.dump_json(result) + b"\n"
@@ -0,0 +1,162 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.community import label_propagation
+from application.dtos.network_dto import NetworkGraphDTO, NodeDTO, LinkDTO
+
+# Centralities of a supernode are those of its most central member
+_MAX_METRICS = ("degree", "betweenness", "closeness", "eigenvector")
+
+
+def _collapse_groups(analysis: GraphAnalysis, nodes: np.ndarray, max_nodes: int) -> List[np.ndarray]:
+    """Choose groups of ``nodes`` to collapse so that at most ``max_nodes`` units remain
+
+    Leaves hanging off the same neighbour and isolated nodes are bundled first,
+    then label propagation communities of the remaining nodes. Groups are
+    collapsed largest first; the last one is only collapsed partially (its
+    least active members) so the budget is met without overshooting. If that
+    is not enough, the least active remaining units are merged into one.
+    """
+    needed = len(nodes) - max_nodes
+    if needed <= 0:
+        return []
+
+    matrix = analysis.adjacency.matrix[nodes][:, nodes].tocsr()
+    messages = np.array([analysis.graph.nodes[i].messages for i in nodes], dtype=np.float64)
+    degree = np.diff(matrix.indptr)
+
+    # Leaves grouped by the node they hang off, and all isolated nodes
+    leaves = np.flatnonzero(degree == 1)
+    anchors = matrix.indices[matrix.indptr[leaves]]
+    leaves, anchors = leaves[degree[anchors] > 1], anchors[degree[anchors] > 1]
+    order = np.argsort(anchors, kind="stable")
+    leaves, anchors = leaves[order], anchors[order]
+    bundles = [group for group in np.split(leaves, np.flatnonzero(np.diff(anchors)) + 1) if len(group) > 1]
+    isolated = np.flatnonzero(degree == 0)
+    if len(isolated) > 1:
+        bundles.append(isolated)
+
+    bundled = np.zeros(len(nodes), dtype=bool)
+    for group in bundles:
+        bundled[group] = True
+
+    labels = label_propagation(matrix)
+    free = np.flatnonzero(~bundled)
+    order = np.argsort(labels[free], kind="stable")
+    free = free[order]
+    communities = [group for group in np.split(free, np.flatnonzero(np.diff(labels[free])) + 1) if len(group) > 1]
+
+    collapsed: List[np.ndarray] = []
+    for group in sorted(bundles, key=len, reverse=True) + sorted(communities, key=len, reverse=True):
+        if needed <= 0:
+            break
+        group = group[np.argsort(-messages[group], kind="stable")]
+        if len(group) - 1 > needed:
+            group = group[-(needed + 1):]
+        collapsed.append(group)
+        needed -= len(group) - 1
+
+    if needed > 0:
+        # Merge the least active units (single nodes or groups) into one
+        in_group = np.zeros(len(nodes), dtype=bool)
+        for group in collapsed:
+            in_group[group] = True
+        units = collapsed + [np.array([i]) for i in np.flatnonzero(~in_group)]
+        units.sort(key=lambda unit: messages[unit].sum())
+        merged = np.concatenate(units[:needed + 1])
+        collapsed = [merged] + [unit for unit in units[needed + 1:] if len(unit) > 1]
+
+    return collapsed
+
+
+class LevelOfDetail:
+    """Coarsened view of an analysed graph with on-demand expansion of supernodes"""
+
+    def __init__(self, analysis: GraphAnalysis, max_nodes: int):
+        self.analysis = analysis
+        self.max_nodes = max_nodes
+        # Supernode id -> indices of the original nodes it stands for
+        self.members: Dict[str, np.ndarray] = {}
+
+        all_nodes = np.arange(analysis.adjacency.node_count)
+        self.coarse = GraphAnalysis(self._coarsen(all_nodes, "super", with_boundary=False))
+
+        # Top-level node each original node is drawn as
+        self.visible_ids = list(analysis.adjacency.node_ids)
+        for supernode_id, members in self.members.items():
+            for i in members:
+                self.visible_ids[i] = supernode_id
+
+    def expand(self, supernode_id: str) -> NetworkGraphDTO:
+        """Members of a supernode, coarsened again if they exceed the budget
+
+        Links from the members to nodes outside the supernode point at the
+        top-level node those neighbours are drawn as.
+        """
+        members = self.members.get(supernode_id)
+        if members is None:
+            raise ValueError(f"Supernode {supernode_id} not found")
+        return self._coarsen(members, supernode_id, with_boundary=True)
+
+    def _coarsen(self, nodes: np.ndarray, prefix: str, with_boundary: bool) -> NetworkGraphDTO:
+        adjacency = self.analysis.adjacency
+        source_nodes = self.analysis.graph.nodes
+        directed = self.analysis.graph.directed
+
+        unit_ids: Dict[int, str] = {i: adjacency.node_ids[i] for i in nodes}
+        result_nodes: List[NodeDTO] = []
+        grouped = set()
+        for number, group in enumerate(_collapse_groups(self.analysis, nodes, self.max_nodes), start=1):
+            supernode_id = f"{prefix}:{number}"
+            originals = nodes[group]
+            self.members[supernode_id] = originals
+            grouped.update(originals.tolist())
+            for i in originals:
+                unit_ids[i] = supernode_id
+            result_nodes.append(self._supernode(supernode_id, [source_nodes[i] for i in originals]))
+
+        result_nodes.extend(source_nodes[i] for i in nodes if i not in grouped)
+
+        weights: Dict[tuple, float] = {}
+        for link in self.analysis.graph.links:
+            u, v = adjacency.index[link.source], adjacency.index[link.target]
+            source, target = unit_ids.get(u), unit_ids.get(v)
+            if with_boundary:
+                source = source or self.visible_ids[u]
+                target = target or self.visible_ids[v]
+                if u not in unit_ids and v not in unit_ids:
+                    continue
+            if source is None or target is None or source == target:
+                continue
+            # Links of a directed graph keep their direction, undirected ones merge both
+            key = (source, target) if directed or source < target else (target, source)
+            weights[key] = weights.get(key, 0) + link.weight
+
+        return NetworkGraphDTO(
+            nodes=result_nodes,
+            links=[LinkDTO(source=s, target=t, weight=w) for (s, t), w in weights.items()],
+            directed=directed
+        )
+
+    @staticmethod
+    def _supernode(supernode_id: str, members: List[NodeDTO]) -> NodeDTO:
+        """Aggregate member metrics: activity and PageRank add up, centralities take the maximum"""
+        return NodeDTO(
+            id=supernode_id,
+            messages=sum(member.messages for member in members),
+            pagerank=round(sum(member.pagerank for member in members), 4),
+            member_count=len(members),
+            **{metric: max(getattr(member, metric) for member in members) for metric in _MAX_METRICS}
+        )
+
+
+def level_of_detail(analysis: GraphAnalysis, max_nodes: int) -> LevelOfDetail:
+    """Get the coarsened view of an analysis for a node budget, cached on the analysis"""
+    key = ("lod", max_nodes)
+    lod: Optional[LevelOfDetail] = analysis.derived.get(key)
+    if lod is None:
+        lod = LevelOfDetail(analysis, max_nodes)
+        analysis.derived[key] = lod
+    return lod
@@ -0,0 +1,95 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.queries import NODE_METRICS, metric_values
+from application.dtos.network_dto import LinkDTO, LinkDeltaDTO, NetworkDiffDTO, NodeDeltaDTO
+
+
+def _weight(value: float):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def _edge_keys(analysis: GraphAnalysis, codes: np.ndarray, vocabulary_size: int,
+               directed: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted unique edge keys over the shared vocabulary and their summed weights
+
+    Directed keys are ``source * size + target``; undirected keys order the
+    two ends, so both directions of an edge share a key.
+    """
+    adjacency = analysis.adjacency
+    u, v = codes[adjacency.sources], codes[adjacency.targets]
+    keys = u * vocabulary_size + v if directed else np.minimum(u, v) * vocabulary_size + np.maximum(u, v)
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return keys, np.bincount(inverse, weights=adjacency.weights, minlength=len(keys))
+
+
+def _links(vocabulary: np.ndarray, keys: np.ndarray, weights: np.ndarray) -> List[LinkDTO]:
+    size = len(vocabulary)
+    return [
+        LinkDTO(source=vocabulary[key // size], target=vocabulary[key % size], weight=_weight(weight))
+        for key, weight in zip(keys.tolist(), weights.tolist())
+    ]
+
+
+def diff_analyses(before: GraphAnalysis, after: GraphAnalysis, threshold: float = 0.0) -> NetworkDiffDTO:
+    """Added and removed nodes and links, weight changes and metric changes between two analyses
+
+    Node ids of both graphs are interned into one sorted vocabulary, so every
+    comparison is a set operation on sorted integer arrays. Only metric
+    changes with an absolute value above ``threshold`` are reported. Links
+    are compared by direction when either graph is directed.
+    """
+    before_ids = np.array(before.adjacency.node_ids, dtype=object)
+    after_ids = np.array(after.adjacency.node_ids, dtype=object)
+    vocabulary = np.unique(np.concatenate([before_ids, after_ids]).astype(str))
+    before_codes = np.searchsorted(vocabulary, before_ids.astype(str))
+    after_codes = np.searchsorted(vocabulary, after_ids.astype(str))
+
+    added_nodes = np.setdiff1d(after_codes, before_codes, assume_unique=True)
+    removed_nodes = np.setdiff1d(before_codes, after_codes, assume_unique=True)
+
+    size = len(vocabulary)
+    directed = before.graph.directed or after.graph.directed
+    before_keys, before_weights = _edge_keys(before, before_codes, size, directed)
+    after_keys, after_weights = _edge_keys(after, after_codes, size, directed)
+    added = ~np.isin(after_keys, before_keys, assume_unique=True)
+    removed = ~np.isin(before_keys, after_keys, assume_unique=True)
+
+    common_keys, before_at, after_at = np.intersect1d(before_keys, after_keys, assume_unique=True,
+                                                      return_indices=True)
+    weight_delta = after_weights[after_at] - before_weights[before_at]
+    changed = weight_delta != 0
+    weight_changes = [
+        LinkDeltaDTO(source=vocabulary[key // size], target=vocabulary[key % size],
+                     before=_weight(old), after=_weight(new), delta=_weight(delta))
+        for key, old, new, delta in zip(common_keys[changed].tolist(), before_weights[before_at][changed].tolist(),
+                                        after_weights[after_at][changed].tolist(), weight_delta[changed].tolist())
+    ]
+
+    common_codes, before_nodes, after_nodes = np.intersect1d(before_codes, after_codes, assume_unique=True,
+                                                             return_indices=True)
+    deltas = {
+        metric: metric_values(after, metric)[after_nodes] - metric_values(before, metric)[before_nodes]
+        for metric in NODE_METRICS
+    }
+    metric_changes = []
+    significant = np.zeros(len(common_codes), dtype=bool)
+    for values in deltas.values():
+        significant |= np.abs(values) > threshold
+    for position in np.flatnonzero(significant).tolist():
+        node_deltas = {
+            metric: round(float(values[position]), 4)
+            for metric, values in deltas.items() if abs(values[position]) > threshold
+        }
+        metric_changes.append(NodeDeltaDTO(id=vocabulary[common_codes[position]], deltas=node_deltas))
+
+    return NetworkDiffDTO(
+        added_nodes=vocabulary[added_nodes].tolist(),
+        removed_nodes=vocabulary[removed_nodes].tolist(),
+        added_links=_links(vocabulary, after_keys[added], after_weights[added]),
+        removed_links=_links(vocabulary, before_keys[removed], before_weights[removed]),
+        weight_changes=weight_changes,
+        metric_changes=metric_changes
+    )
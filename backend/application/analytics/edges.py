@@ -0,0 +1,109 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from config.settings import settings
+
+EDGE_MODELS = ("previous", "directed", "window", "mention")
+DIRECTED_EDGE_MODELS = ("directed", "window", "mention")
+
+
+class EdgeList(NamedTuple):
+    """Aggregated edges over interned sender codes"""
+    sources: np.ndarray
+    targets: np.ndarray
+    weights: np.ndarray
+
+
+def _aggregate(sources: np.ndarray, targets: np.ndarray, weights: np.ndarray, directed: bool) -> EdgeList:
+    """Sum the weights of repeated pairs (unordered pairs unless ``directed``)"""
+    if not directed:
+        sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+    size = int(max(sources.max(), targets.max())) + 1 if len(sources) else 1
+    keys, inverse = np.unique(sources * size + targets, return_inverse=True)
+    return EdgeList(keys // size, keys % size, np.bincount(inverse, weights=weights, minlength=len(keys)))
+
+
+class ReplyPairs(NamedTuple):
+    """One row per reply: sender codes of the replier and the replied-to user, and the gap in seconds
+
+    Gaps are never negative: exports whose timestamps go backwards (device
+    clock changes) count such replies as immediate.
+    """
+    repliers: np.ndarray
+    targets: np.ndarray
+    gaps: np.ndarray
+
+
+def previous_sender_pairs(codes: np.ndarray, seconds: np.ndarray) -> ReplyPairs:
+    """Every message replies to the message before it, if that was sent by someone else"""
+    current, previous = codes[1:], codes[:-1]
+    mask = current != previous
+    gaps = np.maximum(np.diff(seconds), 0)
+    return ReplyPairs(current[mask], previous[mask], gaps[mask].astype(np.float64))
+
+
+def reply_window_pairs(codes: np.ndarray, seconds: np.ndarray, messages: Optional[int] = None,
+                       window_seconds: Optional[int] = None) -> ReplyPairs:
+    """Every message replies to each other sender within a reply window
+
+    The window spans the previous ``messages`` messages and/or
+    ``window_seconds`` seconds (at most ``EDGE_WINDOW_MAX_MESSAGES`` messages
+    back). Every other sender in the window is replied to once per message,
+    with the gap to their most recent message. Each lag is one vectorized pass
+    over the message arrays.
+    """
+    if messages is None and window_seconds is None:
+        messages = settings.EDGE_WINDOW_MESSAGES
+    max_lag = min(messages or settings.EDGE_WINDOW_MAX_MESSAGES, settings.EDGE_WINDOW_MAX_MESSAGES)
+
+    messages_at, targets, gaps = [], [], []
+    for lag in range(1, min(max_lag, len(codes) - 1) + 1):
+        current = np.arange(lag, len(codes))
+        gap = np.maximum(seconds[current] - seconds[current - lag], 0)
+        mask = codes[current] != codes[current - lag]
+        if window_seconds is not None:
+            in_window = gap <= window_seconds
+            if not in_window.any():
+                break
+            mask &= in_window
+        messages_at.append(current[mask])
+        targets.append(codes[current - lag][mask])
+        gaps.append(gap[mask])
+
+    messages_at = np.concatenate(messages_at) if messages_at else np.zeros(0, dtype=np.int64)
+    if not len(messages_at):
+        empty = np.zeros(0, dtype=np.int64)
+        return ReplyPairs(empty, empty, np.zeros(0))
+
+    targets, gaps = np.concatenate(targets), np.concatenate(gaps)
+    # Pairs are ordered by lag, so the first occurrence of a (message, target) pair is the closest one
+    size = int(targets.max()) + 1
+    _, first = np.unique(messages_at * size + targets, return_index=True)
+    return ReplyPairs(codes[messages_at[first]], targets[first], gaps[first].astype(np.float64))
+
+
+def reply_edges(pairs: ReplyPairs, directed: bool = False, half_life: Optional[float] = None) -> EdgeList:
+    """Aggregate replies into edges from the replier to the replied-to user
+
+    Each reply counts ``0.5 ** (gap / half_life)`` with a half-life, 1 otherwise.
+    """
+    weights = np.power(0.5, pairs.gaps / half_life) if half_life else np.ones(len(pairs.gaps))
+    return _aggregate(pairs.repliers, pairs.targets, weights, directed)
+
+
+def mention_edges(codes: np.ndarray, entries: np.ndarray, mention_indptr: np.ndarray,
+                  mention_codes: np.ndarray) -> EdgeList:
+    """Directed edges from each sender to the senders they @-mention
+
+    ``entries`` are the positions of the messages (with sender ``codes``) in
+    the CSR mention arrays.
+    """
+    starts, ends = mention_indptr[entries], mention_indptr[entries + 1]
+    counts = ends - starts
+    offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+    mentioned = mention_codes[np.arange(int(counts.sum())) + offsets]
+    senders = np.repeat(codes, counts)
+
+    mask = senders != mentioned
+    return _aggregate(senders[mask], mentioned[mask], np.ones(int(mask.sum())), True)
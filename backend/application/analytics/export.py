@@ -0,0 +1,170 @@
+import csv
+import dataclasses
+import io
+import typing
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from application.dtos.network_dto import NetworkGraphDTO, NodeDTO
+
+# Size of the text chunks handed to the response stream
+CHUNK_SIZE = 64 * 1024
+
+_GEXF_TYPES = {bool: "boolean", int: "integer", float: "double", str: "string"}
+_GRAPHML_TYPES = {bool: "boolean", int: "int", float: "double", str: "string"}
+
+
+class ExportFormat(NamedTuple):
+    """Streaming writer together with its HTTP metadata"""
+    writer: Callable[[NetworkGraphDTO], Iterator[str]]
+    media_type: str
+    extension: str
+
+
+def _node_attributes() -> List[Tuple[str, type]]:
+    """Exportable node fields (everything except the id) and their base type"""
+    hints = typing.get_type_hints(NodeDTO)
+    attributes = []
+    for field in dataclasses.fields(NodeDTO):
+        if field.name == "id":
+            continue
+        annotation = hints[field.name]
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        attributes.append((field.name, args[0] if args else annotation))
+    return attributes
+
+
+def _format_value(value: Any) -> str:
+    """Render an attribute value the way XML graph formats expect it"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _chunked(parts: Iterable[str]) -> Iterator[str]:
+    """Join small string fragments into chunks of roughly CHUNK_SIZE characters"""
+    buffer: List[str] = []
+    size = 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _gexf_parts(graph: NetworkGraphDTO) -> Iterator[str]:
+    attributes = _node_attributes()
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<gexf xmlns="http://gexf.net/1.3" version="1.3">\n'
+    yield f'  <graph defaultedgetype="{"directed" if graph.directed else "undirected"}" mode="static">\n'
+    yield '    <attributes class="node">\n'
+    for name, base in attributes:
+        yield f'      <attribute id="{name}" title="{name}" type="{_GEXF_TYPES.get(base, "string")}"/>\n'
+    yield '    </attributes>\n'
+
+    yield '    <nodes>\n'
+    for node in graph.nodes:
+        node_id = quoteattr(str(node.id))
+        yield f'      <node id={node_id} label={node_id}>\n        <attvalues>\n'
+        for name, _ in attributes:
+            value = getattr(node, name)
+            if value is not None:
+                yield f'          <attvalue for="{name}" value={quoteattr(_format_value(value))}/>\n'
+        yield '        </attvalues>\n      </node>\n'
+    yield '    </nodes>\n'
+
+    yield '    <edges>\n'
+    for index, link in enumerate(graph.links):
+        yield (f'      <edge id="{index}" source={quoteattr(str(link.source))} '
+               f'target={quoteattr(str(link.target))} weight="{link.weight}"/>\n')
+    yield '    </edges>\n'
+    yield '  </graph>\n</gexf>\n'
+
+
+def _graphml_parts(graph: NetworkGraphDTO) -> Iterator[str]:
+    attributes = _node_attributes()
+
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    for name, base in attributes:
+        yield (f'  <key id="{name}" for="node" attr.name="{name}" '
+               f'attr.type="{_GRAPHML_TYPES.get(base, "string")}"/>\n')
+    yield '  <key id="weight" for="edge" attr.name="weight" attr.type="double"/>\n'
+    yield f'  <graph id="G" edgedefault="{"directed" if graph.directed else "undirected"}">\n'
+
+    for node in graph.nodes:
+        yield f'    <node id={quoteattr(str(node.id))}>'
+        for name, _ in attributes:
+            value = getattr(node, name)
+            if value is not None:
+                yield f'<data key="{name}">{escape(_format_value(value))}</data>'
+        yield '</node>\n'
+
+    for link in graph.links:
+        yield (f'    <edge source={quoteattr(str(link.source))} target={quoteattr(str(link.target))}>'
+               f'<data key="weight">{link.weight}</data></edge>\n')
+
+    yield '  </graph>\n</graphml>\n'
+
+
+def _csv_rows(header: List[str], rows: Iterable[List[Any]]) -> Iterator[str]:
+    """Write CSV rows into a reusable buffer, draining it whenever it fills up"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_gexf(graph: NetworkGraphDTO) -> Iterator[str]:
+    """Stream a graph as GEXF 1.3 (Gephi)"""
+    return _chunked(_gexf_parts(graph))
+
+
+def iter_graphml(graph: NetworkGraphDTO) -> Iterator[str]:
+    """Stream a graph as GraphML"""
+    return _chunked(_graphml_parts(graph))
+
+
+def iter_edge_csv(graph: NetworkGraphDTO) -> Iterator[str]:
+    """Stream the edge list as CSV (source, target, weight)"""
+    return _csv_rows(
+        ["source", "target", "weight"],
+        ([link.source, link.target, link.weight] for link in graph.links)
+    )
+
+
+def iter_node_csv(graph: NetworkGraphDTO) -> Iterator[str]:
+    """Stream the node table with all metrics as CSV"""
+    names = [name for name, _ in _node_attributes()]
+    return _csv_rows(
+        ["id"] + names,
+        ([node.id] + ["" if getattr(node, name) is None else getattr(node, name) for name in names]
+         for node in graph.nodes)
+    )
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "gexf": ExportFormat(iter_gexf, "application/gexf+xml", "gexf"),
+    "graphml": ExportFormat(iter_graphml, "application/graphml+xml", "graphml"),
+    "csv": ExportFormat(iter_edge_csv, "text/csv", "csv"),
+    "nodes_csv": ExportFormat(iter_node_csv, "text/csv", "csv"),
+}
+
+
+def get_export_format(name: str) -> ExportFormat:
+    """Look up an export format by name"""
+    export_format = EXPORT_FORMATS.get(name.lower())
+    if not export_format:
+        raise ValueError(f"Unsupported export format '{name}'. Use one of: {', '.join(EXPORT_FORMATS)}")
+    return export_format
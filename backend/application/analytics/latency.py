@@ -0,0 +1,53 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from application.analytics.edges import ReplyPairs
+from application.analytics.sketches import TDigest, grouped_digests
+from config.settings import settings
+
+# Quantiles reported for every sketch
+LATENCY_QUANTILES = {"median": 0.5, "p90": 0.9}
+
+
+def _merge_into(target: Dict, digests: Dict) -> None:
+    for key, digest in digests.items():
+        target[key] = target[key].merge(digest) if key in target else digest
+
+
+def reply_latency_digests(pairs: ReplyPairs, directed: bool = False
+                          ) -> Tuple[Dict[Tuple[int, int], TDigest], Dict[int, TDigest]]:
+    """Reply-latency sketches per edge and per replying sender
+
+    Replies are consumed in chunks of ``LATENCY_CHUNK_SIZE``; each chunk is
+    sketched in one vectorized pass and merged into the running digests, so
+    memory is bounded by the number of edges rather than the number of
+    replies. Edge keys are sender-code pairs, unordered (``min, max``) unless
+    ``directed``.
+    """
+    edges: Dict[Tuple[int, int], TDigest] = {}
+    nodes: Dict[int, TDigest] = {}
+    if len(pairs.gaps) == 0:
+        return edges, nodes
+
+    size = int(max(pairs.repliers.max(), pairs.targets.max())) + 1
+    chunk = settings.LATENCY_CHUNK_SIZE
+    for start in range(0, len(pairs.gaps), chunk):
+        repliers = pairs.repliers[start:start + chunk]
+        targets = pairs.targets[start:start + chunk]
+        gaps = pairs.gaps[start:start + chunk]
+        if not directed:
+            repliers, targets = np.minimum(repliers, targets), np.maximum(repliers, targets)
+        _merge_into(edges, {
+            divmod(key, size): digest for key, digest in grouped_digests(repliers * size + targets, gaps).items()
+        })
+        _merge_into(nodes, grouped_digests(pairs.repliers[start:start + chunk], gaps))
+    return edges, nodes
+
+
+def latency_fields(digest: Optional[TDigest]) -> Dict[str, Optional[float]]:
+    """DTO fields (``latency_median``, ``latency_p90``) of a sketch, in seconds"""
+    return {
+        f"latency_{name}": round(digest.quantile(q), 2) if digest is not None else None
+        for name, q in LATENCY_QUANTILES.items()
+    }
@@ -0,0 +1,189 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from application.analytics.adjacency import CompactGraph
+from application.analytics.analysis import GraphAnalysis
+
+Positions = Dict[str, Tuple[float, float]]
+
+
+def _spread_bits(v: np.ndarray) -> np.ndarray:
+    """Insert a zero bit between each of the lower 16 bits of ``v``"""
+    v = v.astype(np.uint64) & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+class _QuadTree:
+    """Level-by-level quadtree over Morton codes
+
+    Every level stores the sorted keys of its non-empty cells with their mass
+    and centre of mass, which is all Barnes-Hut needs. The tree is traversed
+    for all nodes at once, one level per step.
+    """
+
+    def __init__(self, pos: np.ndarray, depth: int):
+        self.depth = depth
+        lower = pos.min(axis=0)
+        self.width = max(float((pos.max(axis=0) - lower).max()), 1e-9) * (1 + 1e-9)
+
+        side = 1 << depth
+        cells = np.clip(((pos - lower) / self.width * side).astype(np.int64), 0, side - 1)
+        codes = (_spread_bits(cells[:, 0]) | (_spread_bits(cells[:, 1]) << np.uint64(1))).astype(np.int64)
+
+        self.levels = []
+        for level in range(depth + 1):
+            node_keys = codes >> (2 * (depth - level))
+            keys, inverse = np.unique(node_keys, return_inverse=True)
+            mass = np.bincount(inverse, minlength=len(keys)).astype(np.float64)
+            com = np.stack([
+                np.bincount(inverse, weights=pos[:, 0], minlength=len(keys)),
+                np.bincount(inverse, weights=pos[:, 1], minlength=len(keys)),
+            ], axis=1) / mass[:, None]
+            self.levels.append((keys, mass, com, node_keys))
+
+        # Children of a cell are contiguous in the sorted keys of the next level
+        self.children = []
+        for level in range(depth):
+            keys, next_keys = self.levels[level][0], self.levels[level + 1][0]
+            start = np.searchsorted(next_keys, keys * 4)
+            self.children.append((start, np.searchsorted(next_keys, keys * 4 + 4) - start))
+
+    def repulsion(self, pos: np.ndarray, k2: float, theta: float) -> np.ndarray:
+        """Approximate the sum of ``k^2 / d`` repulsive forces acting on every node"""
+        n = len(pos)
+        force_x = np.zeros(n)
+        force_y = np.zeros(n)
+
+        node_idx = np.arange(n)
+        cell_idx = np.zeros(n, dtype=np.int64)
+
+        for level in range(self.depth + 1):
+            keys, mass, com, node_keys = self.levels[level]
+            delta = pos[node_idx] - com[cell_idx]
+            dist2 = np.einsum("ij,ij->i", delta, delta)
+            contains = node_keys[node_idx] == keys[cell_idx]
+
+            if level == self.depth:
+                # Leaves are resolved exactly, with the node's own mass taken out of its cell
+                others = mass[cell_idx] - contains
+                valid = others > 0
+                own = np.where(contains[:, None], pos[node_idx], 0.0)
+                centre = (com[cell_idx] * mass[cell_idx, None] - own)[valid] / others[valid, None]
+                delta = pos[node_idx[valid]] - centre
+                dist2 = np.maximum(np.einsum("ij,ij->i", delta, delta), 1e-12)
+                scale = k2 * others[valid] / dist2
+                force_x += np.bincount(node_idx[valid], weights=delta[:, 0] * scale, minlength=n)
+                force_y += np.bincount(node_idx[valid], weights=delta[:, 1] * scale, minlength=n)
+                break
+
+            size = self.width / (1 << level)
+            far = ~contains & (size * size < theta * theta * dist2)
+            if far.any():
+                scale = k2 * mass[cell_idx[far]] / np.maximum(dist2[far], 1e-12)
+                force_x += np.bincount(node_idx[far], weights=delta[far, 0] * scale, minlength=n)
+                force_y += np.bincount(node_idx[far], weights=delta[far, 1] * scale, minlength=n)
+
+            # Open every cell that is too close, except a node's own cell once nothing else is in it
+            near = ~far & ~(contains & (mass[cell_idx] == 1))
+            start, count = self.children[level]
+            parents = cell_idx[near]
+            counts = count[parents]
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            node_idx = np.repeat(node_idx[near], counts)
+            cell_idx = np.repeat(start[parents], counts) + offsets
+            if not len(node_idx):
+                break
+
+        return np.stack([force_x, force_y], axis=1)
+
+
+def _initial_positions(graph: CompactGraph, seed_positions: Optional[Positions],
+                       rng: np.random.Generator) -> Tuple[np.ndarray, bool]:
+    """Start from previous positions where known, placing new nodes next to their seeded neighbours"""
+    n = graph.node_count
+    pos = rng.random((n, 2))
+    if not seed_positions:
+        return pos, False
+
+    seeded = np.zeros(n, dtype=bool)
+    for node_id, (x, y) in seed_positions.items():
+        i = graph.index.get(node_id)
+        if i is not None:
+            pos[i] = (x, y)
+            seeded[i] = True
+
+    if not seeded.any():
+        return pos, False
+
+    adjacency = (graph.matrix > 0).astype(np.float64)
+    neighbour_count = adjacency @ seeded.astype(np.float64)
+    neighbour_sum = adjacency @ (pos * seeded[:, None])
+    placeable = ~seeded & (neighbour_count > 0)
+    jitter = (rng.random((int(placeable.sum()), 2)) - 0.5) * 0.05
+    pos[placeable] = neighbour_sum[placeable] / neighbour_count[placeable, None] + jitter
+    return pos, True
+
+
+def force_layout(graph: CompactGraph, iterations: int = 100, seed_positions: Optional[Positions] = None,
+                 theta: float = 1.0, gravity: float = 1.0, seed: int = 42) -> np.ndarray:
+    """Fruchterman-Reingold layout with Barnes-Hut repulsion
+
+    Repulsion is approximated on a quadtree in O(n log n) per iteration and
+    attraction is evaluated over the edge arrays. When ``seed_positions`` are
+    given the layout starts from them with a lower temperature, so small filter
+    changes only nudge the existing picture.
+    """
+    n = graph.node_count
+    rng = np.random.default_rng(seed)
+    pos, seeded = _initial_positions(graph, seed_positions, rng)
+    if n < 2:
+        return pos
+
+    k = np.sqrt(1.0 / n)
+    depth = min(16, int(np.ceil(np.log2(n) / 2)) + 3)
+    weights = graph.weights / graph.weights.mean() if graph.edge_count else graph.weights
+
+    temperature = 0.02 if seeded else 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        force = _QuadTree(pos, depth).repulsion(pos, k * k, theta)
+
+        if graph.edge_count:
+            delta = pos[graph.sources] - pos[graph.targets]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            pull = delta * (dist * weights / k)[:, None]
+            force[:, 0] -= np.bincount(graph.sources, weights=pull[:, 0], minlength=n)
+            force[:, 1] -= np.bincount(graph.sources, weights=pull[:, 1], minlength=n)
+            force[:, 0] += np.bincount(graph.targets, weights=pull[:, 0], minlength=n)
+            force[:, 1] += np.bincount(graph.targets, weights=pull[:, 1], minlength=n)
+
+        # Weak pull towards the centre keeps disconnected components together
+        force -= gravity * k * (pos - pos.mean(axis=0))
+
+        length = np.maximum(np.sqrt(np.einsum("ij,ij->i", force, force)), 1e-12)
+        pos += force * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    return pos
+
+
+def layout_positions(analysis: GraphAnalysis, iterations: int,
+                     seed_positions: Optional[Positions] = None) -> Positions:
+    """Node coordinates of an analysed graph, cached on the analysis per iteration budget"""
+    key = ("layout", iterations)
+    positions: Optional[Positions] = analysis.derived.get(key)
+    if positions is None:
+        graph = analysis.adjacency
+        coordinates = force_layout(graph, iterations, seed_positions)
+        positions = {
+            node_id: (round(float(x), 4), round(float(y), 4))
+            for node_id, (x, y) in zip(graph.node_ids, coordinates)
+        }
+        analysis.derived[key] = positions
+    return positions
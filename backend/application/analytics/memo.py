@@ -0,0 +1,51 @@
+import hashlib
+import json
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import networkx as nx
+
+from infrastructure.cache.analysis_cache import AnalysisCache
+
+# Metric name -> node id -> value
+Centralities = Dict[str, Dict[str, float]]
+
+
+def structure_hash(g: nx.Graph, weight: Optional[str] = "weight") -> str:
+    """Canonical SHA-256 of a graph's node set and weighted edge list
+
+    Nodes and edges are sorted (and the endpoints of undirected edges), so
+    graphs built in a different order (or from different filters) hash equally
+    whenever they are the same graph.
+    """
+    directed = g.is_directed()
+    nodes = sorted(str(node) for node in g.nodes())
+    edges = sorted(
+        (str(u), str(v), data if weight else 1) if directed else
+        (min(str(u), str(v)), max(str(u), str(v)), data if weight else 1)
+        for u, v, data in g.edges(data=weight, default=1)
+    )
+    payload = json.dumps([directed, nodes, edges], separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def memoized_centralities(cache: AnalysisCache, recipe: str, g: nx.Graph, weight: Optional[str],
+                          compute: Callable[[], Tuple[Centralities, Dict[str, Any]]],
+                          refresh: bool = False) -> Tuple[Centralities, Dict[str, Any]]:
+    """Centralities of a graph, shared by every query that produces the same structure
+
+    ``recipe`` names the set of metrics ``compute`` returns, so services that
+    compute centralities differently never share entries. Returns the metrics
+    and a report with the structure hash, whether it was a memo hit and the
+    timings of the run that computed the metrics. With ``refresh`` the
+    metrics are computed again and replace the memoized ones.
+    """
+    digest = structure_hash(g, weight)
+    key = cache.make_key("structure", recipe, digest)
+    entry = None if refresh else cache.get(key)
+    memoized = entry is not None
+    if entry is None:
+        entry = compute()
+        cache.put(key, entry)
+
+    centralities, timings = entry
+    return centralities, {"structure_hash": digest, "memoized": memoized, "timings": timings}
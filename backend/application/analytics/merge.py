@@ -0,0 +1,104 @@
+import dataclasses
+import re
+from itertools import combinations
+from typing import Callable, Dict, List, NamedTuple, Set
+
+import networkx as nx
+
+from application.dtos.network_dto import NetworkGraphDTO
+from application.dtos.research_dto import SourceOverlapDTO, SourceSummaryDTO
+
+# Direction marks, isolates and the "~" WhatsApp puts before unsaved contacts
+_DECORATIONS = str.maketrans("", "", "~\u200e\u200f\u202a\u202b\u202c\u202d\u202e\u2066\u2067\u2068\u2069")
+
+# Number of participants listed in a source summary
+SUMMARY_TOP_PARTICIPANTS = 5
+
+
+def participant_key(name: str) -> str:
+    """Normalized participant name matching the same person across sources
+
+    Case, surrounding and repeated whitespace and invisible formatting
+    characters are ignored; phone numbers match on their digits.
+    """
+    name = " ".join(name.translate(_DECORATIONS).split()).casefold()
+    if re.fullmatch(r"\+?[\d\s()\-]+", name):
+        return "+" + re.sub(r"\D", "", name)
+    return name
+
+
+class MergedNetwork(NamedTuple):
+    """Participant graph of several sources, with the sources every participant appears in"""
+    graph: nx.Graph
+    messages: Dict[str, int]
+    sources: Dict[str, Set[int]]
+    labels: Dict[str, str]
+
+
+def merge_graphs(graphs: List[NetworkGraphDTO]) -> MergedNetwork:
+    """Merge source graphs on matching participants, summing messages and link weights
+
+    A participant is labelled with the first name seen for them. The merged
+    graph is directed only if every source graph is.
+    """
+    directed = bool(graphs) and all(graph.directed for graph in graphs)
+    merged = nx.DiGraph() if directed else nx.Graph()
+    labels: Dict[str, str] = {}
+    messages: Dict[str, int] = {}
+    sources: Dict[str, Set[int]] = {}
+
+    for index, graph in enumerate(graphs):
+        for node in graph.nodes:
+            label = labels.setdefault(participant_key(node.id), node.id)
+            messages[label] = messages.get(label, 0) + node.messages
+            sources.setdefault(label, set()).add(index)
+            merged.add_node(label)
+        for link in graph.links:
+            source = labels[participant_key(link.source)]
+            target = labels[participant_key(link.target)]
+            if source == target:
+                continue
+            weight = merged[source][target]["weight"] + link.weight if merged.has_edge(source, target) else link.weight
+            merged.add_edge(source, target, weight=weight)
+    return MergedNetwork(merged, messages, sources, labels)
+
+
+def summarize(graph: NetworkGraphDTO) -> SourceSummaryDTO:
+    """Size, density and most central participants (by PageRank) of a graph"""
+    n = len(graph.nodes)
+    m = len(graph.links)
+    pairs = n * (n - 1) if graph.directed else n * (n - 1) / 2
+    top = sorted(graph.nodes, key=lambda node: node.pagerank, reverse=True)[:SUMMARY_TOP_PARTICIPANTS]
+    return SourceSummaryDTO(
+        nodes=n,
+        links=m,
+        messages=sum(node.messages for node in graph.nodes),
+        density=round(m / pairs, 4) if pairs else 0.0,
+        average_degree=round((m if graph.directed else 2 * m) / n, 4) if n else 0.0,
+        top_participants=[node.id for node in top]
+    )
+
+
+def source_overlaps(names: List[str], graphs: List[NetworkGraphDTO]) -> List[SourceOverlapDTO]:
+    """Shared participants and Jaccard similarity of every pair of sources"""
+    members = [{participant_key(node.id) for node in graph.nodes} for graph in graphs]
+    overlaps = []
+    for (a, first), (b, second) in combinations(zip(names, members), 2):
+        union = len(first | second)
+        shared = len(first & second)
+        overlaps.append(SourceOverlapDTO(
+            source_a=a, source_b=b, shared=shared, jaccard=round(shared / union, 4) if union else 0.0
+        ))
+    return overlaps
+
+
+def relabel(graph: NetworkGraphDTO, label: Callable[[str], str]) -> NetworkGraphDTO:
+    """The graph with every participant renamed, supernodes and other ids kept"""
+    return dataclasses.replace(
+        graph,
+        nodes=[dataclasses.replace(node, id=label(node.id)) for node in graph.nodes],
+        links=[
+            dataclasses.replace(link, source=label(link.source), target=label(link.target))
+            for link in graph.links
+        ]
+    )
@@ -0,0 +1,63 @@
+import dataclasses
+from collections import defaultdict
+from typing import Any, Dict, Optional, Tuple
+
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.coarsening import level_of_detail
+from application.analytics.community import detect_communities
+from application.analytics.layout import Positions, layout_positions
+from application.analytics.structure import structural_metrics
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO
+from config.settings import settings
+
+
+def present_analysis(analysis: GraphAnalysis, params: NetworkAnalysisRequestDTO,
+                     seed_positions: Optional[Positions] = None) -> Tuple[NetworkGraphDTO, Optional[Positions]]:
+    """Apply the presentation options of a request to a cached analysis
+
+    Structural metrics describe the full graph and are only attached to nodes
+    that survive coarsening. Coarsening runs before the other steps, so
+    communities and coordinates describe the graph that is actually returned.
+    Every step is cached on the analysis it runs on.
+    Returns the graph and, if a layout was requested, its positions so the
+    caller can seed the next layout.
+    """
+    node_fields: Dict[str, Dict[str, Any]] = defaultdict(dict)
+    metadata: Dict[str, Any] = dict(analysis.graph.metadata or {})
+
+    if params.metrics:
+        structure = structural_metrics(analysis)
+        for node_id, clustering, core, triangles in zip(
+            analysis.adjacency.node_ids, structure.clustering, structure.core_number, structure.triangles
+        ):
+            node_fields[node_id].update(clustering=float(clustering), core_number=int(core), triangles=int(triangles))
+        metadata["structure"] = structure.summary
+
+    if params.max_nodes:
+        analysis = level_of_detail(analysis, params.max_nodes).coarse
+
+    if params.community:
+        communities = detect_communities(analysis, params.community)
+        for node_id, label in zip(analysis.adjacency.node_ids, communities.labels):
+            node_fields[node_id]["community"] = int(label)
+        metadata["community"] = {
+            "algorithm": communities.algorithm,
+            "count": communities.count,
+            "modularity": communities.modularity
+        }
+
+    positions = None
+    if params.layout:
+        iterations = min(params.layout_iterations or settings.LAYOUT_ITERATIONS, settings.LAYOUT_MAX_ITERATIONS)
+        positions = layout_positions(analysis, iterations, seed_positions)
+        for node_id, (x, y) in positions.items():
+            node_fields[node_id].update(x=x, y=y)
+
+    if not node_fields and not metadata:
+        return analysis.graph, positions
+
+    nodes = [
+        dataclasses.replace(node, **node_fields[node.id]) if node.id in node_fields else node
+        for node in analysis.graph.nodes
+    ]
+    return dataclasses.replace(analysis.graph, nodes=nodes, metadata=metadata or None), positions
@@ -0,0 +1,120 @@
+import dataclasses
+import heapq
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.structure import StructuralMetrics, structural_metrics
+from application.dtos.network_dto import LinkDTO, NetworkGraphDTO
+from config.settings import settings
+
+NODE_METRICS = ("messages", "degree", "betweenness", "closeness", "eigenvector", "pagerank")
+STRUCTURAL_METRICS = ("clustering", "core_number", "triangles")
+QUERY_METRICS = NODE_METRICS + STRUCTURAL_METRICS
+
+
+def metric_values(analysis: GraphAnalysis, metric: str) -> np.ndarray:
+    """Values of one node metric in adjacency order, cached on the analysis"""
+    if metric not in QUERY_METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Use one of: {', '.join(QUERY_METRICS)}")
+
+    key = ("metric", metric)
+    values: Optional[np.ndarray] = analysis.derived.get(key)
+    if values is None:
+        if metric in STRUCTURAL_METRICS:
+            values = getattr(structural_metrics(analysis), metric)
+        else:
+            values = np.array([getattr(node, metric) for node in analysis.graph.nodes], dtype=np.float64)
+        analysis.derived[key] = values
+    return values
+
+
+def _subgraph(analysis: GraphAnalysis, members: List[int], metadata: Dict,
+              structure: Optional[StructuralMetrics] = None) -> NetworkGraphDTO:
+    """Induced subgraph on ``members`` (kept in the given order) built from the CSR adjacency"""
+    adjacency = analysis.adjacency
+    selected = np.zeros(adjacency.node_count, dtype=bool)
+    selected[members] = True
+
+    nodes = []
+    for i in members:
+        node = analysis.graph.nodes[i]
+        if structure is not None:
+            node = dataclasses.replace(
+                node,
+                clustering=float(structure.clustering[i]),
+                core_number=int(structure.core_number[i]),
+                triangles=int(structure.triangles[i])
+            )
+        nodes.append(node)
+
+    mask = selected[adjacency.sources] & selected[adjacency.targets]
+    links = [
+        LinkDTO(source=adjacency.node_ids[s], target=adjacency.node_ids[t], weight=int(w) if w.is_integer() else w)
+        for s, t, w in zip(adjacency.sources[mask].tolist(), adjacency.targets[mask].tolist(),
+                           adjacency.weights[mask].tolist())
+    ]
+    return NetworkGraphDTO(nodes=nodes, links=links, directed=analysis.graph.directed, metadata=metadata)
+
+
+def top_nodes(analysis: GraphAnalysis, metric: str, k: int) -> NetworkGraphDTO:
+    """The ``k`` highest ranked nodes by ``metric`` (heap selection) and the links among them"""
+    values = metric_values(analysis, metric)
+    k = min(k, settings.QUERY_MAX_NODES)
+    members = heapq.nlargest(k, range(len(values)), key=values.__getitem__)
+    structure = structural_metrics(analysis) if metric in STRUCTURAL_METRICS else None
+    return _subgraph(analysis, members, {"query": {"type": "top", "metric": metric, "k": k}}, structure)
+
+
+def ego_network(analysis: GraphAnalysis, node_id: str, radius: int = 1) -> NetworkGraphDTO:
+    """Nodes within ``radius`` hops of ``node_id`` in breadth-first order
+
+    The result is cut at ``QUERY_MAX_NODES`` nodes, dropping the farthest
+    ones first; ``truncated`` in the metadata tells when that happened.
+    """
+    adjacency = analysis.adjacency
+    center = adjacency.index.get(node_id)
+    if center is None:
+        raise ValueError(f"Node '{node_id}' not found in the network")
+
+    limit = settings.QUERY_MAX_NODES
+    visited = np.zeros(adjacency.node_count, dtype=bool)
+    visited[center] = True
+    members = [center]
+    frontier = np.array([center])
+    truncated = False
+    for _ in range(radius):
+        if len(frontier) == 0:
+            break
+        neighbours = np.concatenate([adjacency.neighbors(i) for i in frontier.tolist()])
+        frontier = np.unique(neighbours[~visited[neighbours]])
+        if len(members) + len(frontier) > limit:
+            frontier = frontier[:limit - len(members)]
+            truncated = True
+        visited[frontier] = True
+        members.extend(frontier.tolist())
+        if truncated:
+            break
+
+    metadata = {"query": {"type": "ego", "node": node_id, "radius": radius, "truncated": truncated}}
+    return _subgraph(analysis, members, metadata)
+
+
+def k_core(analysis: GraphAnalysis, k: int) -> NetworkGraphDTO:
+    """Subgraph of the nodes with core number of at least ``k``
+
+    Cut at ``QUERY_MAX_NODES`` nodes, keeping those with the highest core
+    number (and degree) first.
+    """
+    structure = structural_metrics(analysis)
+    core = structure.core_number
+    members = np.flatnonzero(core >= k)
+    truncated = len(members) > settings.QUERY_MAX_NODES
+    if truncated:
+        degree = np.diff(analysis.adjacency.matrix.indptr)
+        order = np.lexsort((-degree[members], -core[members]))
+        members = members[order[:settings.QUERY_MAX_NODES]]
+
+    metadata = {"query": {"type": "k_core", "k": k, "size": int((core >= k).sum()), "truncated": truncated}}
+    return _subgraph(analysis, members.tolist(), metadata, structure)
@@ -0,0 +1,176 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from application.dtos.activity_dto import ActivityHeatmapDTO, ActivityPointDTO, ActivityQueryDTO, ActivitySeriesDTO
+
+# Bucket width of every rollup granularity, in seconds. Weeks start on Monday.
+GRANULARITIES = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+
+# The Unix epoch is a Thursday, shift weeks so that buckets start on Monday
+_WEEK_OFFSET = 3 * 86400
+
+# Bits reserved for the user code in a rollup key
+_USER_BITS = 24
+
+
+def bucket_index(seconds: np.ndarray, granularity: str) -> np.ndarray:
+    """Bucket numbers of Unix timestamps (in seconds) at a granularity"""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}'. Use one of: {', '.join(GRANULARITIES)}")
+    offset = _WEEK_OFFSET if granularity == "week" else 0
+    return (seconds + offset) // GRANULARITIES[granularity]
+
+
+def bucket_start(granularity: str, bucket: int) -> datetime:
+    """Start time of a bucket"""
+    offset = _WEEK_OFFSET if granularity == "week" else 0
+    return datetime(1970, 1, 1) + timedelta(seconds=bucket * GRANULARITIES[granularity] - offset)
+
+
+class ActivityRollup:
+    """Message count and total length per user per hour, day and week
+
+    Every granularity is a sorted array of keys ``bucket << 24 | user`` with
+    parallel ``messages`` and ``characters`` arrays. ``extend`` folds in a
+    batch of new messages with one vectorized bucketing and merge, so appends
+    only cost the new messages.
+    """
+
+    def __init__(self):
+        self.users: List[str] = []
+        self._user_index: Dict[str, int] = {}
+        self.message_total = 0
+        self.last_timestamp: Optional[np.datetime64] = None
+        self.tables: Dict[str, Dict[str, np.ndarray]] = {
+            granularity: {
+                "keys": np.zeros(0, dtype=np.int64),
+                "messages": np.zeros(0, dtype=np.int64),
+                "characters": np.zeros(0, dtype=np.int64)
+            }
+            for granularity in GRANULARITIES
+        }
+
+    def extend(self, timestamps: np.ndarray, senders: Sequence[str], lengths: np.ndarray) -> None:
+        """Add a batch of messages (timestamps as ``datetime64``, one sender name and length each)"""
+        if len(timestamps) == 0:
+            return
+        codes = np.fromiter(
+            (self._user_index.setdefault(sender, len(self._user_index)) for sender in senders),
+            dtype=np.int64, count=len(senders)
+        )
+        self.users = list(self._user_index)
+        seconds = timestamps.astype("datetime64[s]").astype(np.int64)
+        lengths = np.asarray(lengths, dtype=np.int64)
+
+        for granularity in GRANULARITIES:
+            keys = (bucket_index(seconds, granularity) << _USER_BITS) | codes
+            table = self.tables[granularity]
+            merged_keys, inverse = np.unique(np.concatenate([table["keys"], keys]), return_inverse=True)
+            table["messages"] = np.bincount(
+                inverse, weights=np.concatenate([table["messages"], np.ones(len(keys), dtype=np.int64)]),
+                minlength=len(merged_keys)
+            ).astype(np.int64)
+            table["characters"] = np.bincount(
+                inverse, weights=np.concatenate([table["characters"], lengths]), minlength=len(merged_keys)
+            ).astype(np.int64)
+            table["keys"] = merged_keys
+
+        self.message_total += len(timestamps)
+        last = timestamps.max().astype("datetime64[s]")
+        self.last_timestamp = last if self.last_timestamp is None else max(self.last_timestamp, last)
+
+    def copy(self) -> "ActivityRollup":
+        """An independent rollup to fold new messages into while this one keeps answering queries"""
+        rollup = ActivityRollup()
+        rollup.users = list(self.users)
+        rollup._user_index = dict(self._user_index)
+        rollup.message_total = self.message_total
+        rollup.last_timestamp = self.last_timestamp
+        # ``extend`` replaces the arrays of a table rather than writing into them
+        rollup.tables = {granularity: dict(table) for granularity, table in self.tables.items()}
+        return rollup
+
+    def _rows(self, granularity: str, users: Optional[Sequence[str]] = None,
+              start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """Bucket, user code and totals of the rows matching a query"""
+        first, last = bucket_range(granularity, start, end)
+        table = self.tables[granularity]
+        buckets = table["keys"] >> _USER_BITS
+        codes = table["keys"] & ((1 << _USER_BITS) - 1)
+        mask = np.ones(len(buckets), dtype=bool)
+        if first is not None:
+            mask &= buckets >= first
+        if last is not None:
+            mask &= buckets <= last
+        if users:
+            wanted = [self._user_index[user] for user in users if user in self._user_index]
+            mask &= np.isin(codes, wanted)
+        return buckets[mask], codes[mask], table["messages"][mask], table["characters"][mask]
+
+    def time_series(self, granularity: str = "day", users: Optional[Sequence[str]] = None,
+                    start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    per_user: bool = False) -> List[Dict]:
+        """Messages and characters per bucket, summed over users unless ``per_user``"""
+        buckets, codes, messages, characters = self._rows(granularity, users, start, end)
+        if not per_user:
+            codes = np.zeros(len(codes), dtype=np.int64)
+        keys, inverse = np.unique((buckets << _USER_BITS) | codes, return_inverse=True)
+        message_sums = np.bincount(inverse, weights=messages, minlength=len(keys)).astype(np.int64)
+        character_sums = np.bincount(inverse, weights=characters, minlength=len(keys)).astype(np.int64)
+
+        mask = (1 << _USER_BITS) - 1
+        return [
+            {
+                "bucket": bucket_start(granularity, key >> _USER_BITS),
+                "user": self.users[key & mask] if per_user else None,
+                "messages": int(count),
+                "characters": int(length)
+            }
+            for key, count, length in zip(keys.tolist(), message_sums, character_sums)
+        ]
+
+    def heatmap(self, users: Optional[Sequence[str]] = None,
+                start: Optional[datetime] = None, end: Optional[datetime] = None) -> np.ndarray:
+        """7 x 24 message counts by weekday (Monday first) and hour of day, from the hourly rollup"""
+        buckets, _, messages, _ = self._rows("hour", users, start, end)
+        hours = buckets % 24
+        weekdays = (buckets // 24 + 3) % 7
+        return np.bincount(weekdays * 24 + hours, weights=messages, minlength=7 * 24).astype(np.int64).reshape(7, 24)
+
+
+def bucket_range(granularity: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Tuple[Optional[int], Optional[int]]:
+    """First and last bucket overlapping a time range (``None`` where it is open)"""
+    moments = np.array([start or 0, end or 0], dtype="datetime64[s]").astype(np.int64)
+    first, last = bucket_index(moments, granularity).tolist()
+    return (first if start else None), (last if end else None)
+
+
+def date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Start of the first and end of the last day of a ``YYYY-MM-DD`` date range"""
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
+        end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1, seconds=-1) if end_date else None
+    except ValueError:
+        raise ValueError("Dates must be given as YYYY-MM-DD")
+    return start, end
+
+
+def _query_users(query: ActivityQueryDTO) -> Optional[List[str]]:
+    return [user.strip() for user in query.users.split(",") if user.strip()] if query.users else None
+
+
+def activity_series(rollup: ActivityRollup, query: ActivityQueryDTO) -> ActivitySeriesDTO:
+    """Answer a time-series query from a rollup"""
+    start, end = date_range(query.start_date, query.end_date)
+    points = rollup.time_series(query.granularity, _query_users(query), start, end, query.per_user)
+    return ActivitySeriesDTO(granularity=query.granularity, points=[ActivityPointDTO(**point) for point in points])
+
+
+def activity_heatmap(rollup: ActivityRollup, query: ActivityQueryDTO) -> ActivityHeatmapDTO:
+    """Answer a weekday x hour heatmap query from a rollup"""
+    start, end = date_range(query.start_date, query.end_date)
+    counts = rollup.heatmap(_query_users(query), start, end)
+    return ActivityHeatmapDTO(counts=counts.tolist(), total=int(counts.sum()))
@@ -0,0 +1,229 @@
+import hashlib
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+from config.settings import settings
+
+
+def _compress(groups: np.ndarray, means: np.ndarray, weights: np.ndarray,
+              compression: float) -> tuple:
+    """Merge adjacent centroids of every group under the t-digest k1 scale function
+
+    Centroids are sorted by ``(group, mean)``; each one is assigned to the
+    bucket ``floor(compression * (asin(2q - 1) / pi + 1/2))`` of its quantile
+    midpoint ``q`` within its group, and the centroids sharing a bucket are
+    merged into their weighted mean. Buckets are narrow at both tails, which
+    keeps extreme quantiles accurate with at most ``compression + 1``
+    centroids per group. All groups are compressed in one vectorized pass.
+    """
+    order = np.lexsort((means, groups))
+    groups, means, weights = groups[order], means[order], weights[order]
+
+    cumulative = np.cumsum(weights)
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    lengths = np.diff(np.r_[starts, len(groups)])
+    offset = np.repeat(cumulative[starts] - weights[starts], lengths)
+    totals = np.repeat(np.add.reduceat(weights, starts), lengths)
+
+    q = (cumulative - offset - weights / 2) / totals
+    buckets = np.floor(compression * (np.arcsin(np.clip(2 * q - 1, -1, 1)) / np.pi + 0.5)).astype(np.int64)
+
+    keys = np.r_[True, (groups[1:] != groups[:-1]) | (buckets[1:] != buckets[:-1])]
+    boundaries = np.flatnonzero(keys)
+    merged_weights = np.add.reduceat(weights, boundaries)
+    merged_means = np.add.reduceat(means * weights, boundaries) / merged_weights
+    return groups[boundaries], merged_means, merged_weights
+
+
+class TDigest:
+    """Mergeable streaming quantile sketch (merging t-digest)
+
+    Holds at most about ``compression`` weighted centroids plus the exact
+    minimum and maximum, regardless of how many values were added. Two
+    digests built from disjoint parts of a stream (parse chunks, time
+    windows) merge into the digest of the whole stream.
+    """
+
+    def __init__(self, means: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None,
+                 minimum: float = np.inf, maximum: float = -np.inf, compression: Optional[float] = None):
+        self.compression = compression or settings.LATENCY_SKETCH_COMPRESSION
+        self.means = means if means is not None else np.zeros(0)
+        self.weights = weights if weights is not None else np.zeros(0)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, compression: Optional[float] = None) -> "TDigest":
+        """Build a digest from a batch of values"""
+        digests = grouped_digests(np.zeros(len(values), dtype=np.int64), values, compression)
+        return digests.get(0) or cls(compression=compression)
+
+    @classmethod
+    def merge_all(cls, digests: Iterable["TDigest"]) -> "TDigest":
+        """Merge any number of digests into a new one"""
+        digests = [digest for digest in digests if len(digest.means)]
+        if not digests:
+            return cls()
+        compression = max(digest.compression for digest in digests)
+        means = np.concatenate([digest.means for digest in digests])
+        weights = np.concatenate([digest.weights for digest in digests])
+        _, means, weights = _compress(np.zeros(len(means), dtype=np.int64), means, weights, compression)
+        return cls(
+            means, weights,
+            min(digest.minimum for digest in digests), max(digest.maximum for digest in digests), compression
+        )
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Digest of the values of both digests"""
+        return TDigest.merge_all([self, other])
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the ``q`` quantile (0..1) by interpolating between centroid midpoints"""
+        if len(self.means) == 0:
+            return None
+        if len(self.means) == 1:
+            return float(self.means[0])
+        total = self.weights.sum()
+        positions = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(
+            q * total,
+            np.r_[0.0, positions, total],
+            np.r_[self.minimum, self.means, self.maximum]
+        ))
+
+
+def grouped_digests(groups: np.ndarray, values: np.ndarray,
+                    compression: Optional[float] = None) -> Dict[int, TDigest]:
+    """One digest per group id, all built in a single vectorized compression"""
+    if len(values) == 0:
+        return {}
+    values = values.astype(np.float64)
+    groups = groups.astype(np.int64)
+
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    minima = np.minimum.reduceat(values[order], starts)
+    maxima = np.maximum.reduceat(values[order], starts)
+
+    compression = compression or settings.LATENCY_SKETCH_COMPRESSION
+    centroid_groups, means, weights = _compress(groups, values, np.ones(len(values)), compression)
+    bounds = np.flatnonzero(np.r_[True, centroid_groups[1:] != centroid_groups[:-1], True])
+    return {
+        int(centroid_groups[start]): TDigest(
+            means[start:end], weights[start:end], float(minimum), float(maximum), compression
+        )
+        for start, end, minimum, maximum in zip(bounds[:-1], bounds[1:], minima, maxima)
+    }
+
+
+def term_hashes(terms: Sequence[str]) -> np.ndarray:
+    """Stable 64-bit hashes of terms, the shared input of the count-min sketch and HyperLogLog"""
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little") for term in terms),
+        dtype=np.uint64, count=len(terms)
+    )
+
+
+# Odd multipliers of the count-min rows (multiply-shift hashing); fixed so that sketches always merge
+_ROW_MULTIPLIERS = (
+    np.random.default_rng(0x5EED).integers(1, 2 ** 63, size=64, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+)
+
+
+class CountMinSketch:
+    """Approximate counts of arbitrarily many keys in ``depth x width`` counters
+
+    Every row maps a 64-bit key hash to one counter; a key's estimate is
+    the minimum of its counters, which never undercounts and overcounts by
+    at most ``2 / width`` of the total with probability ``1 - 2 ** -depth``.
+    Sketches of the same shape merge by adding their tables.
+    """
+
+    def __init__(self, width: Optional[int] = None, depth: Optional[int] = None):
+        self.width = width or settings.TEXT_STATS_SKETCH_WIDTH
+        self.depth = min(depth or settings.TEXT_STATS_SKETCH_DEPTH, len(_ROW_MULTIPLIERS))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        """Counter index of every hash in every row (``depth x len(hashes)``)"""
+        products = hashes[np.newaxis, :] * _ROW_MULTIPLIERS[:self.depth, np.newaxis]
+        return ((products >> np.uint64(32)) % np.uint64(self.width)).astype(np.int64)
+
+    def add(self, hashes: np.ndarray, counts: np.ndarray) -> None:
+        """Count every hash ``counts`` times (hashes may repeat)"""
+        for row, columns in enumerate(self._columns(hashes)):
+            self.table[row] += np.bincount(columns, weights=counts, minlength=self.width).astype(np.int64)
+
+    def estimate(self, hashes: np.ndarray) -> np.ndarray:
+        """Estimated count of every hash"""
+        if len(hashes) == 0:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, np.newaxis], columns].min(axis=0)
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        """Sketch of the counts of both sketches"""
+        if self.table.shape != other.table.shape:
+            raise ValueError("Only count-min sketches of the same width and depth can be merged")
+        merged = CountMinSketch(self.width, self.depth)
+        merged.table = self.table + other.table
+        return merged
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Position of the highest set bit of every ``uint64`` (0 for zero), by binary search over shifts"""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[high] += shift
+        values[high] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """Approximate number of distinct keys in ``2 ** precision`` one-byte registers
+
+    The first ``precision`` bits of a 64-bit hash pick a register, which keeps
+    the largest position of the first set bit among the remaining bits. The
+    relative error is about ``1.04 / sqrt(2 ** precision)``. Sketches of the
+    same precision merge by taking the register-wise maximum.
+    """
+
+    def __init__(self, precision: Optional[int] = None):
+        self.precision = precision or settings.TEXT_STATS_HLL_PRECISION
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Add a batch of hashes"""
+        if len(hashes) == 0:
+            return
+        rest_bits = 64 - self.precision
+        indices = (hashes >> np.uint64(rest_bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        ranks = (rest_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, indices, ranks)
+
+    def count(self) -> int:
+        """Estimated number of distinct hashes added, with linear counting for small cardinalities"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Sketch of the union of both sketches"""
+        if self.precision != other.precision:
+            raise ValueError("Only HyperLogLog sketches of the same precision can be merged")
+        merged = HyperLogLog(self.precision)
+        merged.registers = np.maximum(self.registers, other.registers)
+        return merged
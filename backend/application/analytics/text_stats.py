@@ -0,0 +1,236 @@
+import re
+from functools import reduce
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from application.analytics.rollups import bucket_index, bucket_range, bucket_start, date_range
+from application.analytics.sketches import CountMinSketch, HyperLogLog, term_hashes
+from application.dtos.text_stats_dto import TermCountDTO, TermGroupDTO, TextStatsDTO, TextStatsQueryDTO
+from config.settings import settings
+
+# Runs of two or more letters, in any script
+_TERM = re.compile(r"[^\W\d_]{2,}")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased terms of a message"""
+    return _TERM.findall(text.lower())
+
+
+class TermStats:
+    """Bounded-memory term statistics of one group of messages
+
+    A count-min sketch of term frequencies, a HyperLogLog of the distinct
+    terms and the ``TEXT_STATS_TOP_TERMS`` heavy hitters, the terms with the
+    highest estimated counts. Memory is fixed by the sketch settings no
+    matter how much text is added.
+    """
+
+    def __init__(self):
+        self.frequencies = CountMinSketch()
+        self.distinct = HyperLogLog()
+        self.heavy_hitters: Dict[str, int] = {}
+        self.messages = 0
+        self.terms = 0
+
+    def add(self, terms: Sequence[str], hashes: np.ndarray, counts: np.ndarray, messages: int = 0) -> None:
+        """Add a batch of distinct terms (with their hashes) and how often each occurred"""
+        self.messages += messages
+        if len(hashes) == 0:
+            return
+        self.frequencies.add(hashes, counts)
+        self.distinct.add(hashes)
+        self.terms += int(counts.sum())
+
+        # A term outside the batch's own top ranks cannot enter the overall top ranks
+        capacity = settings.TEXT_STATS_TOP_TERMS
+        candidates = np.arange(len(hashes))
+        if len(candidates) > capacity:
+            candidates = np.argpartition(-self.frequencies.estimate(hashes), capacity)[:capacity]
+        for i in candidates.tolist():
+            self.heavy_hitters[terms[i]] = int(hashes[i])
+        self._trim()
+
+    def _trim(self) -> None:
+        """Keep the heavy hitters with the highest current estimates"""
+        capacity = settings.TEXT_STATS_TOP_TERMS
+        if len(self.heavy_hitters) <= capacity:
+            return
+        terms = list(self.heavy_hitters)
+        estimates = self.frequencies.estimate(np.fromiter(self.heavy_hitters.values(), dtype=np.uint64))
+        self.heavy_hitters = {
+            terms[i]: self.heavy_hitters[terms[i]] for i in np.argpartition(-estimates, capacity)[:capacity].tolist()
+        }
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """The ``k`` heavy hitters with the highest estimated counts"""
+        terms = list(self.heavy_hitters)
+        estimates = self.frequencies.estimate(np.fromiter(self.heavy_hitters.values(), dtype=np.uint64))
+        order = sorted(range(len(terms)), key=lambda i: (-estimates[i], terms[i]))[:k]
+        return [(terms[i], int(estimates[i])) for i in order]
+
+    def merge(self, other: "TermStats") -> "TermStats":
+        """Statistics of the messages of both"""
+        merged = TermStats()
+        merged.frequencies = self.frequencies.merge(other.frequencies)
+        merged.distinct = self.distinct.merge(other.distinct)
+        merged.heavy_hitters = {**self.heavy_hitters, **other.heavy_hitters}
+        merged.messages = self.messages + other.messages
+        merged.terms = self.terms + other.terms
+        merged._trim()
+        return merged
+
+    @staticmethod
+    def merge_all(stats: Iterable["TermStats"]) -> "TermStats":
+        return reduce(TermStats.merge, stats, TermStats())
+
+
+class TextStats:
+    """Term statistics of a chat, overall, per user and per time bucket
+
+    Each group holds a ``TermStats``, so memory is bounded by
+    ``TEXT_STATS_MAX_GROUPS`` times the size of one; users and buckets past
+    that limit only count towards the total and set ``truncated``.
+    Statistics of consecutive chunks of a chat merge into those of the whole.
+    """
+
+    def __init__(self, granularity: Optional[str] = None):
+        self.granularity = granularity or settings.TEXT_STATS_GRANULARITY
+        bucket_index(np.zeros(0, dtype=np.int64), self.granularity)
+        self.total = TermStats()
+        self.users: Dict[str, TermStats] = {}
+        self.buckets: Dict[int, TermStats] = {}
+        self.truncated = False
+
+    def _group(self, groups: Dict, key) -> Optional[TermStats]:
+        """The statistics of a user or bucket, created while under the group limit"""
+        stats = groups.get(key)
+        if stats is None:
+            if len(self.users) + len(self.buckets) >= settings.TEXT_STATS_MAX_GROUPS:
+                self.truncated = True
+                return None
+            stats = groups[key] = TermStats()
+        return stats
+
+    def extend(self, timestamps: np.ndarray, sender_codes: np.ndarray, senders: Sequence[str],
+               contents: Sequence[str]) -> None:
+        """Add a batch of messages; ``sender_codes`` index into ``senders``"""
+        if len(contents) == 0:
+            return
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        term_counts = np.zeros(len(contents), dtype=np.int64)
+        for i, text in enumerate(contents):
+            ids = [vocabulary.setdefault(term, len(vocabulary)) for term in tokenize(text)]
+            term_ids.extend(ids)
+            term_counts[i] = len(ids)
+        terms = list(vocabulary)
+        hashes = term_hashes(terms)
+        term_ids = np.array(term_ids, dtype=np.int64)
+        owners = np.repeat(np.arange(len(contents)), term_counts)
+
+        buckets = bucket_index(timestamps.astype("datetime64[s]").astype(np.int64), self.granularity)
+        groupings = [
+            ({None: self.total}, np.zeros(len(contents), dtype=np.int64), [None]),
+            (self.users, np.asarray(sender_codes, dtype=np.int64), list(senders))
+        ]
+        bucket_keys, bucket_codes = np.unique(buckets, return_inverse=True)
+        groupings.append((self.buckets, bucket_codes.reshape(-1), bucket_keys.tolist()))
+
+        for groups, message_groups, names in groupings:
+            token_groups = message_groups[owners]
+            keys, counts = np.unique(token_groups * len(terms) + term_ids, return_counts=True)
+            key_groups = keys // max(len(terms), 1)
+            bounds = np.flatnonzero(np.r_[True, key_groups[1:] != key_groups[:-1], True]) if len(keys) else []
+            segments = {int(key_groups[start]): (start, end) for start, end in zip(bounds[:-1], bounds[1:])}
+
+            messages = np.bincount(message_groups)
+            for code in np.flatnonzero(messages).tolist():
+                stats = groups.get(None) if names[code] is None else self._group(groups, names[code])
+                if stats is None:
+                    continue
+                start, end = segments.get(code, (0, 0))
+                ids = keys[start:end] % max(len(terms), 1)
+                stats.add([terms[i] for i in ids.tolist()], hashes[ids], counts[start:end], int(messages[code]))
+
+    def merge(self, other: "TextStats") -> "TextStats":
+        """Statistics of the messages of both"""
+        if self.granularity != other.granularity:
+            raise ValueError("Only text statistics of the same granularity can be merged")
+        merged = TextStats(self.granularity)
+        merged.total = self.total.merge(other.total)
+        merged.truncated = self.truncated or other.truncated
+        for source, target in ((self.users, merged.users), (self.buckets, merged.buckets)):
+            target.update(source)
+        for source, target in ((other.users, merged.users), (other.buckets, merged.buckets)):
+            for key, stats in source.items():
+                if key in target:
+                    target[key] = target[key].merge(stats)
+                elif merged._group(target, key) is not None:
+                    target[key] = stats
+        return merged
+
+
+def build_text_stats(timestamps: np.ndarray, sender_codes: np.ndarray, senders: Sequence[str],
+                     contents: Sequence[str]) -> TextStats:
+    """Text statistics of a sequence of messages, sketched ``TEXT_STATS_CHUNK_SIZE`` messages at a time
+
+    Each chunk is sketched on its own and merged into the running
+    statistics, so peak memory is one chunk's vocabulary on top of the
+    bounded sketches.
+    """
+    stats = TextStats()
+    chunk = settings.TEXT_STATS_CHUNK_SIZE
+    for start in range(0, len(contents), chunk):
+        part = TextStats(stats.granularity)
+        part.extend(timestamps[start:start + chunk], sender_codes[start:start + chunk], senders,
+                    contents[start:start + chunk])
+        stats = stats.merge(part)
+    return stats
+
+
+def _group_dto(stats: TermStats, k: int, **key) -> TermGroupDTO:
+    return TermGroupDTO(
+        messages=stats.messages,
+        terms=stats.terms,
+        distinct_terms=stats.distinct.count(),
+        top_terms=[TermCountDTO(term=term, count=count) for term, count in stats.top(k)],
+        **key
+    )
+
+
+def term_statistics(stats: TextStats, query: TextStatsQueryDTO) -> TextStatsDTO:
+    """Answer a term statistics query from the sketches
+
+    Users and time buckets are sketched separately, so a query can select or
+    group by users or by dates, but not both.
+    """
+    users = [user.strip() for user in query.users.split(",") if user.strip()] if query.users else None
+    start, end = date_range(query.start_date, query.end_date)
+    if (users or query.per_user) and (start or end or query.per_bucket):
+        raise ValueError("Term statistics are kept per user or per time bucket, query by one of them")
+    k = min(query.k, settings.TEXT_STATS_TOP_TERMS)
+
+    first, last = bucket_range(stats.granularity, start, end)
+    buckets = sorted(
+        bucket for bucket in stats.buckets
+        if (first is None or bucket >= first) and (last is None or bucket <= last)
+    )
+    if users:
+        total = TermStats.merge_all(stats.users[user] for user in users if user in stats.users)
+    elif start or end:
+        total = TermStats.merge_all(stats.buckets[bucket] for bucket in buckets)
+    else:
+        total = stats.total
+
+    groups = []
+    if query.per_user:
+        groups = [_group_dto(stats.users[user], k, user=user) for user in users or stats.users if user in stats.users]
+    elif query.per_bucket:
+        groups = [
+            _group_dto(stats.buckets[bucket], k, bucket=bucket_start(stats.granularity, bucket)) for bucket in buckets
+        ]
+    return TextStatsDTO(
+        granularity=stats.granularity, total=_group_dto(total, k), groups=groups, truncated=stats.truncated
+    )
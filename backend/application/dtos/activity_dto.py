@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic.dataclasses import dataclass
+
+
+@dataclass
+class ActivityQueryDTO:
+    """DTO for activity rollup queries"""
+    granularity: str = "day"
+    users: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    per_user: bool = False
+
+
+@dataclass
+class ActivityPointDTO:
+    """DTO for one bucket of an activity time series"""
+    bucket: datetime
+    messages: int
+    characters: int
+    user: Optional[str] = None
+
+
+@dataclass
+class ActivitySeriesDTO:
+    """DTO for an activity time series"""
+    granularity: str
+    points: List[ActivityPointDTO]
+
+
+@dataclass
+class ActivityHeatmapDTO:
+    """DTO for message counts by weekday (rows, Monday first) and hour of day (columns)"""
+    counts: List[List[int]]
+    total: int
@@ -0,0 +1,83 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic.dataclasses import dataclass
+
+
+@dataclass
+class FileUploadDTO:
+    """DTO for a stored upload; ``attachments`` counts the media listed from a zip export"""
+    filename: str
+    size: int
+    lines: int
+    sha256: str
+    attachments: Optional[int] = None
+
+
+@dataclass
+class AttachmentDTO:
+    """DTO for a media file of a zip export and the chat entry that sent it"""
+    filename: str
+    size: int
+    entry: Optional[int] = None
+
+
+@dataclass
+class UploadSessionCreateDTO:
+    """DTO for starting a resumable upload"""
+    filename: str
+    size: int
+    chunk_size: Optional[int] = None
+
+
+@dataclass
+class UploadSessionDTO:
+    """DTO for the state of a resumable upload; chunk ``i`` starts at byte ``i * chunk_size``"""
+    upload_id: str
+    filename: str
+    size: int
+    chunk_size: int
+    chunk_count: int
+    received: List[int]
+    missing: List[int]
+    received_bytes: int
+
+
+@dataclass
+class UploadChunkDTO:
+    """DTO for a stored chunk of a resumable upload"""
+    index: int
+    size: int
+    sha256: str
+
+
+@dataclass
+class UploadCompleteDTO:
+    """DTO for completing a resumable upload with the SHA-256 of the whole file"""
+    sha256: str
+
+
+@dataclass
+class FileMetadataDTO:
+    """DTO for a catalog entry: a user's file and a summary of its chat"""
+    filename: str
+    size: int
+    sha256: str
+    lines: int
+    message_count: Optional[int]
+    participants: List[str]
+    first_message_at: Optional[datetime]
+    last_message_at: Optional[datetime]
+    attachments: int
+    uploaded_at: datetime
+    ingest_status: str
+    ingest_error: Optional[str] = None
+
+
+@dataclass
+class FileListDTO:
+    """DTO for a page of a user's files"""
+    items: List[FileMetadataDTO]
+    total: int
+    offset: int
+    limit: int
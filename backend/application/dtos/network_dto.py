@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic.dataclasses import dataclass
 
@@ -13,6 +13,16 @@ class NodeDTO:
     closeness: float = 0.0
     eigenvector: float = 0.0
     pagerank: float = 0.0
+    x: Optional[float] = None
+    y: Optional[float] = None
+    member_count: Optional[int] = None
+    community: Optional[int] = None
+    clustering: Optional[float] = None
+    core_number: Optional[int] = None
+    triangles: Optional[int] = None
+    latency_median: Optional[float] = None
+    latency_p90: Optional[float] = None
+    sources: Optional[int] = None
 
 
 @dataclass
@@ -20,7 +30,9 @@ class LinkDTO:
     """DTO for network link"""
     source: str
     target: str
-    weight: int = 1
+    weight: Union[int, float] = 1
+    latency_median: Optional[float] = None
+    latency_p90: Optional[float] = None
 
 
 @dataclass
@@ -28,6 +40,8 @@ class NetworkGraphDTO:
     """DTO for network graph"""
     nodes: List[NodeDTO]
     links: List[LinkDTO]
+    directed: bool = False
+    metadata: Optional[Dict[str, Any]] = None
 
 
 @dataclass
@@ -47,4 +61,65 @@ class NetworkAnalysisRequestDTO:
     active_users: Optional[int] = None
     selected_users: Optional[str] = None
     username: Optional[str] = None
-    anonymize: bool = False
\ No newline at end of file
+    anonymize: bool = False
+    edge_model: str = "previous"
+    reply_window: Optional[int] = None
+    reply_window_seconds: Optional[int] = None
+    decay_half_life: Optional[float] = None
+    latency: bool = False
+    layout: bool = False
+    layout_iterations: Optional[int] = None
+    max_nodes: Optional[int] = None
+    community: Optional[str] = None
+    metrics: bool = False
+    parallel_betweenness: bool = False
+    betweenness_workers: Optional[int] = None
+
+@dataclass
+class NetworkBatchRequestDTO:
+    """DTO for evaluating many parameter sets against one source"""
+    requests: List[NetworkAnalysisRequestDTO]
+
+
+@dataclass
+class NetworkBatchResultDTO:
+    """DTO for the result of one parameter set of a batch, by its position in the request"""
+    index: int
+    graph: Optional[NetworkGraphDTO] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class NetworkDiffRequestDTO:
+    """DTO for comparing two analyses of the same source"""
+    before: NetworkAnalysisRequestDTO
+    after: NetworkAnalysisRequestDTO
+    threshold: float = 0.0
+
+
+@dataclass
+class LinkDeltaDTO:
+    """DTO for a link whose weight differs between two analyses"""
+    source: str
+    target: str
+    before: float
+    after: float
+    delta: float
+
+
+@dataclass
+class NodeDeltaDTO:
+    """DTO for the metric changes of a node present in both analyses"""
+    id: str
+    deltas: Dict[str, float]
+
+
+@dataclass
+class NetworkDiffDTO:
+    """DTO for the difference between two network graphs"""
+    added_nodes: List[str]
+    removed_nodes: List[str]
+    added_links: List[LinkDTO]
+    removed_links: List[LinkDTO]
+    weight_changes: List[LinkDeltaDTO]
+    metric_changes: List[NodeDeltaDTO]
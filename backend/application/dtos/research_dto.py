@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic.dataclasses import dataclass
 
+from application.dtos.network_dto import NetworkGraphDTO
+
 
 @dataclass
 class ResearchCreateDTO:
@@ -40,4 +42,45 @@ class ResearchUpdateDTO:
     end_date: Optional[str] = None
     message_limit: Optional[int] = None
     file_name: Optional[str] = None
-    anonymize: Optional[bool] = None
\ No newline at end of file
+    anonymize: Optional[bool] = None
+
+
+@dataclass
+class SourceSummaryDTO:
+    """DTO for the summary metrics of one analysed source"""
+    nodes: int
+    links: int
+    messages: int
+    density: float
+    average_degree: float
+    top_participants: List[str]
+
+
+@dataclass
+class ResearchSourceDTO:
+    """DTO for the analysis of one source (chat file or Wikipedia thread) of a research"""
+    source_type: str
+    source_id: str
+    graph: Optional[NetworkGraphDTO] = None
+    summary: Optional[SourceSummaryDTO] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class SourceOverlapDTO:
+    """DTO for the participants two sources have in common"""
+    source_a: str
+    source_b: str
+    shared: int
+    jaccard: float
+
+
+@dataclass
+class ResearchAnalysisDTO:
+    """DTO for the combined analysis of all the sources of a research"""
+    research_id: str
+    sources: List[ResearchSourceDTO]
+    merged: NetworkGraphDTO
+    merged_summary: SourceSummaryDTO
+    shared_participants: int
+    overlaps: List[SourceOverlapDTO]
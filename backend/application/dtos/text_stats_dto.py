@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic.dataclasses import dataclass
+
+
+@dataclass
+class TextStatsQueryDTO:
+    """DTO for term statistics queries"""
+    k: int = 20
+    users: Optional[str] = None
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    per_user: bool = False
+    per_bucket: bool = False
+
+
+@dataclass
+class TermCountDTO:
+    """DTO for the estimated count of a term"""
+    term: str
+    count: int
+
+
+@dataclass
+class TermGroupDTO:
+    """DTO for the term statistics of a group of messages (a user, a time bucket or all of them)"""
+    messages: int
+    terms: int
+    distinct_terms: int
+    top_terms: List[TermCountDTO]
+    user: Optional[str] = None
+    bucket: Optional[datetime] = None
+
+
+@dataclass
+class TextStatsDTO:
+    """DTO for the term statistics of a chat"""
+    granularity: str
+    total: TermGroupDTO
+    groups: List[TermGroupDTO]
+    truncated: bool = False
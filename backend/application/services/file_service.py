@@ -1,29 +1,249 @@
-from typing import Optional, List
+import asyncio
+import zipfile
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Dict, Optional, List
 from fastapi import UploadFile
 
-from infrastructure.persistence.file_storage import FileStorage
+from application.dtos.file_dto import (
+    AttachmentDTO, FileListDTO, FileMetadataDTO, FileUploadDTO, UploadChunkDTO, UploadCompleteDTO,
+    UploadSessionCreateDTO, UploadSessionDTO
+)
+from application.services.ingest_service import IngestService
+from config.settings import settings
+from domain.entities.file import FileRecord, storage_name
+from domain.exceptions.domain_exceptions import (
+    EntityNotFoundException, UploadTooLargeException, ValidationException
+)
+from domain.repositories.chat_message_repository import ChatMessageRepository
+from domain.repositories.file_catalog_repository import FileCatalogRepository
+from infrastructure.persistence.file_storage import FileStorage, safe_filename
+from integration.whatsapp import ChatArchive, is_zip
 
 
 class FileService:
-    """Application service for file operations"""
+    """Application service for file operations
 
-    def __init__(self, storage_service: FileStorage):
+    Every completed upload gets an entry in the user's file catalog, which
+    answers file listings without touching the file system, and is queued
+    for background ingest, which fills in the chat summary of the entry.
+    File names are per user, every file is looked up through its user.
+    The chat entries ingest loaded into ``messages`` for a content are
+    deleted with the last file of that content.
+    """
+
+    def __init__(self, storage_service: FileStorage, upload_storage: Optional[FileStorage] = None,
+                 catalog: Optional[FileCatalogRepository] = None, ingest: Optional[IngestService] = None,
+                 messages: Optional[ChatMessageRepository] = None):
         self.storage_service = storage_service
+        self.upload_storage = upload_storage or FileStorage(settings.FILE_STORAGE_ROOT)
+        self.catalog = catalog
+        self.ingest = ingest
+        self.messages = messages
+
+    async def upload_file(self, file: UploadFile, user_id: str) -> FileUploadDTO:
+        """Stream an upload to storage in fixed-size chunks and describe the stored file"""
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            raise UploadTooLargeException(settings.MAX_UPLOAD_SIZE)
+        if await asyncio.to_thread(is_zip, file.file):
+            return await self._upload_archive(file, user_id)
+        stored = await self.storage_service.upload_stream(self._chunks(file), file.filename, user_id)
+        return await self._catalog(
+            FileUploadDTO(filename=stored.filename, size=stored.size, lines=stored.lines, sha256=stored.sha256),
+            user_id
+        )
+
+    async def _upload_archive(self, file: UploadFile, user_id: str) -> FileUploadDTO:
+        """Store the chat text of a WhatsApp zip export, streamed out of the archive
+
+        Media members are never decompressed or written; their names and
+        sizes are kept with the stored chat as attachment metadata.
+        """
+        try:
+            archive = await asyncio.to_thread(ChatArchive, file.file)
+            attachments = await asyncio.to_thread(archive.attachments)
+            reader = await asyncio.to_thread(archive.open_chat)
+            try:
+                stored = await self.storage_service.upload_stream(
+                    self._reader_chunks(reader), archive.chat_filename(file.filename), user_id,
+                    metadata={"attachments": [attachment._asdict() for attachment in attachments]}
+                )
+            finally:
+                reader.close()
+        except (ValueError, zipfile.BadZipFile) as e:
+            raise ValidationException(f"Invalid WhatsApp export archive: {e}")
+        return await self._catalog(
+            FileUploadDTO(
+                filename=stored.filename, size=stored.size, lines=stored.lines, sha256=stored.sha256,
+                attachments=len(attachments)
+            ),
+            user_id
+        )
+
+    async def _catalog(self, upload: FileUploadDTO, user_id: str) -> FileUploadDTO:
+        """Write the catalog entry of a stored upload and queue the file for background ingest"""
+        if self.catalog is not None:
+            previous = await self.catalog.get(user_id, upload.filename)
+            await self.catalog.save(FileRecord(
+                user_id=user_id,
+                filename=upload.filename,
+                size=upload.size,
+                sha256=upload.sha256,
+                lines=upload.lines,
+                attachment_count=upload.attachments or 0
+            ))
+            if previous is not None and previous.sha256 != upload.sha256:
+                await self._release(previous.sha256)
+            if self.ingest is not None:
+                self.ingest.enqueue(user_id, upload.filename)
+        return upload
+
+    @staticmethod
+    async def _chunks(file: UploadFile) -> AsyncIterator[bytes]:
+        """Read an upload ``UPLOAD_CHUNK_SIZE`` bytes at a time"""
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+    @staticmethod
+    async def _reader_chunks(reader: BinaryIO) -> AsyncIterator[bytes]:
+        """Read a blocking reader ``UPLOAD_CHUNK_SIZE`` bytes at a time on a worker thread"""
+        while chunk := await asyncio.to_thread(reader.read, settings.UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+    async def get_attachments(self, filename: str, user_id: str) -> List[AttachmentDTO]:
+        """Media listed from the zip export a chat file was uploaded as (none for plain text uploads)"""
+        name = await self._owned(filename, user_id)
+        if name is None or await self.storage_service.get_size(name) is None:
+            raise EntityNotFoundException("File", filename)
+        metadata = await self.storage_service.get_metadata(name)
+        return [AttachmentDTO(**attachment) for attachment in (metadata or {}).get("attachments", [])]
+
+    async def _owned(self, filename: str, user_id: str) -> Optional[str]:
+        """Storage name of a file of the user, ``None`` unless they own a file of that name
+
+        Owning a file is having its catalog entry or, without a catalog, being
+        the uploader recorded with the stored file.
+        """
+        filename = safe_filename(filename)
+        name = storage_name(user_id, filename)
+        if self.catalog is not None:
+            owned = await self.catalog.get(user_id, filename) is not None
+        else:
+            owned = ((await self.storage_service.get_metadata(name)) or {}).get("user_id") == user_id
+        return name if owned else None
+
+    async def create_upload_session(self, request: UploadSessionCreateDTO, user_id: str) -> UploadSessionDTO:
+        """Start a resumable upload whose chunks can be sent in any order, in parallel and retried"""
+        chunk_size = request.chunk_size or settings.UPLOAD_SESSION_CHUNK_SIZE
+        if request.size < 0:
+            raise ValidationException("Upload size cannot be negative")
+        if request.size > settings.MAX_UPLOAD_SIZE:
+            raise UploadTooLargeException(settings.MAX_UPLOAD_SIZE)
+        if not 0 < chunk_size <= settings.UPLOAD_SESSION_MAX_CHUNK_SIZE:
+            raise ValidationException(f"Chunk size must be between 1 and {settings.UPLOAD_SESSION_MAX_CHUNK_SIZE} bytes")
+        session = await self.upload_storage.create_upload_session(user_id, request.filename, request.size, chunk_size)
+        return self._session_dto({**session, "received": {}})
 
-    async def upload_file(self, file: UploadFile, user_id: str) -> str:
-        """Upload a file and return its filename"""
-        content = await file.read()
-        await self.storage_service.upload_file(content, file.filename, user_id)
-        return file.filename
-    async def get_file_content(self, filename: str) -> Optional[bytes]:
-        """Get file content"""
-        return await self.storage_service.get_file_content(filename)
-
-    async def delete_file(self, filename: str) -> bool:
-        """Delete a file"""
-        await self.storage_service.delete_file(filename)
+    async def upload_session(self, upload_id: str, user_id: str) -> UploadSessionDTO:
+        """State of a resumable upload, listing the chunks still missing"""
+        return self._session_dto(await self.upload_storage.get_upload_session(user_id, upload_id))
+
+    async def upload_chunk(self, upload_id: str, index: int, chunks: AsyncIterable[bytes],
+                           user_id: str) -> UploadChunkDTO:
+        """Store chunk ``index`` of a resumable upload; sending a chunk again replaces it"""
+        stored = await self.upload_storage.write_upload_chunk(user_id, upload_id, index, chunks)
+        return UploadChunkDTO(index=index, size=stored.size, sha256=stored.sha256)
+
+    async def complete_upload(self, upload_id: str, request: UploadCompleteDTO, user_id: str) -> FileUploadDTO:
+        """Assemble a resumable upload into the file storage once its SHA-256 checks out"""
+        session = await self.upload_storage.get_upload_session(user_id, upload_id)
+        incoming = await self.storage_service.incoming_path()
+        stored = await self.upload_storage.assemble_upload(user_id, upload_id, incoming, request.sha256)
+        stored = await self.storage_service.commit_file(incoming, stored, session["filename"], user_id)
+        return await self._catalog(
+            FileUploadDTO(filename=stored.filename, size=stored.size, lines=stored.lines, sha256=stored.sha256),
+            user_id
+        )
+
+    async def abort_upload(self, upload_id: str, user_id: str) -> None:
+        """Abort a resumable upload and discard its chunks"""
+        await self.upload_storage.delete_upload_session(user_id, upload_id)
+
+    @staticmethod
+    def _session_dto(session: Dict[str, Any]) -> UploadSessionDTO:
+        chunk_count = max(1, -(-session["size"] // session["chunk_size"]))
+        received = sorted(session["received"])
+        return UploadSessionDTO(
+            upload_id=session["upload_id"],
+            filename=session["filename"],
+            size=session["size"],
+            chunk_size=session["chunk_size"],
+            chunk_count=chunk_count,
+            received=received,
+            missing=[index for index in range(chunk_count) if index not in session["received"]],
+            received_bytes=sum(session["received"].values())
+        )
+
+    async def get_file_content(self, filename: str, user_id: str) -> Optional[bytes]:
+        """Get file content, ``None`` unless the user owns the file"""
+        name = await self._owned(filename, user_id)
+        return None if name is None else await self.storage_service.get_file_content(name)
+
+    async def get_file_size(self, filename: str, user_id: str) -> Optional[int]:
+        """Size of a user's file in bytes, ``None`` if it does not exist or the user does not own it"""
+        name = await self._owned(filename, user_id)
+        return None if name is None else await self.storage_service.get_size(name)
+
+    def stream_file(self, filename: str, user_id: str, start: int = 0,
+                    end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream the bytes ``[start, end)`` of a user's file without loading it into memory
+
+        Ownership is not checked again; get the file's size first, ``None`` when it is not theirs.
+        """
+        return self.storage_service.stream(storage_name(user_id, safe_filename(filename)), start, end)
+
+    async def delete_file(self, filename: str, user_id: str) -> bool:
+        """Delete a user's file and their catalog entry of it, ``False`` if they own no file of that name
+
+        Only the user's own name for the file is removed; content shared with
+        other files goes once its last name does.
+        """
+        name = await self._owned(filename, user_id)
+        if name is None:
+            return False
+        sha256 = await self.storage_service.get_content_hash(name)
+        await self.storage_service.delete_file(name)
+        if self.catalog is not None:
+            await self.catalog.delete(user_id, safe_filename(filename))
+        await self._release(sha256)
         return True
 
-    async def list_files(self, user_id: Optional[str] = None) -> List[str]:
-        """List all available files"""
-        return await self.storage_service.list_files(user_id)
+    async def _release(self, sha256: Optional[str]) -> None:
+        """Delete the chat entries loaded for a content once no file has it any more"""
+        if self.messages is not None and sha256 and await self.storage_service.get_references(sha256) == 0:
+            await self.messages.delete(sha256)
+
+    async def list_files(self, user_id: str, offset: int = 0, limit: Optional[int] = None) -> FileListDTO:
+        """A page of the user's files with their chat summaries, newest first, read from the catalog"""
+        limit = min(limit or settings.FILES_PAGE_SIZE, settings.FILES_MAX_PAGE_SIZE)
+        records, total = await self.catalog.list_by_user(user_id, offset, limit)
+        return FileListDTO(
+            items=[
+                FileMetadataDTO(
+                    filename=record.filename,
+                    size=record.size,
+                    sha256=record.sha256,
+                    lines=record.lines,
+                    message_count=record.message_count,
+                    participants=record.participants,
+                    first_message_at=record.first_message_at,
+                    last_message_at=record.last_message_at,
+                    attachments=record.attachment_count,
+                    uploaded_at=record.uploaded_at,
+                    ingest_status=record.ingest_status,
+                    ingest_error=record.ingest_error
+                )
+                for record in records
+            ],
+            total=total,
+            offset=offset,
+            limit=limit
+        )
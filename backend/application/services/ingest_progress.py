@@ -0,0 +1,51 @@
+import asyncio
+from typing import Dict, Optional
+
+from config.settings import settings
+from domain.entities.file import INGEST_STAGES
+
+IngestEvents = Dict[str, asyncio.Event]
+
+
+class IngestProgress:
+    """Stages passed by the chat files queued for background ingest in this process
+
+    Analysis requests for a file that is still being ingested wait here for
+    the stage that builds what they need instead of building it a second
+    time themselves.
+    """
+
+    def __init__(self):
+        self._files: Dict[str, IngestEvents] = {}
+
+    def start(self, filename: str) -> IngestEvents:
+        """Track a new ingest of a file, replacing any earlier one for later waiters"""
+        events = {stage: asyncio.Event() for stage in INGEST_STAGES}
+        self._files[filename] = events
+        return events
+
+    def finish(self, filename: str, events: IngestEvents) -> None:
+        """Release everyone waiting on an ingest, whether it completed or failed"""
+        for event in events.values():
+            event.set()
+        if self._files.get(filename) is events:
+            del self._files[filename]
+
+    async def wait(self, filename: str, stage: str, timeout: Optional[float] = None) -> bool:
+        """Wait until an ingest of a file has passed a stage
+
+        ``False`` right away for files that are not being ingested, and
+        after ``timeout`` seconds (``INGEST_WAIT_SECONDS``) if the stage
+        still has not run, so the caller falls back to the raw path.
+        """
+        events = self._files.get(filename)
+        if events is None:
+            return False
+        try:
+            await asyncio.wait_for(events[stage].wait(), timeout or settings.INGEST_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+
+ingest_progress = IngestProgress()
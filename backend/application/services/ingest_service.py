@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from typing import Any, AsyncContextManager, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from application.services.ingest_progress import IngestEvents, IngestProgress, ingest_progress
+from application.services.network_service import NetworkService
+from config.settings import settings
+from domain.entities.file import INGEST_STAGES, storage_name
+from domain.repositories.chat_message_repository import ChatMessageRepository, ChatMessageRow
+from domain.repositories.file_catalog_repository import FileCatalogRepository
+from integration.whatsapp import ParsedChat
+
+logger = logging.getLogger(__name__)
+
+
+class IngestJob(NamedTuple):
+    """A file queued for ingest, starting at ``stage``"""
+    user_id: str
+    filename: str
+    stage: str
+    events: IngestEvents
+
+    @property
+    def name(self) -> str:
+        """Storage name of the file"""
+        return storage_name(self.user_id, self.filename)
+
+
+class IngestService:
+    """Background ingest of uploaded chat files
+
+    Uploads return as soon as the file is stored; the derived data of the
+    file is then built on a queue, in explicit stages: ``parse`` (the
+    column arrays, and the chat summary of the catalog entry), ``load``
+    (the entries into the database, with a ``messages_scope``), ``index``
+    (term sketches), ``rollups`` (activity rollup) and ``warm`` (the
+    default analysis). The catalog entry records the stage a file is in,
+    so after a restart ``resume`` continues every unfinished ingest from
+    its stage; a stage only builds what the analysis cache does not hold
+    yet, and a later stage rebuilds anything an earlier one lost.
+    """
+
+    def __init__(self, network_service: NetworkService,
+                 catalog_scope: Callable[[], AsyncContextManager[FileCatalogRepository]],
+                 messages_scope: Optional[Callable[[], AsyncContextManager[ChatMessageRepository]]] = None,
+                 progress: Optional[IngestProgress] = None, workers: Optional[int] = None):
+        self.network_service = network_service
+        self.catalog_scope = catalog_scope
+        self.messages_scope = messages_scope
+        self.progress = progress or ingest_progress
+        self.workers = workers or settings.INGEST_WORKERS
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def enqueue(self, user_id: str, filename: str, stage: Optional[str] = None) -> None:
+        """Queue the ingest of a stored file, from its first stage unless ``stage`` is given"""
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        events = self.progress.start(storage_name(user_id, filename))
+        self._queue.put_nowait(IngestJob(user_id, filename, stage or INGEST_STAGES[0], events))
+
+    async def resume(self) -> int:
+        """Queue every unfinished ingest recorded in the catalog again, from the stage it was in"""
+        async with self.catalog_scope() as catalog:
+            records = await catalog.list_unfinished()
+        for record in records:
+            stage = record.ingest_status if record.ingest_status in INGEST_STAGES else None
+            self.enqueue(record.user_id, record.filename, stage)
+        return len(records)
+
+    async def join(self) -> None:
+        """Wait until the queue is drained"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self) -> None:
+        """Stop the workers; queued and running ingests resume from the catalog on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue, self._tasks = None, []
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._ingest(job)
+            except Exception as e:
+                # The status could not be recorded (e.g. the database is away); the next start resumes it
+                await self._store_error(job, e)
+            finally:
+                self.progress.finish(job.name, job.events)
+                self._queue.task_done()
+
+    async def _ingest(self, job: IngestJob) -> None:
+        """Run the stages of a job in order, recording each one in the catalog before it starts"""
+        try:
+            for stage in INGEST_STAGES[INGEST_STAGES.index(job.stage):]:
+                await self._set_status(job, stage)
+                await getattr(self, f"_{stage}")(job)
+                job.events[stage].set()
+        except Exception as e:
+            await self._set_status(job, "failed", self._error(e))
+            return
+        await self._set_status(job, "ready")
+
+    async def _store_error(self, job: IngestJob, error: Exception) -> None:
+        """Keep the error of an ingest whose status could not be recorded, leaving it at its stage to resume"""
+        try:
+            async with self.catalog_scope() as catalog:
+                record = await catalog.get(job.user_id, job.filename)
+                if record is not None:
+                    await catalog.set_ingest_status(job.user_id, job.filename, record.ingest_status, self._error(error))
+        except Exception:
+            # Raised while handling ``error``, so the log shows both
+            logger.exception("Could not store the ingest error of %s", job.name)
+
+    @staticmethod
+    def _error(e: Exception) -> str:
+        return str(e) or type(e).__name__
+
+    async def _set_status(self, job: IngestJob, status: str, error: Optional[str] = None) -> None:
+        async with self.catalog_scope() as catalog:
+            await catalog.set_ingest_status(job.user_id, job.filename, status, error)
+
+    async def _parse(self, job: IngestJob) -> None:
+        chat = await self.network_service.parse(job.name)
+        async with self.catalog_scope() as catalog:
+            record = await catalog.get(job.user_id, job.filename)
+            if record is None:
+                return
+            for field, value in self.chat_summary(chat).items():
+                setattr(record, field, value)
+            await catalog.update(record)
+
+    async def _load(self, job: IngestJob) -> None:
+        """Bulk load the entries of a content-addressed file into the database, once per content"""
+        if self.messages_scope is None:
+            return
+        source = await self.network_service.storage_service.get_content_hash(job.name)
+        if source is None:
+            return
+        async with self.messages_scope() as messages:
+            if await messages.get_senders(source) is None:
+                chat = await self.network_service.parse(job.name)
+                await messages.load(source, list(chat.senders), self.message_rows(chat))
+
+    async def _index(self, job: IngestJob) -> None:
+        await self.network_service.build_text_stats(job.name)
+
+    async def _rollups(self, job: IngestJob) -> None:
+        await self.network_service.activity_rollup(job.name)
+
+    async def _warm(self, job: IngestJob) -> None:
+        await self.network_service.warm_analysis(job.name)
+
+    @staticmethod
+    def message_rows(chat: ParsedChat) -> Iterator[ChatMessageRow]:
+        """Database rows of the entries of a parsed chat"""
+        return zip(
+            range(chat.entry_count), chat.timestamps.tolist(), chat.sender_codes.tolist(),
+            chat.lengths.tolist(), chat.is_message.tolist(), chat.contents
+        )
+
+    @staticmethod
+    def chat_summary(chat: ParsedChat) -> Dict[str, Any]:
+        """Message count, participants and date range of a parsed chat, as catalog fields"""
+        if chat.entry_count == 0:
+            return {"message_count": 0, "participants": [], "first_message_at": None, "last_message_at": None}
+        return {
+            "message_count": int(chat.is_message.sum()),
+            "participants": list(chat.senders),
+            "first_message_at": chat.timestamps.min().item(),
+            "last_message_at": chat.timestamps.max().item()
+        }
@@ -1,114 +1,406 @@
-from collections import defaultdict
+import asyncio
+import io
+import os
 from datetime import datetime
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, List, Optional, Tuple
 
 import networkx as nx
-
-from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO, NodeDTO, LinkDTO
+import numpy as np
+
+from application.analytics.analysis import GraphAnalysis, CACHE_KEY_EXCLUDED, fresh_run
+from application.analytics.batch import evaluate_batch
+from application.analytics.betweenness import graph_betweenness
+from application.analytics.coarsening import level_of_detail
+from application.analytics.diff import diff_analyses
+from application.analytics.edges import (
+    DIRECTED_EDGE_MODELS, EDGE_MODELS, EdgeList, mention_edges, previous_sender_pairs, reply_edges, reply_window_pairs
+)
+from application.analytics.latency import latency_fields, reply_latency_digests
+from application.analytics.memo import Centralities, memoized_centralities
+from application.analytics.presentation import present_analysis
+from application.analytics.queries import ego_network, k_core, top_nodes
+from application.analytics.rollups import ActivityRollup, activity_heatmap, activity_series
+from application.analytics.text_stats import TextStats, build_text_stats, term_statistics
+from application.dtos.activity_dto import ActivityHeatmapDTO, ActivityQueryDTO, ActivitySeriesDTO
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkBatchResultDTO, NetworkDiffDTO, NetworkDiffRequestDTO, NetworkGraphDTO, NodeDTO, LinkDTO
+from application.dtos.text_stats_dto import TextStatsDTO, TextStatsQueryDTO
+from application.services.ingest_progress import IngestProgress
+from config.settings import settings
 from domain.entities.network import Node, Link, NetworkGraph
+from domain.repositories.chat_message_repository import ChatMessageFilter, ChatMessageRepository
 from domain.repositories.file_repository import FileRepository
+from infrastructure.cache.analysis_cache import AnalysisCache, analysis_cache, centrality_cache
+from integration.whatsapp import ParsedChat, parse_chat
 
 
 class NetworkService:
-    """Application service for network analysis"""
-
-    def __init__(self, storage_service: FileRepository):
+    """Application service for network analysis
+
+    With an ``ingest`` progress, requests for a file that is still being
+    ingested in the background wait for the stage that builds what they
+    need, and fall back to building it themselves if it takes too long.
+    With a ``messages`` repository, files whose content is loaded into the
+    database are filtered there instead of in the parsed arrays.
+    """
+
+    def __init__(self, storage_service: FileRepository, cache: Optional[AnalysisCache] = None,
+                 metrics_cache: Optional[AnalysisCache] = None, ingest: Optional[IngestProgress] = None,
+                 messages: Optional[ChatMessageRepository] = None):
         self.storage_service = storage_service
+        self.cache = cache or analysis_cache
+        self.metrics_cache = metrics_cache or centrality_cache
+        self.ingest = ingest
+        self.messages = messages
 
     async def analyze_network(self, filename: str, params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
-        """Analyze chat file and generate network graph"""
-        # Get file content
-        content_bytes = await self.storage_service.get_content(filename)
-        if not content_bytes:
-            raise ValueError(f"File {filename} not found")
+        """Analyze chat file and generate network graph, reusing a cached result when possible"""
+        analysis = await self.get_analysis(filename, params)
+        return self._present(filename, analysis, params)
+
+    async def expand_supernode(self, filename: str, supernode_id: str,
+                               params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
+        """Expand one supernode of a coarsened chat network into its members"""
+        analysis = await self.get_analysis(filename, params)
+        return level_of_detail(analysis, params.max_nodes or settings.LOD_MAX_NODES).expand(supernode_id)
+
+    async def top_nodes(self, filename: str, params: NetworkAnalysisRequestDTO,
+                        metric: str, k: int) -> NetworkGraphDTO:
+        """The k most central users of a chat network by one metric"""
+        return top_nodes(await self.get_analysis(filename, params), metric, k)
+
+    async def ego_network(self, filename: str, params: NetworkAnalysisRequestDTO,
+                          node_id: str, radius: int) -> NetworkGraphDTO:
+        """Neighbourhood of one user in a chat network"""
+        return ego_network(await self.get_analysis(filename, params), node_id, radius)
+
+    async def k_core(self, filename: str, params: NetworkAnalysisRequestDTO, k: int) -> NetworkGraphDTO:
+        """k-core subgraph of a chat network"""
+        return k_core(await self.get_analysis(filename, params), k)
+
+    async def analyze_batch(self, filename: str,
+                            requests: List[NetworkAnalysisRequestDTO]) -> AsyncIterator[NetworkBatchResultDTO]:
+        """Evaluate many parameter sets against a single parse of a chat file, yielding results as they complete"""
+        chat = await self._parsed_chat(filename)
+        identity = await self._cache_identity(filename)
+        return evaluate_batch(
+            requests,
+            self.cache,
+            lambda params: self.cache.make_key("file", *identity, params, exclude=CACHE_KEY_EXCLUDED),
+            lambda params: self._analyze_chat(chat, params),
+            lambda analysis, params: self._present(filename, analysis, params)
+        )
+
+    async def diff(self, filename: str, request: NetworkDiffRequestDTO) -> NetworkDiffDTO:
+        """Compare the analyses of a chat file under two parameter sets"""
+        before = await self.get_analysis(filename, request.before)
+        after = await self.get_analysis(filename, request.after)
+        return diff_analyses(before, after, request.threshold)
+
+    async def activity_series(self, filename: str, query: ActivityQueryDTO) -> ActivitySeriesDTO:
+        """Message volume over time of a chat file, answered from its activity rollup"""
+        return activity_series(await self.activity_rollup(filename), query)
+
+    async def activity_heatmap(self, filename: str, query: ActivityQueryDTO) -> ActivityHeatmapDTO:
+        """Weekday x hour message heatmap of a chat file, answered from its activity rollup"""
+        return activity_heatmap(await self.activity_rollup(filename), query)
+
+    async def activity_rollup(self, filename: str) -> ActivityRollup:
+        """Get the activity rollup of a chat file
+
+        When the file only grew since the rollup was built (the entry that
+        ended the rolled-up part is unchanged), just the appended entries are
+        folded in; any other change rebuilds the rollup. The entries are
+        folded into a copy on a worker thread, which replaces the cached
+        rollup once complete.
+        """
+        chat = await self._parsed_chat(filename)
+        rollup_key = self.cache.make_key("rollup", filename, None)
+        state = self.cache.get(rollup_key)
+        if state is None and await self._ingested(filename, "rollups"):
+            state = self.cache.get(rollup_key)
+
+        previous, rolled = None, 0
+        if state is not None:
+            previous_rollup, previous_rolled, boundary = state
+            if previous_rolled <= chat.entry_count and (
+                    previous_rolled == 0 or chat.timestamps[previous_rolled - 1] == boundary):
+                if previous_rolled == chat.entry_count:
+                    return previous_rollup
+                previous, rolled = previous_rollup, previous_rolled
+
+        rollup = await asyncio.to_thread(self._extend_rollup, chat, previous, rolled)
+        boundary = chat.timestamps[chat.entry_count - 1] if chat.entry_count else None
+        self.cache.put(rollup_key, (rollup, chat.entry_count, boundary))
+        return rollup
+
+    @staticmethod
+    def _extend_rollup(chat: ParsedChat, previous: Optional[ActivityRollup], rolled: int) -> ActivityRollup:
+        """A new rollup of ``previous`` (if any) and the messages of a parsed chat from entry ``rolled`` on"""
+        rollup = previous.copy() if previous is not None else ActivityRollup()
+        appended = np.arange(rolled, chat.entry_count)
+        appended = appended[chat.is_message[appended]]
+        rollup.extend(
+            chat.timestamps[appended],
+            [chat.senders[code] for code in chat.sender_codes[appended].tolist()],
+            chat.lengths[appended]
+        )
+        return rollup
+
+    async def text_stats(self, filename: str, query: TextStatsQueryDTO) -> TextStatsDTO:
+        """Top terms and vocabulary size of a chat file, answered from its term sketches"""
+        return term_statistics(await self.build_text_stats(filename), query)
+
+    async def parse(self, filename: str) -> ParsedChat:
+        """Get the parsed arrays of a chat file, parsing it on a worker thread unless its content is parsed"""
+        return await self._parsed_chat(filename)
+
+    async def build_text_stats(self, filename: str) -> TextStats:
+        """Get the term sketches of a chat file, building them on a worker thread on a cache miss"""
+        cache_key = self.cache.make_key("text_stats", *await self._cache_identity(filename))
+        stats = self.cache.get(cache_key)
+        if stats is None and await self._ingested(filename, "index"):
+            stats = self.cache.get(cache_key)
+        if stats is None:
+            stats = await asyncio.to_thread(self._build_text_stats, await self._parsed_chat(filename))
+            self.cache.put(cache_key, stats)
+        return stats
+
+    async def warm_analysis(self, filename: str, params: Optional[NetworkAnalysisRequestDTO] = None) -> None:
+        """Compute the analysis of a chat file (with default parameters) into the cache on a worker thread"""
+        run = await self.prepare_analysis(filename, params or NetworkAnalysisRequestDTO())
+        await asyncio.to_thread(run)
+
+    async def prepare_analysis(self, filename: str, params: NetworkAnalysisRequestDTO
+                               ) -> Callable[[], Tuple[GraphAnalysis, NetworkGraphDTO]]:
+        """Load and parse a chat file, returning the CPU-bound rest of its analysis for a worker thread
+
+        The returned function yields the (cached) analysis and its presented graph.
+        """
+        chat = await self._parsed_chat(filename)
+        cache_key = self.cache.make_key(
+            "file", *await self._cache_identity(filename), params, exclude=CACHE_KEY_EXCLUDED
+        )
+
+        def run() -> Tuple[GraphAnalysis, NetworkGraphDTO]:
+            analysis = None if fresh_run(params) else self.cache.get(cache_key)
+            if analysis is None:
+                analysis = GraphAnalysis(self._analyze_chat(chat, params))
+                self.cache.put(cache_key, analysis)
+            return analysis, self._present(filename, analysis, params)
+        return run
+
+    def graph_centralities(self, g: nx.Graph, params: NetworkAnalysisRequestDTO) -> Tuple[Centralities, Dict[str, Any]]:
+        """Centralities of a weighted participant graph, shared with any earlier query on the same structure"""
+        return memoized_centralities(
+            self.metrics_cache, "chat", g, "weight", lambda: self._centralities(g, params), refresh=fresh_run(params)
+        )
+
+    async def get_analysis(self, filename: str, params: NetworkAnalysisRequestDTO) -> GraphAnalysis:
+        """Get the cached analysis of a chat file, computing it on a cache miss"""
+        identity = await self._cache_identity(filename)
+        cache_key = self.cache.make_key("file", *identity, params, exclude=CACHE_KEY_EXCLUDED)
+        analysis = None if fresh_run(params) else self.cache.get(cache_key)
+        if analysis is None and not fresh_run(params) and cache_key == self.cache.make_key(
+                "file", *identity, NetworkAnalysisRequestDTO(), exclude=CACHE_KEY_EXCLUDED):
+            # The default analysis is the last ingest stage
+            if await self._ingested(filename, "warm"):
+                analysis = self.cache.get(cache_key)
+        if analysis is None:
+            analysis = GraphAnalysis(await self._analyze(filename, params))
+            self.cache.put(cache_key, analysis)
+        return analysis
+
+    def _present(self, filename: str, analysis: GraphAnalysis,
+                 params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
+        """Apply presentation options, seeding layouts from the last one computed for this file"""
+        seed_key = self.cache.make_key("layout", filename, None)
+        graph, positions = present_analysis(analysis, params, self.cache.get(seed_key) if params.layout else None)
+        if positions is not None:
+            self.cache.put(seed_key, positions)
+        return graph
+
+    async def content_version(self, filename: str) -> str:
+        """Marker of the stored content of a chat file, changes whenever the content does"""
+        identity, version = await self._cache_identity(filename)
+        return identity if version is None else f"{identity}:{version}"
+
+    async def _file_version(self, filename: str) -> Optional[Hashable]:
+        """Version marker of a stored file, changes whenever the file is rewritten"""
+        try:
+            stat = await asyncio.to_thread(os.stat, self.storage_service.get_file_path(filename))
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    async def _cache_identity(self, filename: str) -> Tuple[str, Optional[Hashable]]:
+        """Identity and version of a stored file in cache keys
+
+        Content-addressed files are identified by their SHA-256, so all file
+        names sharing a content share its parse, sketches and analyses.
+        Other files are identified by name, with a version marker.
+        """
+        content_hash = await self.storage_service.get_content_hash(filename)
+        if content_hash is not None:
+            return f"sha256:{content_hash}", None
+        return filename, await self._file_version(filename)
+
+    async def _parsed_chat(self, filename: str) -> ParsedChat:
+        """Get the parsed arrays of a chat file, parsing it once per content"""
+        identity = await self._cache_identity(filename)
+        cache_key = self.cache.make_key("parsed", *identity)
+        chat = self.cache.get(cache_key)
+        if chat is None and await self._ingested(filename, "parse"):
+            chat = self.cache.get(cache_key)
+        if chat is None:
+            chat = await asyncio.to_thread(self._parse_file, filename)
+            if chat is None:
+                raise ValueError(f"File {filename} not found")
+            self.cache.put(cache_key, chat)
+            if settings.TEXT_STATS_ON_PARSE:
+                self.cache.put(
+                    self.cache.make_key("text_stats", *identity),
+                    await asyncio.to_thread(self._build_text_stats, chat)
+                )
+        return chat
+
+    async def _ingested(self, filename: str, stage: str) -> bool:
+        """Wait for a background ingest of a file to pass a stage, ``False`` at once if none is running"""
+        return self.ingest is not None and await self.ingest.wait(filename, stage)
+
+    def _parse_file(self, filename: str) -> Optional[ParsedChat]:
+        """Parse a chat file streamed (and decompressed) from storage, ``None`` if it is missing or empty
+
+        Blocking, run it on a worker thread.
+        """
+        try:
+            f = self.storage_service.open(filename)
+        except FileNotFoundError:
+            return None
+        with io.TextIOWrapper(f, encoding="utf-8") as text:
+            if not f.peek(1):
+                return None
+            return parse_chat(text)
+
+    @staticmethod
+    def _build_text_stats(chat: ParsedChat) -> TextStats:
+        """Term sketches of the messages of a parsed chat"""
+        messages = np.flatnonzero(chat.is_message)
+        return build_text_stats(
+            chat.timestamps[messages], chat.sender_codes[messages], chat.senders,
+            [chat.contents[i] for i in messages.tolist()]
+        )
+
+    async def _analyze(self, filename: str, params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
+        """Filter the messages of a chat file and compute the network graph with its metrics
+
+        Contents loaded into the database are filtered in SQL, which streams
+        back just the sender and time of every remaining message. The
+        mention model needs the parsed mentions, so it and contents that are
+        not loaded use the parsed arrays. The graph and its metrics are
+        computed on a worker thread.
+        """
+        edge_model = params.edge_model.lower()
+        if self.messages is not None and edge_model in EDGE_MODELS and edge_model != "mention":
+            source = await self.storage_service.get_content_hash(filename)
+            senders = await self.messages.get_senders(source) if source is not None else None
+            if senders is not None:
+                codes, seconds = await self.messages.select(source, self._message_filter(params, senders))
+                return await asyncio.to_thread(self._network, codes, seconds, senders, params)
+        return await asyncio.to_thread(self._analyze_chat, await self._parsed_chat(filename), params)
+
+    def _message_filter(self, params: NetworkAnalysisRequestDTO, senders: List[str]) -> ChatMessageFilter:
+        """The message filters of an analysis, with the username resolved to sender ids"""
+        username = params.username.lower() if params.username else None
+        return ChatMessageFilter(
+            start=self._parse_datetime(params.start_date, params.start_time),
+            end=self._parse_datetime(params.end_date, params.end_time),
+            limit=params.limit,
+            limit_type=params.limit_type,
+            min_length=params.min_length,
+            max_length=params.max_length,
+            sender_ids=[code for code, sender in enumerate(senders) if sender.lower() == username]
+            if username else None,
+            keywords=params.keywords.split(",") if params.keywords else ()
+        )
 
-        content = content_bytes.decode('utf-8')
-        lines = content.splitlines()
+    def _analyze_chat(self, chat: ParsedChat, params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
+        """Filter the messages of a parsed chat and compute the network graph with its metrics"""
+        edge_model = params.edge_model.lower()
+        if edge_model not in EDGE_MODELS:
+            raise ValueError(f"Unknown edge model '{params.edge_model}'. Use one of: {', '.join(EDGE_MODELS)}")
 
         # Parse dates and times
         start_datetime = self._parse_datetime(params.start_date, params.start_time)
         end_datetime = self._parse_datetime(params.end_date, params.end_time)
 
-        # Parse data from chat
-        nodes = set()
-        user_message_count = defaultdict(int)
-        edges_counter = defaultdict(int)
-        previous_sender = None
-        anonymized_map = {}
-
         # Filter lines by date/time first
-        filtered_lines = []
-        for line in lines:
-            if line.startswith("[") and "]" in line:
-                date_part = line.split("] ")[0].strip("[]")
-                try:
-                    current_datetime = datetime.strptime(date_part, "%d.%m.%Y, %H:%M:%S")
-                except ValueError:
-                    continue
-
-                if ((start_datetime and current_datetime >= start_datetime) or not start_datetime) and \
-                        ((end_datetime and current_datetime <= end_datetime) or not end_datetime):
-                    filtered_lines.append(line)
+        in_range = np.ones(chat.entry_count, dtype=bool)
+        if start_datetime:
+            in_range &= chat.timestamps >= np.datetime64(start_datetime, "s")
+        if end_datetime:
+            in_range &= chat.timestamps <= np.datetime64(end_datetime, "s")
+        entries = np.flatnonzero(in_range)
 
         # Apply message limit if specified
         if params.limit and params.limit_type == "first":
-            selected_lines = filtered_lines[:params.limit]
+            entries = entries[:params.limit]
         elif params.limit and params.limit_type == "last":
-            selected_lines = filtered_lines[-params.limit:]
-        else:
-            selected_lines = filtered_lines
+            entries = entries[-params.limit:]
+
+        # Apply message filters
+        keep = chat.is_message[entries]
+        if params.min_length:
+            keep &= chat.lengths[entries] >= params.min_length
+        if params.max_length:
+            keep &= chat.lengths[entries] <= params.max_length
+        if params.username:
+            username = params.username.lower()
+            matching = np.array([sender.lower() == username for sender in chat.senders], dtype=bool)
+            # System entries have sender code -1, which picks the appended False
+            keep &= np.r_[matching, False][chat.sender_codes[entries]]
+        entries = entries[keep]
 
-        # Parse selected lines
         keywords = params.keywords.split(",") if params.keywords else []
-        selected_users = params.selected_users.split(",") if params.selected_users else []
-
-        for line in selected_lines:
-            if line.startswith("[") and "]" in line and ": " in line:
-                _, message_part = line.split("] ", 1)
-                parts = message_part.split(":", 1)
-                sender = parts[0].strip("~").replace("\u202a", "").strip()
-                message_content = parts[1].strip() if len(parts) > 1 else ""
-
-                message_length = len(message_content)
-
-                # Apply filters
-                if (params.min_length and message_length < params.min_length) or \
-                        (params.max_length and message_length > params.max_length):
-                    continue
-
-                if params.username and sender.lower() != params.username.lower():
-                    continue
-
-                if keywords and not any(kw in message_content.lower() for kw in keywords):
-                    continue
-
-                # Count messages per user
-                user_message_count[sender] += 1
-
-                if sender:
-                    # Apply anonymization if needed
-                    if params.anonymize:
-                        if sender.startswith("\u202a+972") or sender.startswith("+972"):
-                            anon_name = f"Phone_{len(anonymized_map) + 1}"
-                        else:
-                            anon_name = f"User_{len(anonymized_map) + 1}"
-
-                        if sender not in anonymized_map:
-                            anonymized_map[sender] = anon_name
-
-                        sender = anonymized_map[sender]
-
-                    # Add node and edge
-                    nodes.add(sender)
-                    if previous_sender and previous_sender != sender:
-                        edge = tuple(sorted([previous_sender, sender]))
-                        edges_counter[edge] += 1
-
-                    previous_sender = sender
+        if keywords:
+            entries = entries[np.fromiter(
+                (any(kw in chat.contents[i].lower() for kw in keywords) for i in entries.tolist()),
+                dtype=bool, count=len(entries)
+            )]
+
+        codes = chat.sender_codes[entries]
+        seconds = chat.timestamps[entries].astype(np.int64)
+        mentions = None
+        if edge_model == "mention":
+            mentions = mention_edges(codes, entries, chat.mention_indptr, chat.mention_codes)
+        return self._network(codes, seconds, chat.senders, params, mentions)
+
+    def _network(self, codes: np.ndarray, seconds: np.ndarray, senders: List[str],
+                 params: NetworkAnalysisRequestDTO, mentions: Optional[EdgeList] = None) -> NetworkGraphDTO:
+        """Compute the network graph with its metrics from the sender ids and epoch seconds of filtered messages
+
+        ``mentions`` are the edges of the mention model, which are not
+        derived from the message order.
+        """
+        edge_model = params.edge_model.lower()
+
+        # Display names, anonymized in order of first appearance
+        names = list(senders)
+        anonymized_map = {}
+        if params.anonymize:
+            _, first_seen = np.unique(codes, return_index=True)
+            for code in codes[np.sort(first_seen)].tolist():
+                sender = senders[code]
+                prefix = "Phone" if sender.startswith("\u202a+972") or sender.startswith("+972") else "User"
+                anonymized_map[sender] = f"{prefix}_{len(anonymized_map) + 1}"
+                names[code] = anonymized_map[sender]
+
+        # Count messages per user, ordered by first appearance
+        message_counts = np.bincount(codes, minlength=len(names))
+        _, first_seen = np.unique(codes, return_index=True)
+        user_order = codes[np.sort(first_seen)]
+        filtered_users = {int(code): int(message_counts[code]) for code in user_order.tolist()}
 
         # Filter users based on message count and active users
-        filtered_users = user_message_count.copy()
-
         if params.min_messages:
             filtered_users = {user: count for user, count in filtered_users.items()
                               if count >= params.min_messages}
@@ -121,77 +413,71 @@ class NetworkService:
             sorted_users = sorted(filtered_users.items(), key=lambda x: x[1], reverse=True)[:params.active_users]
             filtered_users = dict(sorted_users)
 
+        selected_users = params.selected_users.split(",") if params.selected_users else []
         if selected_users:
             selected_lower = [u.lower() for u in selected_users]
             filtered_users = {user: count for user, count in filtered_users.items()
-                              if user.lower() in selected_lower or
-                              (params.anonymize and anonymized_map.get(user, "").lower() in selected_lower)}
-
-        # Get final node list
-        if params.anonymize:
-            filtered_nodes = {anonymized_map.get(node, node) for node in filtered_users.keys()}
+                              if senders[user].lower() in selected_lower or
+                              (params.anonymize and names[user].lower() in selected_lower)}
+
+        # Build the edges of the selected model over the filtered message arrays
+        directed = edge_model in DIRECTED_EDGE_MODELS
+        pairs = None
+        if edge_model == "window":
+            pairs = reply_window_pairs(codes, seconds, params.reply_window, params.reply_window_seconds)
+            edges = reply_edges(pairs, directed, params.decay_half_life or settings.EDGE_DECAY_HALF_LIFE)
+        elif edge_model == "mention":
+            edges = mentions
         else:
-            filtered_nodes = set(filtered_users.keys())
+            pairs = previous_sender_pairs(codes, seconds)
+            edges = reply_edges(pairs, directed)
+
+        # Reply-latency sketches per edge and per replying user
+        edge_latency, node_latency = {}, {}
+        if params.latency and pairs is not None:
+            edge_latency, node_latency = reply_latency_digests(pairs, directed)
 
         # Create NetworkX graph for computing metrics
-        g = nx.Graph()
-        g.add_nodes_from(filtered_nodes)
+        g = nx.DiGraph() if directed else nx.Graph()
+        g.add_nodes_from(names[user] for user in filtered_users)
 
         # Create links
         links = []
-        for (source, target), weight in edges_counter.items():
-            anon_source = anonymized_map.get(source, source) if params.anonymize else source
-            anon_target = anonymized_map.get(target, target) if params.anonymize else target
-
-            if anon_source in filtered_nodes and anon_target in filtered_nodes:
-                g.add_edge(anon_source, anon_target, weight=weight)
-                links.append(Link(source=anon_source, target=anon_target, weight=weight))
-
-        # Calculate metrics
-        degree_centrality = nx.degree_centrality(g)
-        betweenness_centrality = nx.betweenness_centrality(g, weight="weight", normalized=True)
-
-        if nx.is_connected(g):
-            closeness_centrality = nx.closeness_centrality(g)
-            eigenvector_centrality = nx.eigenvector_centrality(g, max_iter=1000)
-            pagerank_centrality = nx.pagerank(g, alpha=0.85)
-        else:
-            # For disconnected graphs, calculate metrics on the largest component
-            largest_cc = max(nx.connected_components(g), key=len)
-            g_subgraph = g.subgraph(nodes=[largest_cc]).copy()
-
-            closeness_centrality = {}
-            eigenvector_centrality = {}
-            pagerank_centrality = {}
-
-            # Calculate for the largest component
-            sub_closeness = nx.closeness_centrality(g_subgraph)
-            sub_eigenvector = nx.eigenvector_centrality(g_subgraph, max_iter=1000)
-            sub_pagerank = nx.pagerank(g_subgraph, alpha=0.85)
-
-            # Initialize all nodes with zero values
-            for node in g.nodes():
-                closeness_centrality[node] = 0.0
-                eigenvector_centrality[node] = 0.0
-                pagerank_centrality[node] = 0.0
-
-            # Update with values from the largest component
-            closeness_centrality.update(sub_closeness)
-            eigenvector_centrality.update(sub_eigenvector)
-            pagerank_centrality.update(sub_pagerank)
+        link_latency = []
+        included = np.zeros(len(names), dtype=bool)
+        included[list(filtered_users)] = True
+        mask = included[edges.sources] & included[edges.targets]
+        for source, target, weight in zip(edges.sources[mask].tolist(), edges.targets[mask].tolist(),
+                                          edges.weights[mask].tolist()):
+            weight = round(weight, 4) if edge_model == "window" else int(weight)
+            g.add_edge(names[source], names[target], weight=weight)
+            links.append(Link(source=names[source], target=names[target], weight=weight))
+            link_latency.append(latency_fields(edge_latency.get((source, target))) if params.latency else {})
+
+        # Calculate metrics, shared with any earlier query that produced the same graph
+        centralities, report = self.graph_centralities(g, params)
+        degree_centrality = centralities["degree"]
+        betweenness_centrality = centralities["betweenness"]
+        closeness_centrality = centralities["closeness"]
+        eigenvector_centrality = centralities["eigenvector"]
+        pagerank_centrality = centralities["pagerank"]
 
         # Create nodes with metrics
         nodes_list = []
-        for node_id in filtered_nodes:
+        node_latency_fields = {}
+        for user, count in filtered_users.items():
+            node_id = names[user]
             nodes_list.append(Node(
                 node_id=node_id,
-                messages=user_message_count.get(node_id, 0),
+                messages=count,
                 degree=round(degree_centrality.get(node_id, 0), 4),
                 betweenness=round(betweenness_centrality.get(node_id, 0), 4),
                 closeness=round(closeness_centrality.get(node_id, 0), 4),
                 eigenvector=round(eigenvector_centrality.get(node_id, 0), 4),
                 pagerank=round(pagerank_centrality.get(node_id, 0), 4)
             ))
+            if params.latency:
+                node_latency_fields[node_id] = latency_fields(node_latency.get(user))
 
         # Create network graph
         graph = NetworkGraph(nodes=nodes_list, links=links)
@@ -205,15 +491,80 @@ class NetworkService:
                 betweenness=node.betweenness,
                 closeness=node.closeness,
                 eigenvector=node.eigenvector,
-                pagerank=node.pagerank
+                pagerank=node.pagerank,
+                **node_latency_fields.get(node.id, {})
             ) for node in nodes_list],
             links=[LinkDTO(
                 source=link.source,
                 target=link.target,
-                weight=link.weight
-            ) for link in graph.links]
+                weight=link.weight,
+                **latency
+            ) for link, latency in zip(graph.links, link_latency)],
+            directed=directed,
+            metadata={"timings": report.pop("timings"), "centralities": report}
+        )
+
+    def _centralities(self, g: nx.Graph, params: NetworkAnalysisRequestDTO) -> Tuple[Centralities, Dict[str, Any]]:
+        """Compute the node centralities of a chat graph and the timings of the run"""
+        degree_centrality = nx.degree_centrality(g)
+        betweenness_centrality, betweenness_timing = graph_betweenness(
+            g, weight="weight", parallel=params.parallel_betweenness, workers=params.betweenness_workers
         )
 
+        # Directed reply graphs are split into weakly connected components
+        components = nx.weakly_connected_components if g.is_directed() else nx.connected_components
+        component_list = list(components(g))
+
+        if len(component_list) <= 1:
+            closeness_centrality = nx.closeness_centrality(g)
+            eigenvector_centrality = self._eigenvector_centrality(g)
+            pagerank_centrality = nx.pagerank(g, alpha=0.85)
+        else:
+            # For disconnected graphs, calculate metrics on the largest component
+            largest_cc = max(component_list, key=len)
+            g_subgraph = g.subgraph(largest_cc).copy()
+
+            closeness_centrality = {}
+            eigenvector_centrality = {}
+            pagerank_centrality = {}
+
+            # Calculate for the largest component
+            sub_closeness = nx.closeness_centrality(g_subgraph)
+            sub_eigenvector = self._eigenvector_centrality(g_subgraph)
+            sub_pagerank = nx.pagerank(g_subgraph, alpha=0.85)
+
+            # Initialize all nodes with zero values
+            for node in g.nodes():
+                closeness_centrality[node] = 0.0
+                eigenvector_centrality[node] = 0.0
+                pagerank_centrality[node] = 0.0
+
+            # Update with values from the largest component
+            closeness_centrality.update(sub_closeness)
+            eigenvector_centrality.update(sub_eigenvector)
+            pagerank_centrality.update(sub_pagerank)
+
+        centralities = {
+            "degree": degree_centrality,
+            "betweenness": betweenness_centrality,
+            "closeness": closeness_centrality,
+            "eigenvector": eigenvector_centrality,
+            "pagerank": pagerank_centrality
+        }
+        return centralities, {"betweenness": betweenness_timing}
+
+    @staticmethod
+    def _eigenvector_centrality(g: nx.Graph) -> Dict[str, float]:
+        """Eigenvector centrality, zero for directed graphs where the power iteration does not converge"""
+        if g.number_of_nodes() == 0:
+            return {}
+        try:
+            return nx.eigenvector_centrality(g, max_iter=1000)
+        except nx.PowerIterationFailedConvergence:
+            if not g.is_directed():
+                raise
+            return {node: 0.0 for node in g.nodes()}
+
     def _parse_datetime(self, date: Optional[str], time: Optional[str]) -> Optional[datetime]:
         """Parse date and time strings into datetime object"""
         if not date:
@@ -0,0 +1,310 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.merge import (
+    MergedNetwork, merge_graphs, participant_key, relabel, source_overlaps, summarize
+)
+from application.analytics.presentation import present_analysis
+from application.dtos.network_dto import LinkDTO, NetworkAnalysisRequestDTO, NetworkGraphDTO, NodeDTO
+from application.dtos.research_dto import ResearchAnalysisDTO, ResearchSourceDTO, SourceSummaryDTO
+from application.services.network_service import NetworkService
+from application.services.wikipedia_network_service import WikipediaNetworkService
+from config.settings import settings
+from domain.entities.file import storage_name
+from domain.entities.network import Link, NetworkAnalysis, NetworkGraph, Node
+from domain.entities.research import Research
+from domain.repositories.network_analysis_repository import NetworkAnalysisRepository
+from domain.repositories.research_repository import ResearchRepository
+from domain.repositories.thread_repository import ThreadRepository
+
+
+class ResearchAnalysisService:
+    """Application service analysing all the sources of a research project together
+
+    The default analysis of a research (its own dates and message limit)
+    is precomputed in the background when the research is created or
+    updated and stored, source graphs and merged graph, through the
+    ``analysis_repository``.
+    """
+
+    def __init__(self, research_repository: ResearchRepository, thread_repository: ThreadRepository,
+                 network_service: NetworkService, wikipedia_network_service: WikipediaNetworkService,
+                 analysis_repository: Optional[NetworkAnalysisRepository] = None):
+        self.research_repository = research_repository
+        self.thread_repository = thread_repository
+        self.network_service = network_service
+        self.wikipedia_network_service = wikipedia_network_service
+        self.analysis_repository = analysis_repository
+
+    async def analyze_research(self, research_id: str, params: NetworkAnalysisRequestDTO) -> ResearchAnalysisDTO:
+        """
+        Analyze every chat file and Wikipedia thread of a research and merge them
+
+        Chat files are read and parsed concurrently, then every source is
+        analyzed on a pool of ``BATCH_WORKERS`` threads. Participants are
+        matched across sources by normalized name; with anonymization the
+        same person gets the same alias in every graph. The default analysis
+        (no parameters) is served from the stored one while it is current.
+
+        Args:
+            research_id: ID of the research to analyze
+            params: Analysis parameters, the research's dates and message limit fill in missing ones
+
+        Returns:
+            ResearchAnalysisDTO: Per-source graphs and summaries, the merged graph and the source overlaps
+        """
+        research = await self.research_repository.get_by_id(research_id)
+        if not research:
+            raise ValueError(f"Research with ID {research_id} not found")
+
+        sources = await self._sources(research)
+        if self.analysis_repository is not None and params == NetworkAnalysisRequestDTO():
+            stored = await self._stored_analysis(research, sources, params)
+            if stored is not None:
+                return self._result(research, sources, params, *stored)
+        return self._result(research, sources, params, *await self._analyze_sources(research, sources, params))
+
+    async def precompute(self, research_id: str) -> None:
+        """Compute the default analysis of a research and store it for ``analyze_research`` to serve"""
+        research = await self.research_repository.get_by_id(research_id)
+        if not research:
+            return
+        sources = await self._sources(research)
+        version = await self._version(research, sources)
+        params = NetworkAnalysisRequestDTO()
+        outcomes, _, full_graph, _ = await self._analyze_sources(research, sources, params)
+
+        analyses = []
+        for (source_type, source_id), outcome in zip(sources, outcomes):
+            if isinstance(outcome, BaseException):
+                analyses.append(NetworkAnalysis(
+                    research_id, version, source_type=source_type, source_id=source_id, error=self._error(outcome)
+                ))
+            else:
+                analyses.append(self._to_analysis(research_id, version, outcome[0], source_type, source_id))
+        analyses.append(self._to_analysis(research_id, version, full_graph))
+        await self.analysis_repository.replace_for_research(research_id, analyses)
+
+    async def store_failure(self, research_id: str, error: BaseException) -> None:
+        """Store why the default analysis of a research could not be precomputed in place of the analysis"""
+        await self.analysis_repository.replace_for_research(
+            research_id, [NetworkAnalysis(research_id, None, error=self._error(error))]
+        )
+
+    async def _sources(self, research: Research) -> List[Tuple[str, str]]:
+        """Chat files then Wikipedia threads of a research, as ``(source type, source id)``"""
+        threads = await self.thread_repository.get_threads_by_research_id(research.id)
+        sources = [("file", name) for name in self._file_names(research)]
+        sources += [("thread", str(thread["thread_id"])) for thread in threads]
+        if not sources:
+            raise ValueError("The research has no chat files or threads to analyze")
+        return sources
+
+    async def _version(self, research: Research, sources: List[Tuple[str, str]]) -> str:
+        """Fingerprint of the research settings and source contents its default analysis is computed from"""
+        versions = []
+        for source_type, source_id in sources:
+            if source_type == "file":
+                versions.append(await self.network_service.content_version(storage_name(research.user_id, source_id)))
+            else:
+                # Threads only ever grow, so the message count identifies the thread version
+                versions.append(await self.thread_repository.count_messages_by_thread_id(source_id))
+        fingerprint = [research.start_date, research.end_date, research.message_limit, sources, versions]
+        return hashlib.sha256(json.dumps(fingerprint, default=str).encode("utf-8")).hexdigest()
+
+    async def _analyze_sources(self, research: Research, sources: List[Tuple[str, str]],
+                               params: NetworkAnalysisRequestDTO
+                               ) -> Tuple[List, MergedNetwork, NetworkGraphDTO, NetworkGraphDTO]:
+        """Analyze every source and their merge
+
+        Returns the ``(full graph, presented graph)`` of every source (or
+        the exception that failed it), the merged network, and the full and
+        presented merged graph.
+        """
+        # Sources are analyzed with real names so participants can be matched, aliases come after merging
+        source_params = dataclasses.replace(
+            params,
+            start_date=params.start_date or research.start_date,
+            end_date=params.end_date or research.end_date,
+            limit=params.limit or research.message_limit,
+            anonymize=False
+        )
+        file_names = [source_id for source_type, source_id in sources if source_type == "file"]
+        prepared: List = list(await asyncio.gather(
+            *(self.network_service.prepare_analysis(storage_name(research.user_id, name), source_params)
+              for name in file_names),
+            return_exceptions=True
+        ))
+        # Threads share the request's database session, which does not allow concurrent queries
+        for source_type, thread_id in sources[len(file_names):]:
+            try:
+                prepared.append(await self.wikipedia_network_service.prepare_analysis(thread_id, source_params))
+            except Exception as e:
+                prepared.append(e)
+
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=settings.BATCH_WORKERS) as executor:
+            async def run(job):
+                if isinstance(job, Exception):
+                    raise job
+                analysis, graph = await loop.run_in_executor(executor, job)
+                return analysis.graph, graph
+
+            outcomes = await asyncio.gather(*(run(job) for job in prepared), return_exceptions=True)
+            graphs = [outcome[0] for outcome in outcomes if not isinstance(outcome, BaseException)]
+            if not graphs:
+                raise ValueError(f"None of the research sources could be analyzed: {self._error(outcomes[0])}")
+            merged = merge_graphs(graphs)
+            full_graph, merged_graph = await loop.run_in_executor(executor, self._merged_graph, merged, params)
+        return outcomes, merged, full_graph, merged_graph
+
+    async def _stored_analysis(self, research: Research, sources: List[Tuple[str, str]],
+                               params: NetworkAnalysisRequestDTO
+                               ) -> Optional[Tuple[List, MergedNetwork, NetworkGraphDTO, NetworkGraphDTO]]:
+        """The stored default analysis in the shape of ``_analyze_sources``, ``None`` if missing or stale"""
+        analyses = await self.analysis_repository.get_by_research_id(research.id)
+        if not analyses or analyses[-1].source_type is not None or analyses[-1].error is not None:
+            return None
+        if [(analysis.source_type, analysis.source_id) for analysis in analyses[:-1]] != sources:
+            return None
+        if any(analysis.version != analyses[0].version for analysis in analyses):
+            return None
+        if analyses[0].version != await self._version(research, sources):
+            return None
+
+        outcomes = []
+        for analysis in analyses[:-1]:
+            if analysis.error is not None:
+                # Stored errors are already formatted, ``_error`` passes value errors through
+                outcomes.append(ValueError(analysis.error))
+                continue
+            graph = self._to_graph(analysis)
+            outcomes.append((graph, present_analysis(GraphAnalysis(graph), params)[0]))
+        merged = merge_graphs([outcome[0] for outcome in outcomes if not isinstance(outcome, BaseException)])
+
+        full_graph = self._to_graph(analyses[-1])
+        for node in full_graph.nodes:
+            node.sources = len(merged.sources.get(node.id, ()))
+        merged_graph, _ = present_analysis(GraphAnalysis(full_graph), params)
+        return outcomes, merged, full_graph, merged_graph
+
+    def _result(self, research: Research, sources: List[Tuple[str, str]], params: NetworkAnalysisRequestDTO,
+                outcomes: List, merged: MergedNetwork, full_graph: NetworkGraphDTO,
+                merged_graph: NetworkGraphDTO) -> ResearchAnalysisDTO:
+        """Label the source and merged graphs and summarize them"""
+        label = self._labeller(merged) if params.anonymize or research.anonymized else str
+        results = []
+        analysed = []
+        for (source_type, source_id), outcome in zip(sources, outcomes):
+            if isinstance(outcome, BaseException):
+                results.append(ResearchSourceDTO(source_type=source_type, source_id=source_id,
+                                                 error=self._error(outcome)))
+                continue
+            graph, presented = outcome
+            analysed.append((source_id, graph))
+            results.append(ResearchSourceDTO(
+                source_type=source_type,
+                source_id=source_id,
+                graph=relabel(presented, label),
+                summary=self._summary(graph, label)
+            ))
+
+        return ResearchAnalysisDTO(
+            research_id=research.id,
+            sources=results,
+            merged=relabel(merged_graph, label),
+            merged_summary=self._summary(full_graph, label),
+            shared_participants=sum(1 for members in merged.sources.values() if len(members) > 1),
+            overlaps=source_overlaps([source_id for source_id, _ in analysed], [graph for _, graph in analysed])
+        )
+
+    def _merged_graph(self, merged: MergedNetwork,
+                      params: NetworkAnalysisRequestDTO) -> Tuple[NetworkGraphDTO, NetworkGraphDTO]:
+        """Metrics of the merged participant graph, before and after presentation"""
+        g = merged.graph
+        centralities, report = self.network_service.graph_centralities(g, params)
+        graph = NetworkGraphDTO(
+            nodes=[NodeDTO(
+                id=node_id,
+                messages=merged.messages[node_id],
+                sources=len(merged.sources[node_id]),
+                **{metric: round(values.get(node_id, 0), 4) for metric, values in centralities.items()}
+            ) for node_id in g.nodes],
+            links=[LinkDTO(
+                source=source,
+                target=target,
+                weight=round(weight, 4) if isinstance(weight, float) else weight
+            ) for source, target, weight in g.edges(data="weight")],
+            directed=g.is_directed(),
+            metadata={"timings": report.pop("timings"), "centralities": report}
+        )
+        presented, _ = present_analysis(GraphAnalysis(graph), params)
+        return graph, presented
+
+    @staticmethod
+    def _labeller(merged: MergedNetwork) -> Callable[[str], str]:
+        """Consistent ``Participant_N`` aliases for the participants of every source"""
+        aliases = {participant_key(name): f"Participant_{i + 1}" for i, name in enumerate(merged.graph.nodes)}
+        return lambda name: aliases.get(participant_key(name), name)
+
+    @staticmethod
+    def _summary(graph: NetworkGraphDTO, label: Callable[[str], str]) -> SourceSummaryDTO:
+        summary = summarize(graph)
+        summary.top_participants = [label(name) for name in summary.top_participants]
+        return summary
+
+    @staticmethod
+    def _to_analysis(research_id: str, version: str, graph: NetworkGraphDTO,
+                     source_type: Optional[str] = None, source_id: Optional[str] = None) -> NetworkAnalysis:
+        return NetworkAnalysis(
+            research_id,
+            version,
+            graph=NetworkGraph(
+                nodes=[Node(
+                    node_id=node.id,
+                    messages=node.messages,
+                    degree=node.degree,
+                    betweenness=node.betweenness,
+                    closeness=node.closeness,
+                    eigenvector=node.eigenvector,
+                    pagerank=node.pagerank
+                ) for node in graph.nodes],
+                links=[Link(source=link.source, target=link.target, weight=link.weight) for link in graph.links]
+            ),
+            source_type=source_type,
+            source_id=source_id,
+            directed=graph.directed,
+            density=summarize(graph).density
+        )
+
+    @staticmethod
+    def _to_graph(analysis: NetworkAnalysis) -> NetworkGraphDTO:
+        return NetworkGraphDTO(
+            nodes=[NodeDTO(
+                id=node.id,
+                messages=node.messages,
+                degree=node.degree,
+                betweenness=node.betweenness,
+                closeness=node.closeness,
+                eigenvector=node.eigenvector,
+                pagerank=node.pagerank
+            ) for node in analysis.graph.nodes],
+            links=[
+                LinkDTO(source=link.source, target=link.target, weight=link.weight) for link in analysis.graph.links
+            ],
+            directed=analysis.directed
+        )
+
+    @staticmethod
+    def _file_names(research: Research) -> List[str]:
+        """Chat exports of a research, several are stored comma-separated in ``file_name``"""
+        return [name.strip() for name in (research.file_name or "").split(",") if name.strip()]
+
+    @staticmethod
+    def _error(e: BaseException) -> str:
+        return str(e) if isinstance(e, ValueError) else f"Analysis failed: {str(e)}"
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import AsyncContextManager, Callable, Dict
+
+from application.services.research_analysis_service import ResearchAnalysisService
+
+logger = logging.getLogger(__name__)
+
+
+class ResearchPrecomputeService:
+    """Background precomputation of the default analysis of researches
+
+    Creating or updating a research schedules its default analysis, run by
+    a ``ResearchAnalysisService`` from ``analysis_scope`` on a session of its
+    own and stored for the research to open on. A research scheduled again
+    while its analysis is running restarts it with the new settings. A run
+    that fails stores its error in place of the analysis.
+    """
+
+    def __init__(self, analysis_scope: Callable[[], AsyncContextManager[ResearchAnalysisService]]):
+        self.analysis_scope = analysis_scope
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def schedule(self, research_id: str) -> None:
+        """Start precomputing the default analysis of a research, replacing any run in progress"""
+        running = self._tasks.pop(research_id, None)
+        if running is not None:
+            running.cancel()
+        task = asyncio.create_task(self._precompute(research_id))
+        self._tasks[research_id] = task
+        task.add_done_callback(lambda _: self._forget(research_id, task))
+
+    async def join(self) -> None:
+        """Wait for the scheduled precomputations to finish"""
+        await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Cancel the running precomputations; opening a research analyzes it live until it is updated again"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+
+    def _forget(self, research_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(research_id) is task:
+            del self._tasks[research_id]
+
+    async def _precompute(self, research_id: str) -> None:
+        try:
+            async with self.analysis_scope() as analysis_service:
+                await analysis_service.precompute(research_id)
+        except Exception as e:
+            # The research is analyzed live when it is opened; the stored error tells why it was not precomputed
+            await self._store_failure(research_id, e)
+
+    async def _store_failure(self, research_id: str, error: Exception) -> None:
+        try:
+            async with self.analysis_scope() as analysis_service:
+                await analysis_service.store_failure(research_id, error)
+        except Exception:
+            # Raised while handling ``error``, so the log shows both
+            logger.exception("Could not store the failed default analysis of research %s", research_id)
@@ -1,17 +1,34 @@
-from typing import Dict, Any, List, Optional
+import asyncio
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 import networkx as nx
-from datetime import datetime
+import numpy as np
+from datetime import datetime, timezone
 
 from domain.entities.network import Node, Link, NetworkGraph
 from domain.repositories.thread_repository import ThreadRepository
-from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO, NodeDTO, LinkDTO
+from application.analytics.analysis import GraphAnalysis, CACHE_KEY_EXCLUDED, fresh_run
+from application.analytics.batch import evaluate_batch
+from application.analytics.betweenness import graph_betweenness
+from application.analytics.coarsening import level_of_detail
+from application.analytics.diff import diff_analyses
+from application.analytics.memo import Centralities, memoized_centralities
+from application.analytics.presentation import present_analysis
+from application.analytics.queries import ego_network, k_core, top_nodes
+from application.analytics.rollups import ActivityRollup, activity_heatmap, activity_series
+from application.dtos.activity_dto import ActivityHeatmapDTO, ActivityQueryDTO, ActivitySeriesDTO
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkBatchResultDTO, NetworkDiffDTO, NetworkDiffRequestDTO, NetworkGraphDTO, NodeDTO, LinkDTO
+from config.settings import settings
+from infrastructure.cache.analysis_cache import AnalysisCache, analysis_cache, centrality_cache
 
 
 class WikipediaNetworkService:
     """Service for analyzing Wikipedia thread networks"""
 
-    def __init__(self, thread_repository: ThreadRepository):
+    def __init__(self, thread_repository: ThreadRepository, cache: Optional[AnalysisCache] = None,
+                 metrics_cache: Optional[AnalysisCache] = None):
         self.thread_repository = thread_repository
+        self.cache = cache or analysis_cache
+        self.metrics_cache = metrics_cache or centrality_cache
 
     async def analyze_wikipedia_thread(self, thread_id: str,
                                        params: Optional[NetworkAnalysisRequestDTO] = None) -> NetworkGraphDTO:
@@ -25,13 +42,157 @@ class WikipediaNetworkService:
         Returns:
             NetworkGraphDTO: Network graph representation of the thread
         """
+        analysis = await self.get_analysis(thread_id, params)
+        if not params:
+            return analysis.graph
+        return self._present(thread_id, analysis, params)
+
+    async def expand_supernode(self, thread_id: str, supernode_id: str,
+                               params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
+        """Expand one supernode of a coarsened thread network into its members"""
+        analysis = await self.get_analysis(thread_id, params)
+        return level_of_detail(analysis, params.max_nodes or settings.LOD_MAX_NODES).expand(supernode_id)
+
+    async def top_nodes(self, thread_id: str, params: NetworkAnalysisRequestDTO,
+                        metric: str, k: int) -> NetworkGraphDTO:
+        """The k most central users of a thread network by one metric"""
+        return top_nodes(await self.get_analysis(thread_id, params), metric, k)
+
+    async def ego_network(self, thread_id: str, params: NetworkAnalysisRequestDTO,
+                          node_id: str, radius: int) -> NetworkGraphDTO:
+        """Neighbourhood of one user in a thread network"""
+        return ego_network(await self.get_analysis(thread_id, params), node_id, radius)
+
+    async def k_core(self, thread_id: str, params: NetworkAnalysisRequestDTO, k: int) -> NetworkGraphDTO:
+        """k-core subgraph of a thread network"""
+        return k_core(await self.get_analysis(thread_id, params), k)
+
+    async def analyze_batch(self, thread_id: str,
+                            requests: List[NetworkAnalysisRequestDTO]) -> AsyncIterator[NetworkBatchResultDTO]:
+        """Evaluate many parameter sets against a single load of a thread, yielding results as they complete"""
+        thread = await self.thread_repository.get_thread_by_id(thread_id)
+        if not thread:
+            raise ValueError(f"Thread with ID {thread_id} not found")
+
+        message_count = await self.thread_repository.count_messages_by_thread_id(thread_id)
+        messages = await self.thread_repository.get_messages_by_thread_id(thread_id)
+        return evaluate_batch(
+            requests,
+            self.cache,
+            lambda params: self.cache.make_key("thread", thread_id, message_count, params, exclude=CACHE_KEY_EXCLUDED),
+            lambda params: self._analyze_messages(messages, params),
+            lambda analysis, params: self._present(thread_id, analysis, params)
+        )
+
+    async def diff(self, thread_id: str, request: NetworkDiffRequestDTO) -> NetworkDiffDTO:
+        """Compare the analyses of a thread under two parameter sets"""
+        before = await self.get_analysis(thread_id, request.before)
+        after = await self.get_analysis(thread_id, request.after)
+        return diff_analyses(before, after, request.threshold)
+
+    async def activity_series(self, thread_id: str, query: ActivityQueryDTO) -> ActivitySeriesDTO:
+        """Message volume over time of a thread, answered from its activity rollup"""
+        return activity_series(await self.activity_rollup(thread_id), query)
+
+    async def activity_heatmap(self, thread_id: str, query: ActivityQueryDTO) -> ActivityHeatmapDTO:
+        """Weekday x hour message heatmap of a thread, answered from its activity rollup"""
+        return activity_heatmap(await self.activity_rollup(thread_id), query)
+
+    async def activity_rollup(self, thread_id: str) -> ActivityRollup:
+        """Get the activity rollup of a thread, folding in only the messages added since it was built
+
+        Threads only ever grow, so the messages stored after the last rolled-up
+        one are the new ones. They are folded into a copy on a worker thread,
+        which replaces the cached rollup once complete.
+        """
+        thread = await self.thread_repository.get_thread_by_id(thread_id)
+        if not thread:
+            raise ValueError(f"Thread with ID {thread_id} not found")
+
+        rollup_key = self.cache.make_key("rollup", thread_id, None)
+        previous, last_message_id = self.cache.get(rollup_key) or (None, None)
+        appended = await self.thread_repository.get_messages_after(thread_id, last_message_id)
+        if previous is not None and not appended:
+            return previous
+
+        rollup = await asyncio.to_thread(self._extend_rollup, previous, appended)
+        self.cache.put(rollup_key, (rollup, appended[-1]["message_id"] if appended else last_message_id))
+        return rollup
+
+    @classmethod
+    def _extend_rollup(cls, previous: Optional[ActivityRollup], messages: List[Dict[str, Any]]) -> ActivityRollup:
+        """A new rollup of ``previous`` (if any) and the thread messages after it"""
+        rollup = previous.copy() if previous is not None else ActivityRollup()
+        rollup.extend(
+            np.array([cls._naive_utc(message["timestamp"]) for message in messages], dtype="datetime64[s]"),
+            [message.get("sender") for message in messages],
+            np.array([len(message.get("content") or "") for message in messages], dtype=np.int64)
+        )
+        return rollup
+
+    @staticmethod
+    def _naive_utc(timestamp: datetime) -> datetime:
+        """Timezone-aware timestamps converted to naive UTC, as numpy expects"""
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return timestamp
+
+    async def prepare_analysis(self, thread_id: str, params: NetworkAnalysisRequestDTO
+                               ) -> Callable[[], Tuple[GraphAnalysis, NetworkGraphDTO]]:
+        """Load the messages of a thread, returning the CPU-bound rest of its analysis for a worker thread
+
+        The returned function yields the (cached) analysis and its presented graph.
+        """
+        thread = await self.thread_repository.get_thread_by_id(thread_id)
+        if not thread:
+            raise ValueError(f"Thread with ID {thread_id} not found")
+
+        message_count = await self.thread_repository.count_messages_by_thread_id(thread_id)
+        cache_key = self.cache.make_key("thread", thread_id, message_count, params, exclude=CACHE_KEY_EXCLUDED)
+        messages = await self.thread_repository.get_messages_by_thread_id(thread_id)
+
+        def run() -> Tuple[GraphAnalysis, NetworkGraphDTO]:
+            analysis = None if fresh_run(params) else self.cache.get(cache_key)
+            if analysis is None:
+                analysis = GraphAnalysis(self._analyze_messages(messages, params))
+                self.cache.put(cache_key, analysis)
+            return analysis, self._present(thread_id, analysis, params)
+        return run
+
+    async def get_analysis(self, thread_id: str,
+                           params: Optional[NetworkAnalysisRequestDTO] = None) -> GraphAnalysis:
+        """Get the cached analysis of a thread, computing it on a cache miss"""
         # Get thread data and messages
         thread = await self.thread_repository.get_thread_by_id(thread_id)
         if not thread:
             raise ValueError(f"Thread with ID {thread_id} not found")
 
+        # Threads only ever grow, so the message count identifies the thread version
+        message_count = await self.thread_repository.count_messages_by_thread_id(thread_id)
+        cache_key = self.cache.make_key("thread", thread_id, message_count, params, exclude=CACHE_KEY_EXCLUDED)
+        analysis = None if fresh_run(params) else self.cache.get(cache_key)
+        if analysis is None:
+            analysis = GraphAnalysis(await self._analyze(thread_id, params))
+            self.cache.put(cache_key, analysis)
+        return analysis
+
+    def _present(self, thread_id: str, analysis: GraphAnalysis,
+                 params: NetworkAnalysisRequestDTO) -> NetworkGraphDTO:
+        """Apply presentation options, seeding layouts from the last one computed for this thread"""
+        seed_key = self.cache.make_key("layout", thread_id, None)
+        graph, positions = present_analysis(analysis, params, self.cache.get(seed_key) if params.layout else None)
+        if positions is not None:
+            self.cache.put(seed_key, positions)
+        return graph
+
+    async def _analyze(self, thread_id: str, params: Optional[NetworkAnalysisRequestDTO]) -> NetworkGraphDTO:
+        """Build the reply graph of a thread and compute its metrics on a worker thread"""
         messages = await self.thread_repository.get_messages_by_thread_id(thread_id)
+        return await asyncio.to_thread(self._analyze_messages, messages, params)
 
+    def _analyze_messages(self, messages: List[Dict[str, Any]],
+                          params: Optional[NetworkAnalysisRequestDTO]) -> NetworkGraphDTO:
+        """Build the reply graph of already loaded thread messages and compute its metrics"""
         # Filter messages based on parameters
         if params:
             messages = self._filter_messages(messages, params)
@@ -77,21 +238,15 @@ class WikipediaNetworkService:
                     # Add or update edge in graph
                     G.add_edge(edge[0], edge[1], weight=sender_connections[edge])
 
-        # Calculate network metrics
-        degree_centrality = nx.degree_centrality(G)
-        betweenness_centrality = nx.betweenness_centrality(G)
-        closeness_centrality = nx.closeness_centrality(G)
-        eigenvector_centrality = {}
-        pagerank_centrality = {}
-
-        try:
-            eigenvector_centrality = nx.eigenvector_centrality(G)
-            pagerank_centrality = nx.pagerank(G)
-        except:
-            # For small or disconnected graphs, these algorithms might not converge
-            for node in G.nodes():
-                eigenvector_centrality[node] = 0.0
-                pagerank_centrality[node] = 0.0
+        # Calculate network metrics, shared with any earlier query that produced the same graph
+        centralities, report = memoized_centralities(
+            self.metrics_cache, "thread", G, "weight", lambda: self._centralities(G, params), refresh=fresh_run(params)
+        )
+        degree_centrality = centralities["degree"]
+        betweenness_centrality = centralities["betweenness"]
+        closeness_centrality = centralities["closeness"]
+        eigenvector_centrality = centralities["eigenvector"]
+        pagerank_centrality = centralities["pagerank"]
 
         # Create network graph
         nodes = []
@@ -114,7 +269,40 @@ class WikipediaNetworkService:
                 weight=weight
             ))
 
-        return NetworkGraphDTO(nodes=nodes, links=links)
+        return NetworkGraphDTO(
+            nodes=nodes, links=links, metadata={"timings": report.pop("timings"), "centralities": report}
+        )
+
+    def _centralities(self, G: nx.Graph,
+                      params: Optional[NetworkAnalysisRequestDTO]) -> Tuple[Centralities, Dict[str, Any]]:
+        """Compute the node centralities of a thread graph and the timings of the run"""
+        degree_centrality = nx.degree_centrality(G)
+        betweenness_centrality, betweenness_timing = graph_betweenness(
+            G,
+            parallel=bool(params and params.parallel_betweenness),
+            workers=params.betweenness_workers if params else None
+        )
+        closeness_centrality = nx.closeness_centrality(G)
+        eigenvector_centrality = {}
+        pagerank_centrality = {}
+
+        try:
+            eigenvector_centrality = nx.eigenvector_centrality(G)
+            pagerank_centrality = nx.pagerank(G)
+        except:
+            # For small or disconnected graphs, these algorithms might not converge
+            for node in G.nodes():
+                eigenvector_centrality[node] = 0.0
+                pagerank_centrality[node] = 0.0
+
+        centralities = {
+            "degree": degree_centrality,
+            "betweenness": betweenness_centrality,
+            "closeness": closeness_centrality,
+            "eigenvector": eigenvector_centrality,
+            "pagerank": pagerank_centrality
+        }
+        return centralities, {"betweenness": betweenness_timing}
 
     def _filter_messages(self, messages: List[Dict[str, Any]], params: NetworkAnalysisRequestDTO) -> List[
         Dict[str, Any]]:
@@ -29,6 +29,46 @@ class Settings(BaseSettings):
 
     # Storage
     UPLOAD_FOLDER: str = os.getenv("UPLOAD_FOLDER", "./uploads/")
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", str(2 * 1024 ** 3)))
+    STORAGE_COMPRESSION: bool = bool(os.getenv("STORAGE_COMPRESSION", "False") == "True")
+    STORAGE_COMPRESSION_LEVEL: int = int(os.getenv("STORAGE_COMPRESSION_LEVEL", "3"))
+    STORAGE_COMPRESSION_FRAME_SIZE: int = int(os.getenv("STORAGE_COMPRESSION_FRAME_SIZE", str(1024 * 1024)))
+    FILES_PAGE_SIZE: int = int(os.getenv("FILES_PAGE_SIZE", "50"))
+    FILES_MAX_PAGE_SIZE: int = int(os.getenv("FILES_MAX_PAGE_SIZE", "500"))
+    INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "1"))
+    INGEST_WAIT_SECONDS: float = float(os.getenv("INGEST_WAIT_SECONDS", "30"))
+    CHAT_MESSAGES_IN_DB: bool = bool(os.getenv("CHAT_MESSAGES_IN_DB", "False") == "True")
+    CHAT_MESSAGES_FETCH_SIZE: int = int(os.getenv("CHAT_MESSAGES_FETCH_SIZE", "10000"))
+    FILE_STORAGE_ROOT: str = os.getenv("FILE_STORAGE_ROOT", "./filestorage")
+    UPLOAD_SESSION_CHUNK_SIZE: int = int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE", str(8 * 1024 * 1024)))
+    UPLOAD_SESSION_MAX_CHUNK_SIZE: int = int(os.getenv("UPLOAD_SESSION_MAX_CHUNK_SIZE", str(64 * 1024 * 1024)))
+    UPLOAD_SESSION_TTL_HOURS: int = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+    # Analysis
+    ANALYSIS_CACHE_SIZE: int = int(os.getenv("ANALYSIS_CACHE_SIZE", "64"))
+    CENTRALITY_CACHE_SIZE: int = int(os.getenv("CENTRALITY_CACHE_SIZE", "256"))
+    LAYOUT_ITERATIONS: int = int(os.getenv("LAYOUT_ITERATIONS", "100"))
+    LAYOUT_MAX_ITERATIONS: int = int(os.getenv("LAYOUT_MAX_ITERATIONS", "500"))
+    EDGE_WINDOW_MESSAGES: int = int(os.getenv("EDGE_WINDOW_MESSAGES", "5"))
+    EDGE_WINDOW_MAX_MESSAGES: int = int(os.getenv("EDGE_WINDOW_MAX_MESSAGES", "50"))
+    EDGE_DECAY_HALF_LIFE: float = float(os.getenv("EDGE_DECAY_HALF_LIFE", "600"))
+    LATENCY_CHUNK_SIZE: int = int(os.getenv("LATENCY_CHUNK_SIZE", "100000"))
+    LATENCY_SKETCH_COMPRESSION: float = float(os.getenv("LATENCY_SKETCH_COMPRESSION", "100"))
+    TEXT_STATS_ON_PARSE: bool = bool(os.getenv("TEXT_STATS_ON_PARSE", "False") == "True")
+    TEXT_STATS_GRANULARITY: str = os.getenv("TEXT_STATS_GRANULARITY", "week")
+    TEXT_STATS_CHUNK_SIZE: int = int(os.getenv("TEXT_STATS_CHUNK_SIZE", "50000"))
+    TEXT_STATS_SKETCH_WIDTH: int = int(os.getenv("TEXT_STATS_SKETCH_WIDTH", "2048"))
+    TEXT_STATS_SKETCH_DEPTH: int = int(os.getenv("TEXT_STATS_SKETCH_DEPTH", "4"))
+    TEXT_STATS_HLL_PRECISION: int = int(os.getenv("TEXT_STATS_HLL_PRECISION", "12"))
+    TEXT_STATS_TOP_TERMS: int = int(os.getenv("TEXT_STATS_TOP_TERMS", "100"))
+    TEXT_STATS_MAX_GROUPS: int = int(os.getenv("TEXT_STATS_MAX_GROUPS", "1000"))
+    LOD_MAX_NODES: int = int(os.getenv("LOD_MAX_NODES", "500"))
+    QUERY_MAX_NODES: int = int(os.getenv("QUERY_MAX_NODES", "500"))
+    COMMUNITY_LOUVAIN_MAX_EDGES: int = int(os.getenv("COMMUNITY_LOUVAIN_MAX_EDGES", "500000"))
+    BATCH_MAX_REQUESTS: int = int(os.getenv("BATCH_MAX_REQUESTS", "50"))
+    BATCH_WORKERS: int = int(os.getenv("BATCH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    BETWEENNESS_WORKERS: int = int(os.getenv("BETWEENNESS_WORKERS", str(os.cpu_count() or 1)))
 
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:5173"]
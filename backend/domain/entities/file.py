@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import List, Optional
+
+# Background ingest of an uploaded chat file, in order; a catalog entry is in one of these stages,
+# "pending" before the first one, then "ready" or "failed"
+INGEST_STAGES = ("parse", "load", "index", "rollups", "warm")
+
+
+def storage_name(user_id: str, filename: str) -> str:
+    """Name of a user's file in the file storage; file names are per user"""
+    return f"{user_id}/{filename}"
+
+
+class FileRecord:
+    """Catalog entry of a file uploaded by a user, with a summary of its chat"""
+
+    def __init__(
+            self,
+            user_id: str,
+            filename: str,
+            size: int,
+            sha256: str,
+            lines: int = 0,
+            message_count: Optional[int] = None,
+            participants: Optional[List[str]] = None,
+            first_message_at: Optional[datetime] = None,
+            last_message_at: Optional[datetime] = None,
+            attachment_count: int = 0,
+            ingest_status: str = "pending",
+            ingest_error: Optional[str] = None,
+            record_id: Optional[str] = None,
+            uploaded_at: Optional[datetime] = None
+    ):
+        self.id = record_id
+        self.user_id = user_id
+        self.filename = filename
+        self.size = size
+        self.sha256 = sha256
+        self.lines = lines
+        self.message_count = message_count
+        self.participants = participants or []
+        self.first_message_at = first_message_at
+        self.last_message_at = last_message_at
+        self.attachment_count = attachment_count
+        self.ingest_status = ingest_status
+        self.ingest_error = ingest_error
+        self.uploaded_at = uploaded_at or datetime.now()
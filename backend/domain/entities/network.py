@@ -1,4 +1,5 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 
 
 class Node:
@@ -46,4 +47,47 @@ class NetworkGraph:
             links: List[Link]
     ):
         self.nodes = nodes
-        self.links = links
\ No newline at end of file
+        self.links = links
+
+
+class NetworkAnalysis:
+    """Stored default analysis of a research: the graph of one of its sources, or the merged graph
+
+    ``source_type`` and ``source_id`` are ``None`` for the merged graph.
+    A source that could not be analyzed has an ``error`` and no graph.
+    ``version`` identifies the research settings and source contents the
+    analysis was computed from. A precomputation that failed as a whole is
+    stored as a merged graph with just an ``error``, and no version.
+    """
+
+    def __init__(
+            self,
+            research_id: str,
+            version: Optional[str],
+            graph: Optional[NetworkGraph] = None,
+            source_type: Optional[str] = None,
+            source_id: Optional[str] = None,
+            directed: bool = False,
+            density: Optional[float] = None,
+            error: Optional[str] = None,
+            analysis_id: Optional[str] = None,
+            created_at: Optional[datetime] = None
+    ):
+        self.id = analysis_id
+        self.research_id = research_id
+        self.version = version
+        self.graph = graph
+        self.source_type = source_type
+        self.source_id = source_id
+        self.directed = directed
+        self.density = density
+        self.error = error
+        self.created_at = created_at or datetime.now()
+
+    @property
+    def node_count(self) -> Optional[int]:
+        return len(self.graph.nodes) if self.graph is not None else None
+
+    @property
+    def edge_count(self) -> Optional[int]:
+        return len(self.graph.links) if self.graph is not None else None
@@ -20,4 +20,10 @@ class BusinessRuleException(DomainException):
 class AuthorizationException(DomainException):
     """Exception raised when authorization fails"""
     def __init__(self, message: str = "Not authorized to perform this action"):
-        super().__init__(message)
\ No newline at end of file
+        super().__init__(message)
+
+class UploadTooLargeException(DomainException):
+    """Exception raised when an upload exceeds the size limit"""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File exceeds the upload limit of {max_size} bytes")
\ No newline at end of file
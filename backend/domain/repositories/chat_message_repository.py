@@ -0,0 +1,49 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# One loaded chat entry: (entry index, timestamp, sender id, length, is message, content)
+ChatMessageRow = Tuple[int, datetime, int, int, bool, str]
+
+
+class ChatMessageFilter(NamedTuple):
+    """Message filters of a network analysis, applied in the order the analysis applies them
+
+    The date range selects entries, the ``first``/``last`` limit cuts the
+    selected entries, and only then are system entries dropped and the
+    length, sender and keyword filters applied.
+    """
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    limit: Optional[int] = None
+    limit_type: str = "first"
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+    sender_ids: Optional[Sequence[int]] = None
+    keywords: Sequence[str] = ()
+
+
+class ChatMessageRepository(ABC):
+    """Repository interface for chat export entries stored in the database, keyed by content hash"""
+
+    @abstractmethod
+    async def get_senders(self, source: str) -> Optional[List[str]]:
+        """Senders of a loaded content, indexed by sender id; ``None`` if it is not loaded"""
+        pass
+
+    @abstractmethod
+    async def load(self, source: str, senders: List[str], rows: Iterable[ChatMessageRow]) -> int:
+        """Bulk load the entries of a content, replacing any earlier load of it"""
+        pass
+
+    @abstractmethod
+    async def select(self, source: str, message_filter: ChatMessageFilter) -> Tuple[np.ndarray, np.ndarray]:
+        """Sender ids and epoch seconds of the filtered messages of a content, in entry order"""
+        pass
+
+    @abstractmethod
+    async def delete(self, source: str) -> bool:
+        """Delete the entries of a content"""
+        pass
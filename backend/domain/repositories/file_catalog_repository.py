@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from domain.entities.file import FileRecord
+
+
+class FileCatalogRepository(ABC):
+    """Repository interface for the per-user file catalog"""
+
+    @abstractmethod
+    async def save(self, record: FileRecord) -> FileRecord:
+        """Create or replace the entry of a user's file"""
+        pass
+
+    @abstractmethod
+    async def get(self, user_id: str, filename: str) -> Optional[FileRecord]:
+        """Get the entry of a user's file"""
+        pass
+
+    @abstractmethod
+    async def list_by_user(self, user_id: str, offset: int, limit: int) -> Tuple[List[FileRecord], int]:
+        """Get a page of a user's files, newest first, and the total number of files"""
+        pass
+
+    @abstractmethod
+    async def update(self, record: FileRecord) -> bool:
+        """Store the summary and ingest status of an existing entry, keeping its upload time"""
+        pass
+
+    @abstractmethod
+    async def set_ingest_status(self, user_id: str, filename: str, status: str,
+                                error: Optional[str] = None) -> bool:
+        """Record the ingest stage of a user's file"""
+        pass
+
+    @abstractmethod
+    async def list_unfinished(self) -> List[FileRecord]:
+        """Get the entries of all users whose ingest is neither ready nor failed"""
+        pass
+
+    @abstractmethod
+    async def delete(self, user_id: str, filename: str) -> bool:
+        """Delete the entry of a user's file"""
+        pass
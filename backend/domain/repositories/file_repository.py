@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import AsyncIterator, BinaryIO, Optional, List
 
 
 class FileRepository(ABC):
@@ -15,6 +15,31 @@ class FileRepository(ABC):
         """Get file content"""
         pass
 
+    @abstractmethod
+    async def get_range(self, filename: str, offset: int, length: int) -> Optional[bytes]:
+        """Get up to ``length`` bytes of a file starting at ``offset``"""
+        pass
+
+    @abstractmethod
+    def stream(self, filename: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream the bytes ``[start, end)`` of a file in chunks"""
+        pass
+
+    @abstractmethod
+    def open(self, filename: str) -> BinaryIO:
+        """Open a file for reading its content (blocking)"""
+        pass
+
+    @abstractmethod
+    async def get_size(self, filename: str) -> Optional[int]:
+        """Get file size in bytes"""
+        pass
+
+    @abstractmethod
+    async def get_content_hash(self, filename: str) -> Optional[str]:
+        """Get the SHA-256 of a file's content if it is known without reading the file"""
+        pass
+
     @abstractmethod
     async def delete(self, filename: str) -> bool:
         """Delete file"""
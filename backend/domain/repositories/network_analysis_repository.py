@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from domain.entities.network import NetworkAnalysis
+
+
+class NetworkAnalysisRepository(ABC):
+    """Repository interface for the stored default analyses of researches"""
+
+    @abstractmethod
+    async def get_by_research_id(self, research_id: str) -> List[NetworkAnalysis]:
+        """Get the stored analyses of a research, in the order they were stored"""
+        pass
+
+    @abstractmethod
+    async def replace_for_research(self, research_id: str, analyses: List[NetworkAnalysis]) -> None:
+        """Replace the stored analyses of a research"""
+        pass
+
+    @abstractmethod
+    async def delete_by_research_id(self, research_id: str) -> bool:
+        """Delete the stored analyses of a research"""
+        pass
@@ -25,6 +25,11 @@ class ThreadRepository(ABC):
         """Get all messages for a thread"""
         pass
 
+    @abstractmethod
+    async def get_messages_after(self, thread_id: str, message_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the messages of a thread stored after a message, all of them without one, in storage order"""
+        pass
+
     @abstractmethod
     async def get_threads_by_user_id(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all threads created by a user"""
@@ -0,0 +1,66 @@
+import dataclasses
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional, Tuple
+
+from config.settings import settings
+
+
+class AnalysisCache:
+    """In-process LRU cache for computed network analyses
+
+    Keys are built from the analysed source (a chat file or a Wikipedia thread),
+    a version marker that changes whenever the source changes, and the analysis
+    parameters, so a stale entry can never be served for modified input.
+    Safe to use from worker threads.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(source: str, source_id: str, version: Hashable, params: Any = None,
+                 exclude: Iterable[str] = ()) -> Tuple:
+        """Build a cache key from a source identity, its version and analysis parameters
+
+        Fields listed in ``exclude`` are left out of the key, for options that
+        only post-process a result and should share the cached analysis.
+        """
+        if params is not None and dataclasses.is_dataclass(params):
+            fields = dataclasses.asdict(params)
+            for name in exclude:
+                fields.pop(name, None)
+            params = json.dumps(fields, sort_keys=True, default=str)
+        return source, source_id, version, params
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return a cached value and mark it as recently used"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond the limit"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, source: str, source_id: str) -> None:
+        """Drop every cached entry for a source"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == source and key[1] == source_id]
+            for key in stale:
+                del self._entries[key]
+
+
+analysis_cache = AnalysisCache(settings.ANALYSIS_CACHE_SIZE)
+
+# Centralities keyed by the structure of the graph they were computed on
+centrality_cache = AnalysisCache(settings.CENTRALITY_CACHE_SIZE)
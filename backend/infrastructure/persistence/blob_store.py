@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import uuid
+from contextlib import suppress
+from pathlib import Path
+from typing import Any, AsyncIterable, Dict, Optional
+
+from config.settings import settings
+from infrastructure.persistence.compression import compress_file, is_compressed
+from infrastructure.persistence.file_storage import StoredFile, ensure_dir, ensure_dir_sync, write_stream
+
+
+class BlobStore:
+    """Content-addressed file storage with named references
+
+    Every distinct content is stored once, as ``.blobs/<sha[:2]>/<sha256>``.
+    A name is a path below the root, like ``<user_id>/<filename>``. It is a
+    hard link to its blob, so readers open it like any other file, plus a
+    small reference record ``.refs/<name>.json`` holding the content hash,
+    the uploader and the inode of the link. The link count
+    of a blob is its reference count: deleting the last name also removes
+    the blob. With ``STORAGE_COMPRESSION`` new blobs are stored as seekable
+    zstd, which the storage readers decompress transparently.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.blobs_dir = root / ".blobs"
+        self.refs_dir = root / ".refs"
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blobs_dir / sha256[:2] / sha256
+
+    def reference_path(self, name: str) -> Path:
+        return self.refs_dir / f"{name}.json"
+
+    async def incoming_path(self) -> Path:
+        """A fresh path on the blob file system to write new content to before ``commit``"""
+        return (await ensure_dir(self.blobs_dir / "incoming")) / uuid.uuid4().hex
+
+    async def store(self, chunks: AsyncIterable[bytes], name: str, user_id: Optional[str] = None,
+                    max_size: Optional[int] = None, metadata: Optional[Dict[str, Any]] = None) -> StoredFile:
+        """Stream content into the store and point ``name`` at it"""
+        incoming = await self.incoming_path()
+        stored = await write_stream(chunks, incoming, max_size, compress=settings.STORAGE_COMPRESSION)
+        return await self.commit(incoming, stored, name, user_id, metadata)
+
+    async def commit(self, incoming: Path, stored: StoredFile, name: str, user_id: Optional[str] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> StoredFile:
+        """Move a complete file written to an ``incoming_path`` into the store under ``name``
+
+        Content that is already stored is not written again; the new file is
+        dropped and ``name`` becomes one more link to the existing blob.
+        ``metadata`` is kept in the reference record of the name.
+        """
+        return await asyncio.to_thread(self._commit, incoming, stored, name, user_id, metadata)
+
+    def _commit(self, incoming: Path, stored: StoredFile, name: str, user_id: Optional[str],
+                metadata: Optional[Dict[str, Any]]) -> StoredFile:
+        blob = self.blob_path(stored.sha256)
+        ensure_dir_sync(blob.parent)
+        ensure_dir_sync((self.root / name).parent)
+        link = self.root / f".link-{uuid.uuid4().hex}"
+        try:
+            if settings.STORAGE_COMPRESSION and not blob.exists() and not is_compressed(incoming):
+                compress_file(incoming)
+            with suppress(FileExistsError):
+                os.link(incoming, blob)
+            try:
+                os.link(blob, link)
+            except FileNotFoundError:
+                # The blob was collected in the meantime, the new file has the same content
+                os.link(incoming, link)
+
+            previous = self.reference(name)
+            self._write_reference(name, {
+                "sha256": stored.sha256,
+                "size": stored.size,
+                "lines": stored.lines,
+                "user_id": user_id,
+                "inode": os.stat(link).st_ino,
+                **(metadata or {})
+            })
+            os.replace(link, self.root / name)
+        finally:
+            with suppress(FileNotFoundError):
+                os.unlink(link)
+            with suppress(FileNotFoundError):
+                os.unlink(incoming)
+
+        if previous and previous["sha256"] != stored.sha256:
+            self._collect(previous["sha256"])
+        return stored._replace(filename=name)
+
+    def _write_reference(self, name: str, reference: Dict[str, Any]) -> None:
+        path = self.reference_path(name)
+        temp_path = ensure_dir_sync(path.parent) / f".{path.name}.{uuid.uuid4().hex}"
+        temp_path.write_text(json.dumps(reference))
+        os.replace(temp_path, path)
+
+    def reference(self, name: str) -> Optional[Dict[str, Any]]:
+        """Reference record of a name, ``None`` for names not stored through the blob store"""
+        try:
+            return json.loads(self.reference_path(name).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def content_hash(self, name: str) -> Optional[str]:
+        """SHA-256 of the content behind a name (blocking)
+
+        ``None`` if the name has no reference or its file was replaced
+        outside the store since, in which case the hash is unknown.
+        """
+        reference = self.reference(name)
+        if reference is None:
+            return None
+        try:
+            inode = os.stat(self.root / name).st_ino
+        except FileNotFoundError:
+            return None
+        return reference["sha256"] if inode == reference["inode"] else None
+
+    def references(self, sha256: str) -> int:
+        """Number of names linked to a blob"""
+        try:
+            return os.stat(self.blob_path(sha256)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def delete(self, name: str) -> bool:
+        """Remove a name and its reference, and the blob once nothing links to it (blocking)"""
+        reference = self.reference(name)
+        deleted = False
+        with suppress(FileNotFoundError):
+            os.unlink(self.root / name)
+            deleted = True
+        if reference is not None:
+            with suppress(FileNotFoundError):
+                os.unlink(self.reference_path(name))
+            self._collect(reference["sha256"])
+        return deleted
+
+    def rename(self, name: str, new_name: str) -> None:
+        """Move a name and its reference to ``new_name``, keeping the blob (blocking)"""
+        os.replace(self.root / name, ensure_dir_sync((self.root / new_name).parent) / Path(new_name).name)
+        if self.reference(name) is not None:
+            ensure_dir_sync(self.reference_path(new_name).parent)
+            os.replace(self.reference_path(name), self.reference_path(new_name))
+
+    def _collect(self, sha256: str) -> None:
+        """Remove a blob that no name links to any more"""
+        if self.references(sha256) == 0:
+            with suppress(FileNotFoundError):
+                os.unlink(self.blob_path(sha256))
@@ -0,0 +1,185 @@
+import io
+import os
+import struct
+from contextlib import suppress
+from pathlib import Path
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import zstandard
+
+from config.settings import settings
+
+# Zstandard seekable format: independent frames followed by a skippable frame holding the seek table
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_SKIPPABLE_MAGIC = 0x184D2A5E
+_SEEKABLE_MAGIC = 0x8F92EAB1
+_SKIPPABLE_HEADER = struct.Struct("<II")
+_ENTRY = struct.Struct("<II")
+_FOOTER = struct.Struct("<IBI")
+_CHECKSUM_FLAG = 0x80
+
+
+class SeekableZstdWriter:
+    """Compress a stream into independent zstd frames of ``frame_size`` input bytes and a seek table
+
+    The output is a valid zstd stream (the seek table is a skippable frame),
+    so ``zstd -d`` reads it, while ``SeekableZstdReader`` can decompress any
+    range by touching only the frames that overlap it.
+    """
+
+    def __init__(self, level: Optional[int] = None, frame_size: Optional[int] = None):
+        level = settings.STORAGE_COMPRESSION_LEVEL if level is None else level
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.frame_size = frame_size or settings.STORAGE_COMPRESSION_FRAME_SIZE
+        self._pending = bytearray()
+        self._entries: List[Tuple[int, int]] = []
+
+    def write(self, data: bytes) -> bytes:
+        """Add input, returning the compressed frames it completed"""
+        self._pending += data
+        frames = []
+        while len(self._pending) >= self.frame_size:
+            frames.append(self._frame(bytes(self._pending[:self.frame_size])))
+            del self._pending[:self.frame_size]
+        return b"".join(frames)
+
+    def finish(self) -> bytes:
+        """The last frame and the seek table"""
+        frame = self._frame(bytes(self._pending)) if self._pending else b""
+        self._pending.clear()
+        table = b"".join(_ENTRY.pack(*entry) for entry in self._entries)
+        table += _FOOTER.pack(len(self._entries), 0, _SEEKABLE_MAGIC)
+        return frame + _SKIPPABLE_HEADER.pack(_SKIPPABLE_MAGIC, len(table)) + table
+
+    def _frame(self, data: bytes) -> bytes:
+        frame = self.compressor.compress(data)
+        self._entries.append((len(frame), len(data)))
+        return frame
+
+
+class SeekTable(NamedTuple):
+    """Start offsets of every frame in the file and in the content, each ending with the total size"""
+    compressed: np.ndarray
+    decompressed: np.ndarray
+
+
+def read_seek_table(f: BinaryIO) -> Optional[SeekTable]:
+    """Seek table of a seekable zstd file, ``None`` for any other file"""
+    f.seek(0)
+    head = f.read(4)
+    if head != _ZSTD_MAGIC and head != _SKIPPABLE_MAGIC.to_bytes(4, "little"):
+        return None
+    end = f.seek(0, io.SEEK_END)
+    if end < _SKIPPABLE_HEADER.size + _FOOTER.size:
+        return None
+    f.seek(end - _FOOTER.size)
+    frame_count, descriptor, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != _SEEKABLE_MAGIC:
+        return None
+
+    fields = 3 if descriptor & _CHECKSUM_FLAG else 2
+    f.seek(end - _FOOTER.size - frame_count * fields * 4)
+    entries = np.frombuffer(f.read(frame_count * fields * 4), dtype="<u4").reshape(frame_count, fields)
+    return SeekTable(
+        np.r_[0, np.cumsum(entries[:, 0], dtype=np.int64)],
+        np.r_[0, np.cumsum(entries[:, 1], dtype=np.int64)]
+    )
+
+
+class SeekableZstdReader(io.RawIOBase):
+    """Seekable, read-only view of the content of a seekable zstd file
+
+    Reads decompress just the frame holding the current position, found by
+    binary search in the seek table, and keep it for the reads that follow.
+    """
+
+    def __init__(self, f: BinaryIO, table: SeekTable):
+        super().__init__()
+        self._file = f
+        self._table = table
+        self._decompressor = zstandard.ZstdDecompressor()
+        self._position = 0
+        self._frame = -1
+        self._data = memoryview(b"")
+
+    @property
+    def size(self) -> int:
+        return int(self._table.decompressed[-1])
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: self.size}[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self.size:
+            return 0
+        frame = int(np.searchsorted(self._table.decompressed, self._position, side="right")) - 1
+        if frame != self._frame:
+            start, end = int(self._table.compressed[frame]), int(self._table.compressed[frame + 1])
+            self._file.seek(start)
+            self._data = memoryview(self._decompressor.decompress(self._file.read(end - start)))
+            self._frame = frame
+        offset = self._position - int(self._table.decompressed[frame])
+        count = min(len(buffer), len(self._data) - offset)
+        buffer[:count] = self._data[offset:offset + count]
+        self._position += count
+        return count
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def open_content(path: Path) -> BinaryIO:
+    """Open a stored file for reading its content, decompressing it if it is a seekable zstd file"""
+    f = open(path, "rb")
+    try:
+        table = read_seek_table(f)
+    except BaseException:
+        f.close()
+        raise
+    if table is None:
+        f.seek(0)
+        return f
+    return io.BufferedReader(SeekableZstdReader(f, table), buffer_size=settings.STORAGE_COMPRESSION_FRAME_SIZE)
+
+
+def content_size(path: Path) -> int:
+    """Size of the content of a stored file, compressed or not"""
+    with open(path, "rb") as f:
+        table = read_seek_table(f)
+        return int(table.decompressed[-1]) if table is not None else f.seek(0, io.SEEK_END)
+
+
+def is_compressed(path: Path) -> bool:
+    with open(path, "rb") as f:
+        return read_seek_table(f) is not None
+
+
+def compress_file(path: Path) -> None:
+    """Replace a plain file with its seekable zstd compression (blocking)"""
+    temp_path = path.with_name(f"{path.name}.zst")
+    writer = SeekableZstdWriter()
+    try:
+        with open(path, "rb") as source, open(temp_path, "wb") as target:
+            while block := source.read(writer.frame_size):
+                target.write(writer.write(block))
+            target.write(writer.finish())
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
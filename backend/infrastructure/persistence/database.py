@@ -1,6 +1,6 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Callable
 
 from config.settings import settings
 
@@ -21,6 +21,10 @@ async_session_factory = sessionmaker(
     expire_on_commit=False
 )
 
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the request of a ``get_db_session`` session has committed, never if it rolls back"""
+    session.info.setdefault("after_commit", []).append(callback)
+
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """Get database session"""
     async with async_session_factory() as session:
@@ -29,4 +33,6 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
             await session.commit()
         except Exception:
             await session.rollback()
-            raise
\ No newline at end of file
+            raise
+        for callback in session.info.pop("after_commit", []):
+            callback()
\ No newline at end of file
@@ -1,9 +1,191 @@
 import aiofiles
 import aiofiles.os
+import errno
+import hashlib
+import json
+import re
+import shutil
+import tempfile
+import time
+import uuid
 import os
+from contextlib import suppress
 from pathlib import Path
 import asyncio
-from typing import List
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, NamedTuple, Optional, Set
+
+from config.settings import settings
+from infrastructure.persistence.compression import SeekableZstdWriter, content_size, open_content
+from domain.exceptions.domain_exceptions import (
+    EntityNotFoundException, UploadTooLargeException, ValidationException
+)
+
+
+class StoredFile(NamedTuple):
+    """A stored upload with the size, line count and SHA-256 computed while writing it"""
+    filename: str
+    size: int
+    lines: int
+    sha256: str
+
+
+def safe_filename(filename: Optional[str]) -> str:
+    """The final component of an uploaded file name, rejecting names that could escape the storage dir"""
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    if not name or name.startswith("."):
+        raise ValidationException(f"Invalid file name '{filename}'")
+    return name
+
+
+# Directories known to exist, so that every access does not cost a makedirs system call
+_known_dirs: Set[Path] = set()
+
+
+def ensure_dir_sync(path: Path) -> Path:
+    """Create a directory once per process (blocking variant for constructors)"""
+    if path not in _known_dirs:
+        os.makedirs(path, exist_ok=True)
+        _known_dirs.add(path)
+    return path
+
+
+async def ensure_dir(path: Path) -> Path:
+    """Create a directory once per process, on a worker thread"""
+    if path not in _known_dirs:
+        await aiofiles.os.makedirs(path, exist_ok=True)
+        _known_dirs.add(path)
+    return path
+
+
+def read_file(path: Path) -> Optional[bytes]:
+    """Whole content of a file, ``None`` if it does not exist (blocking, run it on a worker thread)"""
+    try:
+        with open_content(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def read_range(path: Path, offset: int, length: int) -> Optional[bytes]:
+    """Up to ``length`` bytes from ``offset`` of a file, ``None`` if it does not exist (blocking)"""
+    try:
+        with open_content(path) as f:
+            f.seek(offset)
+            return f.read(length)
+    except FileNotFoundError:
+        return None
+
+
+async def iter_file(path: Path, start: int = 0, end: Optional[int] = None,
+                    chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+    """Stream the bytes ``[start, end)`` of a file in chunks, every read on a worker thread"""
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    f = await asyncio.to_thread(open_content, path)
+    try:
+        await asyncio.to_thread(f.seek, start)
+        position = start
+        while end is None or position < end:
+            chunk = await asyncio.to_thread(f.read, chunk_size if end is None else min(chunk_size, end - position))
+            if not chunk:
+                break
+            position += len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+async def write_stream(chunks: AsyncIterable[bytes], path: Path, max_size: Optional[int] = None,
+                       expected_size: Optional[int] = None, compress: bool = False) -> StoredFile:
+    """Stream chunks to ``path`` through a temporary file in the same directory
+
+    Hash, size and line count are updated chunk by chunk during the copy,
+    which runs on a worker thread. The temporary file is fsynced and renamed
+    into place only once complete, so readers never see a partial file, and
+    it is removed if the upload fails, exceeds ``max_size`` bytes or does not
+    have exactly ``expected_size`` bytes. With ``compress`` the file is
+    written as seekable zstd; the description is always of the raw content.
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    fd, temp_path = await asyncio.to_thread(tempfile.mkstemp, dir=path.parent, prefix=".upload-", suffix=".part")
+    digest = hashlib.sha256()
+    encoder = SeekableZstdWriter() if compress else None
+    size = lines = 0
+    last = b"\n"
+    try:
+        with os.fdopen(fd, "wb") as f:
+            def write(chunk: bytes) -> int:
+                f.write(encoder.write(chunk) if encoder else chunk)
+                digest.update(chunk)
+                return chunk.count(b"\n")
+
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeException(max_size)
+                lines += await asyncio.to_thread(write, chunk)
+                last = chunk[-1:]
+            if expected_size is not None and size != expected_size:
+                raise ValidationException(f"Expected {expected_size} bytes, received {size}")
+            if encoder:
+                await asyncio.to_thread(lambda: f.write(encoder.finish()))
+
+            await asyncio.to_thread(f.flush)
+            await asyncio.to_thread(os.fsync, f.fileno())
+        await asyncio.to_thread(os.replace, temp_path, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.unlink(temp_path)
+        raise
+
+    # A last line without a trailing newline still counts
+    return StoredFile(path.name, size, lines + (last != b"\n"), digest.hexdigest())
+
+
+
+def _append_file(source_fd: int, target_fd: int, size: int) -> None:
+    """Append ``size`` bytes of one file to another inside the kernel
+
+    Uses ``copy_file_range`` (which can share extents on reflink file
+    systems), then ``sendfile``, and only copies through user space where
+    neither is supported.
+    """
+    remaining = size
+    for copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if copy is None:
+            continue
+        try:
+            while remaining:
+                if copy is os.sendfile:
+                    copied = os.sendfile(target_fd, source_fd, None, remaining)
+                else:
+                    copied = copy(source_fd, target_fd, remaining)
+                if copied == 0:
+                    raise ValidationException("Upload chunk changed while it was being assembled")
+                remaining -= copied
+            return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    while remaining:
+        block = os.read(source_fd, min(remaining, 1024 * 1024))
+        os.write(target_fd, block)
+        remaining -= len(block)
+
+
+def _describe(path: Path) -> StoredFile:
+    """Size, line count and SHA-256 of a file, read block by block"""
+    digest = hashlib.sha256()
+    size = lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+            size += len(block)
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return StoredFile(path.name, size, lines + (last != b"\n"), digest.hexdigest())
 
 
 class FileStorage:
@@ -14,9 +196,7 @@ class FileStorage:
 
     async def _get_user_dir(self, user_id: str) -> Path:
         """Get user-specific directory path and ensure it exists"""
-        user_dir = self.storage_root / user_id
-        await aiofiles.os.makedirs(user_dir, exist_ok=True)
-        return user_dir
+        return await ensure_dir(self.storage_root / user_id)
 
     async def upload_file(self, content: bytes, filename: str, user_id: str) -> None:
         """Store file in user-specific directory"""
@@ -26,14 +206,28 @@ class FileStorage:
         async with aiofiles.open(file_path, "wb") as f:
             await f.write(content)
 
+    async def upload_stream(self, chunks: AsyncIterable[bytes], filename: str, user_id: str) -> StoredFile:
+        """Stream a file into the user-specific directory without holding it in memory"""
+        user_dir = await self._get_user_dir(user_id)
+        return await write_stream(chunks, user_dir / safe_filename(filename))
+
     async def get_file_content(self, filename: str) -> bytes:
         """Retrieve file content from storage root (unsafe - prefer user-specific method)"""
-        file_path = self.storage_root / filename
-        if not await aiofiles.os.path.exists(file_path):
+        content = await asyncio.to_thread(read_file, self.storage_root / filename)
+        if content is None:
             raise FileNotFoundError(f"File {filename} not found")
+        return content
 
-        async with aiofiles.open(file_path, "rb") as f:
-            return await f.read()
+    async def get_size(self, filename: str) -> Optional[int]:
+        """Size of a file in the storage root, ``None`` if it does not exist"""
+        try:
+            return await asyncio.to_thread(content_size, self.storage_root / filename)
+        except FileNotFoundError:
+            return None
+
+    def stream(self, filename: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream the bytes ``[start, end)`` of a file in the storage root"""
+        return iter_file(self.storage_root / filename, start, end)
 
     async def delete_file(self, filename: str) -> None:
         """Delete file from storage root (unsafe - prefer user-specific method)"""
@@ -61,10 +255,120 @@ class FileStorage:
     async def safe_get_content(self, user_id: str, filename: str) -> bytes:
         """Safer content retrieval within user directory"""
         user_dir = await self._get_user_dir(user_id)
-        file_path = user_dir / filename
-
-        if not await aiofiles.os.path.exists(file_path):
+        content = await asyncio.to_thread(read_file, user_dir / filename)
+        if content is None:
             raise FileNotFoundError(f"File {filename} not found for user {user_id}")
+        return content
+
+    def get_file_path(self, filename: str) -> str:
+        """Get the full path to a file in the storage root"""
+        return str(self.storage_root / filename)
+
+    # Resumable uploads: every session is a directory under the user's ".uploads" directory
+    # holding its metadata and one file per received chunk, named by the chunk index.
+
+    async def _session_dir(self, user_id: str, upload_id: str) -> Path:
+        """Directory of an existing upload session of a user"""
+        session_dir = (await self._get_user_dir(user_id)) / ".uploads" / upload_id
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id) or not await aiofiles.os.path.exists(session_dir):
+            raise EntityNotFoundException("Upload session", upload_id)
+        return session_dir
+
+    async def create_upload_session(self, user_id: str, filename: str, size: int, chunk_size: int) -> Dict[str, Any]:
+        """Start a resumable upload of ``size`` bytes sent in chunks of ``chunk_size`` bytes"""
+        uploads_dir = await ensure_dir((await self._get_user_dir(user_id)) / ".uploads")
+        await asyncio.to_thread(self._expire_sessions, uploads_dir)
+
+        session = {
+            "upload_id": uuid.uuid4().hex,
+            "filename": safe_filename(filename),
+            "size": size,
+            "chunk_size": chunk_size,
+            "created": time.time()
+        }
+        session_dir = uploads_dir / session["upload_id"]
+        await aiofiles.os.makedirs(session_dir)
+        async with aiofiles.open(session_dir / "session.json", "w") as f:
+            await f.write(json.dumps(session))
+        return session
+
+    @staticmethod
+    def _expire_sessions(uploads_dir: Path) -> None:
+        """Remove the sessions older than ``UPLOAD_SESSION_TTL_HOURS``"""
+        if not uploads_dir.exists():
+            return
+        deadline = time.time() - settings.UPLOAD_SESSION_TTL_HOURS * 3600
+        for session_dir in uploads_dir.iterdir():
+            if session_dir.stat().st_mtime < deadline:
+                shutil.rmtree(session_dir, ignore_errors=True)
+
+    async def get_upload_session(self, user_id: str, upload_id: str) -> Dict[str, Any]:
+        """Metadata of an upload session with ``received``, the sizes of the received chunks by index"""
+        session_dir = await self._session_dir(user_id, upload_id)
+        async with aiofiles.open(session_dir / "session.json") as f:
+            session = json.loads(await f.read())
+        names = await aiofiles.os.listdir(session_dir)
+        session["received"] = {
+            int(name[:-len(".chunk")]): (await aiofiles.os.stat(session_dir / name)).st_size
+            for name in names if name.endswith(".chunk")
+        }
+        return session
+
+    @staticmethod
+    def chunk_length(session: Dict[str, Any], index: int) -> int:
+        """Number of bytes of a chunk, the last one holds the remainder"""
+        chunk_count = max(1, -(-session["size"] // session["chunk_size"]))
+        if not 0 <= index < chunk_count:
+            raise ValidationException(f"Chunk index must be between 0 and {chunk_count - 1}")
+        return min(session["chunk_size"], session["size"] - index * session["chunk_size"])
+
+    async def write_upload_chunk(self, user_id: str, upload_id: str, index: int,
+                                 chunks: AsyncIterable[bytes]) -> StoredFile:
+        """Store one chunk of an upload session, replacing an earlier copy of the same chunk"""
+        session = await self.get_upload_session(user_id, upload_id)
+        length = self.chunk_length(session, index)
+        session_dir = await self._session_dir(user_id, upload_id)
+        return await write_stream(chunks, session_dir / f"{index}.chunk", max_size=length, expected_size=length)
+
+    async def assemble_upload(self, user_id: str, upload_id: str, destination: Path, sha256: str) -> StoredFile:
+        """Concatenate the chunks of a complete session into ``destination`` and end the session
+
+        The chunks are joined in the kernel into a temporary file next to
+        the destination, which is checked against ``sha256`` before it is
+        renamed into place. On a checksum mismatch the session is kept so
+        that chunks can be sent again.
+        """
+        session = await self.get_upload_session(user_id, upload_id)
+        chunk_count = max(1, -(-session["size"] // session["chunk_size"]))
+        missing = [index for index in range(chunk_count) if index not in session["received"]]
+        if missing and session["size"]:
+            raise ValidationException(f"Upload is missing chunks {missing[:20]}")
+        session_dir = await self._session_dir(user_id, upload_id)
+
+        def assemble() -> StoredFile:
+            fd, temp_path = tempfile.mkstemp(dir=destination.parent, prefix=".upload-", suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as target:
+                    for index in range(chunk_count if session["size"] else 0):
+                        with open(session_dir / f"{index}.chunk", "rb") as source:
+                            _append_file(source.fileno(), target.fileno(), session["received"][index])
+                    target.flush()
+                    os.fsync(target.fileno())
+                stored = _describe(Path(temp_path))
+                if stored.sha256 != sha256.lower():
+                    raise ValidationException("Checksum mismatch, the assembled file does not match the given SHA-256")
+                os.replace(temp_path, destination)
+            except BaseException:
+                with suppress(FileNotFoundError):
+                    os.unlink(temp_path)
+                raise
+            return stored._replace(filename=destination.name)
+
+        stored = await asyncio.to_thread(assemble)
+        await asyncio.to_thread(shutil.rmtree, session_dir, True)
+        return stored
 
-        async with aiofiles.open(file_path, "rb") as f:
-            return await f.read()
\ No newline at end of file
+    async def delete_upload_session(self, user_id: str, upload_id: str) -> None:
+        """Abort an upload session and remove its chunks"""
+        session_dir = await self._session_dir(user_id, upload_id)
+        await asyncio.to_thread(shutil.rmtree, session_dir, True)
@@ -1,3 +1,5 @@
 from .research import ResearchModel
 from .thread import Thread
-from .message import Message
\ No newline at end of file
+from .message import Message
+from .file import FileModel
+from .chat_message import ChatSourceModel, ChatMessageModel
\ No newline at end of file
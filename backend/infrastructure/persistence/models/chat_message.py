@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from infrastructure.persistence.database import Base
+
+
+class ChatSourceModel(Base):
+    """SQLAlchemy model for a chat export content loaded into ``chat_messages``, keyed by its SHA-256"""
+    __tablename__ = "chat_sources"
+
+    source = Column(String(64), primary_key=True)
+    senders = Column(ARRAY(String), nullable=False)
+    entry_count = Column(Integer, nullable=False)
+    loaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ChatMessageModel(Base):
+    """SQLAlchemy model for the entries of loaded chat exports
+
+    Every key and index leads with ``source``, so the table can be
+    partitioned by it. ``sender_id`` indexes the ``senders`` of the source
+    (-1 for system entries).
+    """
+    __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_source_timestamp", "source", "timestamp"),
+        Index("ix_chat_messages_source_sender_id", "source", "sender_id"),
+    )
+
+    source = Column(String(64), ForeignKey("chat_sources.source", ondelete="CASCADE"), primary_key=True)
+    entry = Column(Integer, primary_key=True)
+    timestamp = Column(DateTime, nullable=False)
+    sender_id = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    is_message = Column(Boolean, nullable=False)
+    content = Column(String, nullable=False)
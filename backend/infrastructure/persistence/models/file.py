@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, DateTime, Integer, BigInteger, ForeignKey, Index, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from uuid import uuid4
+
+from infrastructure.persistence.database import Base
+
+
+class FileModel(Base):
+    """SQLAlchemy model for the file catalog, one row per uploaded file of a user"""
+    __tablename__ = "files"
+    __table_args__ = (
+        UniqueConstraint("user_id", "filename", name="uq_files_user_id_filename"),
+        Index("ix_files_user_id_uploaded_at", "user_id", "uploaded_at"),
+    )
+
+    id = Column(UUID, primary_key=True, default=lambda: str(uuid4()))
+    user_id = Column(UUID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    lines = Column(Integer, nullable=False, default=0)
+    message_count = Column(Integer, nullable=True)
+    participants = Column(ARRAY(String), nullable=False, default=list)
+    first_message_at = Column(DateTime, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+    attachment_count = Column(Integer, nullable=False, default=0)
+    ingest_status = Column(String, nullable=False, default="pending")
+    ingest_error = Column(String, nullable=True)
+    uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
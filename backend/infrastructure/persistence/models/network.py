@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, ForeignKey, DateTime, func
+from sqlalchemy import Column, String, Float, Integer, Boolean, ForeignKey, DateTime, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
@@ -11,11 +11,17 @@ class NetworkAnalysisModel(Base):
     __tablename__ = "network_analyses"
 
     id = Column(UUID, primary_key=True, default=lambda: str(uuid4()))
-    research_id = Column(UUID, ForeignKey("researches.id", ondelete="CASCADE"), nullable=False)
+    research_id = Column(UUID, ForeignKey("researches.id", ondelete="CASCADE"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     node_count = Column(Integer, nullable=True)
     edge_count = Column(Integer, nullable=True)
     density = Column(Float, nullable=True)
+    source_type = Column(String, nullable=True)
+    source_id = Column(String, nullable=True)
+    position = Column(Integer, nullable=False, default=0)
+    directed = Column(Boolean, nullable=False, default=False)
+    version = Column(String(64), nullable=True)
+    error = Column(String, nullable=True)
 
     # Relationships
     research = relationship("ResearchModel", backref="analyses")
@@ -29,7 +35,8 @@ class NodeModel(Base):
 
     id = Column(UUID, primary_key=True, default=lambda: str(uuid4()))
     node_id = Column(String, nullable=False)
-    analysis_id = Column(UUID, ForeignKey("network_analyses.id", ondelete="CASCADE"), nullable=False)
+    analysis_id = Column(UUID, ForeignKey("network_analyses.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
     messages = Column(Integer, default=0)
     degree = Column(Float, default=0.0)
     betweenness = Column(Float, default=0.0)
@@ -46,4 +53,5 @@ class LinkModel(Base):
     source = Column(String, nullable=False)
     target = Column(String, nullable=False)
     weight = Column(Integer, default=1)
-    analysis_id = Column(UUID, ForeignKey("network_analyses.id", ondelete="CASCADE"), nullable=False)
\ No newline at end of file
+    analysis_id = Column(UUID, ForeignKey("network_analyses.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False, default=0)
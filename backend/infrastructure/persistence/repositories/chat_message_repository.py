@@ -0,0 +1,99 @@
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import BigInteger, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from domain.repositories.chat_message_repository import ChatMessageFilter, ChatMessageRepository, ChatMessageRow
+from infrastructure.persistence.models.chat_message import ChatMessageModel, ChatSourceModel
+
+_COPY_COLUMNS = ("source", "entry", "timestamp", "sender_id", "length", "is_message", "content")
+
+
+class SQLAlchemyChatMessageRepository(ChatMessageRepository):
+    """SQLAlchemy implementation of ChatMessageRepository
+
+    Entries are bulk loaded with ``COPY`` on the session's own connection
+    and transaction; filtered selections stream back just the sender id and
+    epoch second of every message.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_senders(self, source: str) -> Optional[List[str]]:
+        """Senders of a loaded content, indexed by sender id; ``None`` if it is not loaded"""
+        query = select(ChatSourceModel.senders).where(ChatSourceModel.source == source)
+        senders = (await self.session.execute(query)).scalar_one_or_none()
+        return list(senders) if senders is not None else None
+
+    async def load(self, source: str, senders: List[str], rows: Iterable[ChatMessageRow]) -> int:
+        """Bulk load the entries of a content with COPY, replacing any earlier load of it"""
+        # Deleting the source cascades to its entries
+        await self.session.execute(delete(ChatSourceModel).where(ChatSourceModel.source == source))
+        self.session.add(ChatSourceModel(source=source, senders=senders, entry_count=0))
+        await self.session.flush()
+
+        count = 0
+
+        def records() -> Iterator[tuple]:
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield (source, *row)
+
+        connection = await self.session.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            ChatMessageModel.__tablename__, records=records(), columns=_COPY_COLUMNS
+        )
+        await self.session.execute(
+            update(ChatSourceModel).where(ChatSourceModel.source == source).values(entry_count=count)
+        )
+        return count
+
+    async def select(self, source: str, message_filter: ChatMessageFilter) -> Tuple[np.ndarray, np.ndarray]:
+        """Sender ids and epoch seconds of the filtered messages of a content, in entry order"""
+        in_range = [ChatMessageModel.source == source]
+        if message_filter.start:
+            in_range.append(ChatMessageModel.timestamp >= message_filter.start)
+        if message_filter.end:
+            in_range.append(ChatMessageModel.timestamp <= message_filter.end)
+
+        conditions = list(in_range)
+        if message_filter.limit and message_filter.limit_type in ("first", "last"):
+            # The limit counts every entry in the date range, system entries included
+            order = ChatMessageModel.entry.asc()
+            if message_filter.limit_type == "last":
+                order = ChatMessageModel.entry.desc()
+            conditions.append(ChatMessageModel.entry.in_(
+                select(ChatMessageModel.entry).where(*in_range).order_by(order).limit(message_filter.limit)
+            ))
+
+        conditions.append(ChatMessageModel.is_message)
+        if message_filter.min_length:
+            conditions.append(ChatMessageModel.length >= message_filter.min_length)
+        if message_filter.max_length:
+            conditions.append(ChatMessageModel.length <= message_filter.max_length)
+        if message_filter.sender_ids is not None:
+            conditions.append(ChatMessageModel.sender_id.in_(list(message_filter.sender_ids)))
+        if message_filter.keywords:
+            content = func.lower(ChatMessageModel.content)
+            conditions.append(or_(*(func.strpos(content, keyword) > 0 for keyword in message_filter.keywords)))
+
+        query = (
+            select(ChatMessageModel.sender_id, func.extract("epoch", ChatMessageModel.timestamp).cast(BigInteger))
+            .where(*conditions)
+            .order_by(ChatMessageModel.entry)
+            .execution_options(yield_per=settings.CHAT_MESSAGES_FETCH_SIZE)
+        )
+        result = await self.session.stream(query)
+        batches = [np.array(partition, dtype=np.int64).reshape(-1, 2) async for partition in result.partitions()]
+        rows = np.concatenate(batches) if batches else np.zeros((0, 2), dtype=np.int64)
+        return rows[:, 0], rows[:, 1]
+
+    async def delete(self, source: str) -> bool:
+        """Delete the entries of a content"""
+        result = await self.session.execute(delete(ChatSourceModel).where(ChatSourceModel.source == source))
+        return result.rowcount > 0
@@ -0,0 +1,128 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.entities.file import FileRecord, INGEST_STAGES
+from domain.repositories.file_catalog_repository import FileCatalogRepository
+from infrastructure.persistence.models.file import FileModel
+
+# Columns replaced when a user uploads a file under a name they already use
+_UPDATED_COLUMNS = (
+    "size", "sha256", "lines", "message_count", "participants",
+    "first_message_at", "last_message_at", "attachment_count", "ingest_status", "ingest_error"
+)
+
+# Columns the ingest of a file fills in after the upload
+_SUMMARY_COLUMNS = (
+    "message_count", "participants", "first_message_at", "last_message_at", "ingest_status", "ingest_error"
+)
+
+
+def _to_entity(db_file: FileModel) -> FileRecord:
+    return FileRecord(
+        record_id=str(db_file.id),
+        user_id=str(db_file.user_id),
+        filename=db_file.filename,
+        size=db_file.size,
+        sha256=db_file.sha256,
+        lines=db_file.lines,
+        message_count=db_file.message_count,
+        participants=list(db_file.participants or []),
+        first_message_at=db_file.first_message_at,
+        last_message_at=db_file.last_message_at,
+        attachment_count=db_file.attachment_count,
+        ingest_status=db_file.ingest_status,
+        ingest_error=db_file.ingest_error,
+        uploaded_at=db_file.uploaded_at
+    )
+
+
+class SQLAlchemyFileCatalogRepository(FileCatalogRepository):
+    """SQLAlchemy implementation of FileCatalogRepository"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def save(self, record: FileRecord) -> FileRecord:
+        """Create or replace the entry of a user's file in one upsert"""
+        values = {
+            "user_id": record.user_id,
+            "filename": record.filename,
+            **{column: getattr(record, column) for column in _UPDATED_COLUMNS}
+        }
+        statement = insert(FileModel).values(**values)
+        statement = statement.on_conflict_do_update(
+            constraint="uq_files_user_id_filename",
+            set_={**{column: statement.excluded[column] for column in _UPDATED_COLUMNS}, "uploaded_at": func.now()}
+        ).returning(FileModel)
+        result = await self.session.execute(statement)
+        saved = _to_entity(result.scalars().one())
+        # Committed right away: the background ingest of the file updates the entry from its own session
+        await self.session.commit()
+        return saved
+
+    async def get(self, user_id: str, filename: str) -> Optional[FileRecord]:
+        """Get the entry of a user's file"""
+        query = select(FileModel).where(FileModel.user_id == user_id, FileModel.filename == filename)
+        result = await self.session.execute(query)
+        db_file = result.scalars().first()
+        return _to_entity(db_file) if db_file else None
+
+    async def list_by_user(self, user_id: str, offset: int, limit: int) -> Tuple[List[FileRecord], int]:
+        """Get a page of a user's files, newest first, with the total counted by a window over the same scan"""
+        query = (
+            select(FileModel, func.count().over().label("total"))
+            .where(FileModel.user_id == user_id)
+            .order_by(FileModel.uploaded_at.desc(), FileModel.filename)
+            .offset(offset)
+            .limit(limit)
+        )
+        rows = (await self.session.execute(query)).all()
+        if rows:
+            return [_to_entity(row.FileModel) for row in rows], rows[0].total
+        if offset == 0:
+            return [], 0
+        # Past the last page the window has no rows to report the total on
+        total = await self.session.scalar(
+            select(func.count()).select_from(FileModel).where(FileModel.user_id == user_id)
+        )
+        return [], total or 0
+
+    async def update(self, record: FileRecord) -> bool:
+        """Store the summary and ingest status of an existing entry, keeping its upload time"""
+        query = (
+            update(FileModel)
+            .where(FileModel.user_id == record.user_id, FileModel.filename == record.filename)
+            .values(**{column: getattr(record, column) for column in _SUMMARY_COLUMNS})
+        )
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def set_ingest_status(self, user_id: str, filename: str, status: str,
+                                error: Optional[str] = None) -> bool:
+        """Record the ingest stage of a user's file"""
+        query = (
+            update(FileModel)
+            .where(FileModel.user_id == user_id, FileModel.filename == filename)
+            .values(ingest_status=status, ingest_error=error)
+        )
+        result = await self.session.execute(query)
+        return result.rowcount > 0
+
+    async def list_unfinished(self) -> List[FileRecord]:
+        """Get the entries of all users whose ingest is neither ready nor failed, oldest first"""
+        query = (
+            select(FileModel)
+            .where(FileModel.ingest_status.in_(("pending",) + INGEST_STAGES))
+            .order_by(FileModel.uploaded_at)
+        )
+        result = await self.session.execute(query)
+        return [_to_entity(db_file) for db_file in result.scalars().all()]
+
+    async def delete(self, user_id: str, filename: str) -> bool:
+        """Delete the entry of a user's file"""
+        query = delete(FileModel).where(FileModel.user_id == user_id, FileModel.filename == filename)
+        result = await self.session.execute(query)
+        return result.rowcount > 0
@@ -1,27 +1,41 @@
+import asyncio
 import os
-from typing import Optional, List
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Dict, Optional, List
 from datetime import datetime
 
-from application.services.file_service import FileService
+from domain.entities.file import storage_name
 from domain.repositories.file_repository import FileRepository
 from config.settings import settings
+from infrastructure.persistence.blob_store import BlobStore
+from infrastructure.persistence.compression import content_size, open_content
+from infrastructure.persistence.file_storage import (
+    StoredFile, ensure_dir_sync, iter_file, read_file, read_range, safe_filename
+)
 
 
-class LocalFileRepository(FileRepository, FileService):
-    """Local file system implementation of file storage"""
+async def _single_chunk(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+class LocalFileRepository(FileRepository):
+    """Local file system implementation of file storage
+
+    Uploads are deduplicated by content: every file name in the upload
+    folder links to one shared blob per distinct content (see ``BlobStore``).
+    File names are per user: an upload is stored as ``<user_id>/<filename>``
+    (see ``storage_name``), and that is the name every read and delete
+    takes. All file system calls run on worker threads so that slow disks
+    never block the event loop.
+    """
 
     def __init__(self):
-        super().__init__()
         # Ensure upload directory exists
-        os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
+        self.blobs = BlobStore(ensure_dir_sync(Path(settings.UPLOAD_FOLDER)))
 
     async def save(self, content: bytes, filename: str) -> str:
         """Save file content to disk"""
-        file_path = self.get_file_path(filename)
-
-        with open(file_path, "wb") as f:
-            f.write(content)
-
+        await self.blobs.store(_single_chunk(content), filename)
         return filename
 
     async def upload_file(self, file_content: bytes, filename: str) -> str:
@@ -32,44 +46,104 @@ class LocalFileRepository(FileRepository, FileService):
 
         return await self.save(file_content, unique_filename)
 
-    async def get_content(self, filename: str) -> Optional[bytes]:
-        """Get file content as bytes"""
-        file_path = self.get_file_path(filename)
+    async def upload_stream(self, chunks: AsyncIterable[bytes], filename: str, user_id: Optional[str] = None,
+                            metadata: Optional[Dict[str, Any]] = None) -> StoredFile:
+        """Stream a file into the upload folder under the uploader's name for it, where analyses look it up"""
+        filename = safe_filename(filename)
+        stored = await self.blobs.store(chunks, self._upload_name(filename, user_id), user_id, metadata=metadata)
+        return stored._replace(filename=filename)
 
-        if not os.path.exists(file_path):
-            return None
+    async def incoming_path(self) -> Path:
+        """Path to write a new file to before handing it to ``commit_file``"""
+        return await self.blobs.incoming_path()
+
+    async def commit_file(self, path: Path, stored: StoredFile, filename: str,
+                          user_id: Optional[str] = None) -> StoredFile:
+        """Store a complete file written to an ``incoming_path`` under the uploader's ``filename``"""
+        filename = safe_filename(filename)
+        stored = await self.blobs.commit(path, stored, self._upload_name(filename, user_id), user_id)
+        return stored._replace(filename=filename)
+
+    async def get_references(self, sha256: str) -> int:
+        """Number of file names, of any user, sharing a content"""
+        return await asyncio.to_thread(self.blobs.references, sha256)
+
+    async def get_metadata(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Reference record of a file (hash, size, uploader and upload metadata), ``None`` if there is none"""
+        return await asyncio.to_thread(self.blobs.reference, self._name(filename))
+
+    async def get_content_hash(self, filename: str) -> Optional[str]:
+        """SHA-256 of a file's content, ``None`` when it is not known without reading the file"""
+        return await asyncio.to_thread(self.blobs.content_hash, self._name(filename))
 
-        with open(file_path, "rb") as f:
-            return f.read()
+    async def get_content(self, filename: str) -> Optional[bytes]:
+        """Get file content as bytes"""
+        return await asyncio.to_thread(read_file, Path(self.get_file_path(filename)))
 
     async def get_file_content(self, filename: str) -> Optional[bytes]:
         """Get file content"""
         return await self.get_content(filename)
 
-    async def delete(self, filename: str) -> bool:
-        """Delete a file"""
-        file_path = self.get_file_path(filename)
+    async def get_range(self, filename: str, offset: int, length: int) -> Optional[bytes]:
+        """Get up to ``length`` bytes of a file starting at ``offset``"""
+        return await asyncio.to_thread(read_range, Path(self.get_file_path(filename)), offset, length)
+
+    def stream(self, filename: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Stream the bytes ``[start, end)`` of a file in ``UPLOAD_CHUNK_SIZE`` chunks"""
+        return iter_file(Path(self.get_file_path(filename)), start, end)
+
+    async def get_size(self, filename: str) -> Optional[int]:
+        """Size of a file in bytes"""
+        try:
+            return await asyncio.to_thread(content_size, Path(self.get_file_path(filename)))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
 
-        if not os.path.exists(file_path):
-            return False
+    def open(self, filename: str) -> BinaryIO:
+        """Open a file for reading its content, decompressed if stored compressed (blocking)"""
+        return open_content(Path(self.get_file_path(filename)))
 
-        os.remove(file_path)
-        return True
+    async def delete(self, filename: str) -> bool:
+        """Delete a file, and its content once no other file name shares it"""
+        return await asyncio.to_thread(self.blobs.delete, self._name(filename))
 
     async def delete_file(self, filename: str) -> bool:
         """Delete a file"""
         return await self.delete(filename)
 
     async def list_files(self, user_id: Optional[str] = None) -> List[str]:
-        """List available files"""
-        files = os.listdir(settings.UPLOAD_FOLDER)
-
-        if user_id:
-            # Filter files by user_id prefix
-            return [f for f in files if f.startswith(f"{user_id}_")]
-
-        return files
+        """List the files of a user (the shared files without one), leaving out uploads still in progress"""
+        folder = Path(settings.UPLOAD_FOLDER, safe_filename(user_id)) if user_id else Path(settings.UPLOAD_FOLDER)
+        try:
+            names = await asyncio.to_thread(os.listdir, folder)
+        except FileNotFoundError:
+            return []
+        return [name for name in names if not name.startswith(".") and (folder / name).is_file()]
+
+    def move_shared_files(self) -> int:
+        """Move shared files with a known uploader to that user's name for them (blocking)
+
+        Uploads stored before file names were per user have a single name
+        for everyone; this runs once to give each of them back to its uploader.
+        """
+        moved = 0
+        for name in os.listdir(self.blobs.root):
+            reference = None if name.startswith(".") else self.blobs.reference(name)
+            if reference and reference.get("user_id") and (self.blobs.root / name).is_file():
+                self.blobs.rename(name, storage_name(reference["user_id"], name))
+                moved += 1
+        return moved
 
     def get_file_path(self, filename: str) -> str:
         """Get the full path to a file"""
-        return os.path.join(settings.UPLOAD_FOLDER, filename)
+        return os.path.join(settings.UPLOAD_FOLDER, self._name(filename))
+
+    @staticmethod
+    def _upload_name(filename: str, user_id: Optional[str]) -> str:
+        return storage_name(safe_filename(user_id), filename) if user_id else filename
+
+    @staticmethod
+    def _name(name: str) -> str:
+        """A storage name, ``<user_id>/<filename>`` or a shared file name, that cannot leave the upload folder"""
+        user_id, _, filename = name.rpartition("/")
+        return storage_name(safe_filename(user_id), safe_filename(filename)) if user_id else safe_filename(filename)
@@ -0,0 +1,127 @@
+from collections import defaultdict
+from typing import Dict, List
+from uuid import uuid4
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.entities.network import Link, NetworkAnalysis, NetworkGraph, Node
+from domain.repositories.network_analysis_repository import NetworkAnalysisRepository
+from infrastructure.persistence.models.network import LinkModel, NetworkAnalysisModel, NodeModel
+
+
+class SQLAlchemyNetworkAnalysisRepository(NetworkAnalysisRepository):
+    """SQLAlchemy implementation of NetworkAnalysisRepository
+
+    Analyses, nodes and links are written with one multi-row insert per
+    table; ``position`` columns keep the order of analyses, nodes and links.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_by_research_id(self, research_id: str) -> List[NetworkAnalysis]:
+        """Get the stored analyses of a research, in the order they were stored"""
+        query = (
+            select(NetworkAnalysisModel)
+            .where(NetworkAnalysisModel.research_id == research_id)
+            .order_by(NetworkAnalysisModel.position)
+        )
+        db_analyses = (await self.session.execute(query)).scalars().all()
+        if not db_analyses:
+            return []
+        analysis_ids = [db_analysis.id for db_analysis in db_analyses]
+
+        nodes: Dict[str, List[Node]] = defaultdict(list)
+        query = select(NodeModel).where(NodeModel.analysis_id.in_(analysis_ids)).order_by(NodeModel.position)
+        for db_node in (await self.session.execute(query)).scalars():
+            nodes[str(db_node.analysis_id)].append(Node(
+                node_id=db_node.node_id,
+                messages=db_node.messages,
+                degree=db_node.degree,
+                betweenness=db_node.betweenness,
+                closeness=db_node.closeness,
+                eigenvector=db_node.eigenvector,
+                pagerank=db_node.pagerank
+            ))
+
+        links: Dict[str, List[Link]] = defaultdict(list)
+        query = select(LinkModel).where(LinkModel.analysis_id.in_(analysis_ids)).order_by(LinkModel.position)
+        for db_link in (await self.session.execute(query)).scalars():
+            links[str(db_link.analysis_id)].append(Link(
+                source=db_link.source,
+                target=db_link.target,
+                weight=db_link.weight
+            ))
+
+        return [
+            NetworkAnalysis(
+                analysis_id=str(db_analysis.id),
+                research_id=str(db_analysis.research_id),
+                version=db_analysis.version,
+                graph=None if db_analysis.error else NetworkGraph(
+                    nodes=nodes[str(db_analysis.id)], links=links[str(db_analysis.id)]
+                ),
+                source_type=db_analysis.source_type,
+                source_id=db_analysis.source_id,
+                directed=db_analysis.directed,
+                density=db_analysis.density,
+                error=db_analysis.error,
+                created_at=db_analysis.created_at
+            )
+            for db_analysis in db_analyses
+        ]
+
+    async def replace_for_research(self, research_id: str, analyses: List[NetworkAnalysis]) -> None:
+        """Replace the stored analyses of a research"""
+        # Nodes and links go with their analyses through ON DELETE CASCADE
+        await self.delete_by_research_id(research_id)
+
+        analysis_rows, node_rows, link_rows = [], [], []
+        for position, analysis in enumerate(analyses):
+            analysis_id = str(uuid4())
+            analysis_rows.append({
+                "id": analysis_id,
+                "research_id": research_id,
+                "node_count": analysis.node_count,
+                "edge_count": analysis.edge_count,
+                "density": analysis.density,
+                "source_type": analysis.source_type,
+                "source_id": analysis.source_id,
+                "position": position,
+                "directed": analysis.directed,
+                "version": analysis.version,
+                "error": analysis.error
+            })
+            if analysis.graph is None:
+                continue
+            node_rows.extend({
+                "id": str(uuid4()),
+                "analysis_id": analysis_id,
+                "position": index,
+                "node_id": node.id,
+                "messages": node.messages,
+                "degree": node.degree,
+                "betweenness": node.betweenness,
+                "closeness": node.closeness,
+                "eigenvector": node.eigenvector,
+                "pagerank": node.pagerank
+            } for index, node in enumerate(analysis.graph.nodes))
+            link_rows.extend({
+                "id": str(uuid4()),
+                "analysis_id": analysis_id,
+                "position": index,
+                "source": link.source,
+                "target": link.target,
+                "weight": link.weight
+            } for index, link in enumerate(analysis.graph.links))
+
+        for model, rows in ((NetworkAnalysisModel, analysis_rows), (NodeModel, node_rows), (LinkModel, link_rows)):
+            if rows:
+                await self.session.execute(insert(model), rows)
+
+    async def delete_by_research_id(self, research_id: str) -> bool:
+        """Delete the stored analyses of a research"""
+        query = delete(NetworkAnalysisModel).where(NetworkAnalysisModel.research_id == research_id)
+        result = await self.session.execute(query)
+        return result.rowcount > 0
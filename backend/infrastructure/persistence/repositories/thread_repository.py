@@ -2,7 +2,7 @@ from typing import List, Dict, Any, Optional
 from uuid import UUID
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
 from domain.repositories.thread_repository import ThreadRepository
 from infrastructure.persistence.models import Thread, Message
 
@@ -58,6 +58,30 @@ class SQLAlchemyThreadRepository(ThreadRepository):
             for message in messages
         ]
 
+    async def get_messages_after(self, thread_id: str, message_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get the messages of a thread stored after a message, all of them without one, in storage order"""
+        query = select(Message).where(Message.thread_id == thread_id)
+        if message_id is not None:
+            query = query.where(Message.message_id > message_id)
+        result = await self.session.execute(query.order_by(Message.message_id))
+
+        return [
+            {
+                "message_id": message.message_id,
+                "thread_id": str(message.thread_id),
+                "timestamp": message.timestamp,
+                "sender": message.sender,
+                "content": message.content
+            }
+            for message in result.scalars().all()
+        ]
+
+    async def count_messages_by_thread_id(self, thread_id: str) -> int:
+        """Count messages in a thread"""
+        query = select(func.count()).select_from(Message).where(Message.thread_id == thread_id)
+        result = await self.session.execute(query)
+        return result.scalar_one()
+
     async def get_threads_by_user_id(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all threads created by a user"""
         query = select(Thread).where(Thread.user_id == user_id)
@@ -0,0 +1,10 @@
+from .archive import Attachment, ChatArchive, is_zip
+from .parser import ParsedChat, parse_chat
+
+__all__ = [
+    "Attachment",
+    "ChatArchive",
+    "ParsedChat",
+    "is_zip",
+    "parse_chat"
+]
@@ -0,0 +1,94 @@
+import io
+import posixpath
+import re
+import zipfile
+from typing import BinaryIO, Dict, List, NamedTuple, Optional
+
+from .parser import _LINE_PREFIX, _lines, _timestamp
+
+# Name of the chat text in exports from iOS ("_chat.txt") and Android ("WhatsApp Chat with <name>.txt")
+_CHAT_MEMBER = re.compile(r"_chat\.txt|WhatsApp Chat.*\.txt", re.IGNORECASE)
+
+# Media references in message text: "<attached: 00000012-PHOTO-….jpg>" on iOS, "IMG-….jpg (file attached)" on Android
+_ATTACHED = re.compile(r"<attached: ([^>]+)>|(\S+) \(file attached\)")
+
+
+class Attachment(NamedTuple):
+    """A media file of an export, with the chat entry (``ParsedChat`` index) that sent it if known"""
+    filename: str
+    size: int
+    entry: Optional[int]
+
+
+def is_zip(f: BinaryIO) -> bool:
+    """Whether a seekable file is a zip archive, leaving its position unchanged"""
+    position = f.tell()
+    try:
+        return zipfile.is_zipfile(f)
+    finally:
+        f.seek(position)
+
+
+class ChatArchive:
+    """A WhatsApp "export with media" zip, read from its central directory
+
+    Only the chat text member is ever decompressed; media members are only
+    listed, by name and size.
+    """
+
+    def __init__(self, f: BinaryIO):
+        try:
+            self.zip = zipfile.ZipFile(f)
+        except zipfile.BadZipFile:
+            raise ValueError("Invalid zip archive")
+        members = [
+            info for info in self.zip.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+        texts = [info for info in members if info.filename.lower().endswith(".txt")]
+        chats = [info for info in texts if _CHAT_MEMBER.fullmatch(posixpath.basename(info.filename))]
+        if len(chats) != 1:
+            chats = texts if len(texts) == 1 else []
+        if not chats:
+            raise ValueError("The archive does not contain exactly one WhatsApp chat text file")
+        self.chat = chats[0]
+        self.media = [info for info in members if info is not self.chat]
+
+    def open_chat(self) -> BinaryIO:
+        """Decompressing reader of the chat text (blocking)"""
+        return self.zip.open(self.chat)
+
+    def chat_filename(self, archive_name: Optional[str]) -> str:
+        """File name to store the chat text under: the archive's name with a ``.txt`` extension"""
+        stem = posixpath.splitext(posixpath.basename((archive_name or "").replace("\\", "/")))[0]
+        return f"{stem or posixpath.splitext(posixpath.basename(self.chat.filename))[0]}.txt"
+
+    def attachments(self) -> List[Attachment]:
+        """Media members with the entry of the message referencing each one, in archive order (blocking)"""
+        with io.TextIOWrapper(self.open_chat(), encoding="utf-8") as text:
+            entries = attachment_entries(text)
+        return [
+            Attachment(posixpath.basename(info.filename), info.file_size,
+                       entries.get(posixpath.basename(info.filename)))
+            for info in self.media
+        ]
+
+
+def attachment_entries(text: io.TextIOBase) -> Dict[str, int]:
+    """Entry index of the message referencing every attached file name in a chat text
+
+    Entries are counted exactly as ``parse_chat`` does; a reference on a
+    continuation line belongs to the entry it continues.
+    """
+    entries: Dict[str, int] = {}
+    entry = -1
+    for line in _lines(text):
+        match = _LINE_PREFIX.match(line)
+        if match is not None and _timestamp(match) is not None:
+            entry += 1
+        if entry < 0 or "attached" not in line:
+            continue
+        for reference in _ATTACHED.finditer(line):
+            entries.setdefault((reference.group(1) or reference.group(2)).strip(), entry)
+    return entries
+
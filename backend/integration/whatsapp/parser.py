@@ -0,0 +1,129 @@
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO, Union
+
+import numpy as np
+
+# "[31.12.2024, 23:59:59] " prefix of every dated line of a WhatsApp export
+_LINE_PREFIX = re.compile(r"\[(\d{1,2})\.(\d{1,2})\.(\d{4}), (\d{1,2}):(\d{1,2}):(\d{1,2})\] ")
+
+# Unicode isolates WhatsApp puts around mentioned names
+_ISOLATES = str.maketrans("", "", "\u2068\u2069")
+
+# Characters that end a line for ``str.splitlines``, and the block size read from text streams
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_READ_SIZE = 1 << 20
+
+
+class ParsedChat(NamedTuple):
+    """Every dated line of a chat export as parallel arrays, in file order
+
+    Lines without a ``sender: text`` part (system notices) are kept with
+    ``is_message`` unset because they still count towards message limits.
+    Senders are interned: ``sender_codes`` index into ``senders`` (-1 for
+    non-messages). Mentions are stored CSR-style, the sender codes mentioned
+    by entry ``i`` are ``mention_codes[mention_indptr[i]:mention_indptr[i + 1]]``.
+    """
+    timestamps: np.ndarray
+    is_message: np.ndarray
+    sender_codes: np.ndarray
+    senders: List[str]
+    contents: List[str]
+    lengths: np.ndarray
+    mention_indptr: np.ndarray
+    mention_codes: np.ndarray
+
+    @property
+    def entry_count(self) -> int:
+        return len(self.timestamps)
+
+
+def _mention_pattern(senders: List[str]):
+    """Regex matching ``@name`` (or ``@digits`` for phone number senders) and a lookup back to sender codes"""
+    lookup: Dict[str, int] = {}
+    for code, sender in enumerate(senders):
+        name = sender.replace("\u202c", "").strip()
+        if name:
+            lookup.setdefault(name.lower(), code)
+        digits = re.sub(r"\D", "", name)
+        if digits and re.fullmatch(r"[\d\s+()\-]+", name):
+            lookup.setdefault(digits, code)
+    if not lookup:
+        return None, lookup
+    alternatives = "|".join(re.escape(name) for name in sorted(lookup, key=len, reverse=True))
+    return re.compile(rf"@\+?({alternatives})(?!\w)", re.IGNORECASE), lookup
+
+
+def _lines(content: Union[str, TextIO]) -> Iterator[str]:
+    """Lines of a text, or of a text stream read in large blocks, split exactly like ``str.splitlines``"""
+    if isinstance(content, str):
+        yield from content.splitlines()
+        return
+    pending = ""
+    while block := content.read(_READ_SIZE):
+        lines = (pending + block).splitlines(keepends=True)
+        # The last line may continue in the next block
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(_LINE_BREAKS)
+    yield from pending.splitlines()
+
+
+def _timestamp(match: re.Match) -> Optional[datetime]:
+    """Time of a dated line prefix, ``None`` for impossible dates (such lines are skipped)"""
+    day, month, year, hour, minute, second = map(int, match.groups())
+    try:
+        return datetime(year, month, day, hour, minute, second)
+    except ValueError:
+        return None
+
+
+def parse_chat(content: Union[str, TextIO]) -> ParsedChat:
+    """Parse a WhatsApp text export (text or text stream) in a single pass over its lines"""
+    timestamps: List[datetime] = []
+    is_message: List[bool] = []
+    sender_codes: List[int] = []
+    contents: List[str] = []
+    codes: Dict[str, int] = {}
+
+    for line in _lines(content):
+        match = _LINE_PREFIX.match(line)
+        timestamp = _timestamp(match) if match is not None else None
+        if timestamp is None:
+            continue
+        timestamps.append(timestamp)
+
+        sender = ""
+        if ": " in line:
+            parts = line[match.end():].split(":", 1)
+            sender = parts[0].strip("~").replace("\u202a", "").strip()
+        if sender:
+            is_message.append(True)
+            sender_codes.append(codes.setdefault(sender, len(codes)))
+            contents.append(parts[1].strip() if len(parts) > 1 else "")
+        else:
+            is_message.append(False)
+            sender_codes.append(-1)
+            contents.append("")
+
+    senders = list(codes)
+    pattern, lookup = _mention_pattern(senders)
+    mention_indptr = np.zeros(len(contents) + 1, dtype=np.int64)
+    mention_codes: List[int] = []
+    for i, text in enumerate(contents):
+        if pattern is not None and "@" in text:
+            mention_codes.extend(
+                lookup[mention.lower()] for mention in pattern.findall(text.translate(_ISOLATES))
+            )
+        mention_indptr[i + 1] = len(mention_codes)
+
+    return ParsedChat(
+        timestamps=np.array(timestamps, dtype="datetime64[s]"),
+        is_message=np.array(is_message, dtype=bool),
+        sender_codes=np.array(sender_codes, dtype=np.int64),
+        senders=senders,
+        contents=contents,
+        lengths=np.fromiter((len(text) for text in contents), dtype=np.int64, count=len(contents)),
+        mention_indptr=mention_indptr,
+        mention_codes=np.array(mention_codes, dtype=np.int64)
+    )
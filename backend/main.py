@@ -1,13 +1,16 @@
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import os
 import asyncio
 import typer
 
 from api.routes import auth, users, files, research, network, wikipedia
 from api.routes.integrations import wikipedia_network
+from api.dependencies import get_ingest_service, get_research_precompute_service
 from api.error_handlers import register_exception_handlers
 from infrastructure.persistence.database import Base, engine
+from infrastructure.persistence.repositories.file_repository import LocalFileRepository
 from config.settings import settings
 
 cli = typer.Typer()
@@ -15,11 +18,22 @@ cli = typer.Typer()
 # Create upload directory if it doesn't exist
 os.makedirs(settings.UPLOAD_FOLDER, exist_ok=True)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Resume the background ingest left unfinished by the last run, and stop background work on shutdown"""
+    await get_ingest_service().resume()
+    yield
+    await get_ingest_service().stop()
+    await get_research_precompute_service().stop()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -62,6 +76,13 @@ def create_tables():
     typer.echo("Tables created successfully!")
 
 
+@cli.command()
+def migrate_uploads():
+    """Move uploads stored before file names were per user to their uploader."""
+    moved = LocalFileRepository().move_shared_files()
+    typer.echo(f"Moved {moved} uploads to their uploaders")
+
+
 @cli.command()
 def run_server(host: str = "127.0.0.1", port: int = 8000):
     """Run the API server."""
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The backend imports its packages from its own folder, as it does when it runs
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,248 @@
+"""The message filter of network analyses, on database rows and on parsed arrays
+
+Contents loaded into the database are filtered by ``ChatMessageRepository.select``,
+every other content on the parsed arrays. ``InMemoryChatMessages`` restates
+the SQL semantics of ``select`` on the parsed arrays, so the parametrized
+cases check that the analysis builds the same graph from either path for
+every combination of filters; they run no SQL. The statement
+``SQLAlchemyChatMessageRepository.select`` builds is checked clause by
+clause, and it is only run when ``TEST_DATABASE_URL`` names a PostgreSQL
+database.
+"""
+import asyncio
+import io
+import itertools
+import os
+import random
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from application.dtos.network_dto import NetworkAnalysisRequestDTO, NetworkGraphDTO
+from application.services.network_service import NetworkService
+from domain.repositories.chat_message_repository import ChatMessageFilter, ChatMessageRepository
+from infrastructure.cache.analysis_cache import AnalysisCache
+from infrastructure.persistence.repositories.chat_message_repository import SQLAlchemyChatMessageRepository
+from integration.whatsapp import parse_chat
+
+SOURCE = "0" * 64
+
+
+def _chat_text(entries: int = 1500) -> str:
+    """A chat export with system notices, mentions and varied message lengths"""
+    rng = random.Random(7)
+    users = [f"User{i}" for i in range(12)]
+    words = ["hello", "the", "data", "ok", "graph", "theory", "news", "@User3", "great", "yes"]
+    time = datetime(2024, 1, 1)
+    lines = []
+    for _ in range(entries):
+        time += timedelta(seconds=rng.randint(5, 3000))
+        stamp = time.strftime("%d.%m.%Y, %H:%M:%S")
+        if rng.random() < 0.05:
+            lines.append(f"[{stamp}] {rng.choice(users)} joined using this group's invite link")
+        else:
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 15)))
+            lines.append(f"[{stamp}] {rng.choice(users[:rng.randint(2, len(users))])}: {text}")
+    return "\n".join(lines)
+
+
+CHAT_TEXT = _chat_text()
+CHAT = parse_chat(CHAT_TEXT)
+
+CASES = [
+    NetworkAnalysisRequestDTO(
+        limit=limit, limit_type=limit_type, start_date=start_date, end_date=end_date,
+        min_length=min_length, max_length=max_length, username=username, keywords=keywords,
+        edge_model=edge_model, reply_window=3 if edge_model == "window" else None
+    )
+    for (limit, limit_type), (start_date, end_date), (min_length, max_length), username, keywords, edge_model
+    in itertools.product(
+        [(None, "first"), (700, "first"), (900, "last")],
+        [(None, None), ("2024-01-05", "2024-01-15")],
+        [(None, None), (20, None), (None, 60)],
+        [None, "user4"],
+        [None, "the,a"],
+        ["previous", "window", "mention"]
+    )
+]
+
+
+class InMemoryChatMessages(ChatMessageRepository):
+    """The SQL semantics of ``select`` on the parsed arrays of one chat"""
+
+    async def get_senders(self, source: str) -> Optional[List[str]]:
+        return list(CHAT.senders)
+
+    async def load(self, source, senders, rows) -> int:
+        raise NotImplementedError
+
+    async def select(self, source: str, message_filter: ChatMessageFilter) -> Tuple[np.ndarray, np.ndarray]:
+        in_range = np.ones(CHAT.entry_count, dtype=bool)
+        if message_filter.start:
+            in_range &= CHAT.timestamps >= np.datetime64(message_filter.start, "s")
+        if message_filter.end:
+            in_range &= CHAT.timestamps <= np.datetime64(message_filter.end, "s")
+        entries = np.flatnonzero(in_range)
+        if message_filter.limit and message_filter.limit_type == "first":
+            entries = entries[:message_filter.limit]
+        elif message_filter.limit and message_filter.limit_type == "last":
+            entries = entries[-message_filter.limit:]
+        entries = [
+            entry for entry in entries
+            if CHAT.is_message[entry]
+            and (not message_filter.min_length or CHAT.lengths[entry] >= message_filter.min_length)
+            and (not message_filter.max_length or CHAT.lengths[entry] <= message_filter.max_length)
+            and (message_filter.sender_ids is None or CHAT.sender_codes[entry] in message_filter.sender_ids)
+            and (not message_filter.keywords
+                 or any(keyword in CHAT.contents[entry].lower() for keyword in message_filter.keywords))
+        ]
+        entries = np.array(entries, dtype=np.int64)
+        return CHAT.sender_codes[entries].astype(np.int64), CHAT.timestamps[entries].astype(np.int64)
+
+    async def delete(self, source: str) -> bool:
+        raise NotImplementedError
+
+
+class ChatFile:
+    """File storage holding the chat under any name, with the content hash of a loaded content"""
+
+    async def get_content_hash(self, filename: str) -> Optional[str]:
+        return SOURCE
+
+    def open(self, filename: str) -> io.BufferedReader:
+        return io.BufferedReader(io.BytesIO(CHAT_TEXT.encode("utf-8")))
+
+
+def _graph(analyze) -> object:
+    """Nodes and links of a graph, or the error analyzing it raised"""
+    try:
+        graph: NetworkGraphDTO = analyze()
+    except ValueError as e:
+        return str(e)
+    return [asdict(node) for node in graph.nodes], [asdict(link) for link in graph.links]
+
+
+def _analyze(messages: ChatMessageRepository, params: NetworkAnalysisRequestDTO) -> object:
+    network_service = NetworkService(ChatFile(), AnalysisCache(4), AnalysisCache(4), messages=messages)
+    return _graph(lambda: asyncio.run(network_service._analyze("chat.txt", params)))
+
+
+def _analyze_chat(params: NetworkAnalysisRequestDTO) -> object:
+    network_service = NetworkService(ChatFile(), AnalysisCache(4), AnalysisCache(4))
+    return _graph(lambda: network_service._analyze_chat(CHAT, params))
+
+
+def test_cases_cover_every_filter_combination():
+    assert len(CASES) == 216
+
+
+@pytest.mark.parametrize("params", CASES)
+def test_database_filter_matches_in_memory_filter(params: NetworkAnalysisRequestDTO):
+    assert _analyze(InMemoryChatMessages(), params) == _analyze_chat(params)
+
+
+class StatementSession:
+    """Session keeping the statement streamed to it, with no rows"""
+
+    async def stream(self, statement):
+        self.statement = statement
+        return self
+
+    async def partitions(self):
+        return
+        yield
+
+
+def _select_conditions(message_filter: ChatMessageFilter) -> Tuple[List[str], object]:
+    """The WHERE conditions of the statement ``select`` builds, and its limit subquery (``None`` without one)
+
+    Conditions are rendered one by one: compiling the whole statement needs
+    every ORM mapper configured, which takes the full model registry.
+    """
+    session = StatementSession()
+    asyncio.run(SQLAlchemyChatMessageRepository(session).select(SOURCE, message_filter))
+    assert [str(column) for column in session.statement._order_by_clauses] == ["chat_messages.entry"]
+    conditions, subquery = [], None
+    for condition in session.statement.whereclause.clauses:
+        if hasattr(condition, "right") and hasattr(condition.right, "element"):
+            assert str(condition.left) == "chat_messages.entry" and subquery is None
+            subquery = condition.right.element
+            conditions.append("entry IN (subquery)")
+        else:
+            conditions.append(str(condition))
+    return conditions, subquery
+
+
+DATE_RANGE = ["chat_messages.source = :source_1", "chat_messages.timestamp >= :timestamp_1",
+              "chat_messages.timestamp <= :timestamp_1"]
+
+
+@pytest.mark.parametrize("limit_type, order", [("first", "chat_messages.entry ASC"),
+                                               ("last", "chat_messages.entry DESC")])
+def test_select_limits_the_date_range_before_the_message_filters(limit_type: str, order: str):
+    conditions, subquery = _select_conditions(ChatMessageFilter(
+        start=datetime(2024, 1, 5), end=datetime(2024, 1, 15), limit=900, limit_type=limit_type,
+        min_length=20, max_length=60, sender_ids=[4], keywords=["the", "a"]
+    ))
+
+    # The limit counts every entry in the date range, system entries and filtered-out messages included
+    assert [str(column) for column in subquery.selected_columns] == ["chat_messages.entry"]
+    assert [str(condition) for condition in subquery.whereclause.clauses] == DATE_RANGE
+    assert [str(column) for column in subquery._order_by_clauses] == [order]
+    assert subquery._limit == 900
+    assert conditions == DATE_RANGE + [
+        "entry IN (subquery)",
+        "chat_messages.is_message",
+        "chat_messages.length >= :length_1",
+        "chat_messages.length <= :length_1",
+        "chat_messages.sender_id IN (__[POSTCOMPILE_sender_id_1])",
+        "(strpos(lower(chat_messages.content), :strpos_1) > :strpos_2"
+        " OR strpos(lower(chat_messages.content), :strpos_3) > :strpos_4)"
+    ]
+
+
+def test_select_without_filters_keeps_every_message_of_the_source():
+    conditions, subquery = _select_conditions(ChatMessageFilter())
+
+    assert subquery is None
+    assert conditions == ["chat_messages.source = :source_1", "chat_messages.is_message"]
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs a PostgreSQL database in TEST_DATABASE_URL")
+def test_sql_filter_matches_in_memory_filter():
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from application.services.ingest_service import IngestService
+    from infrastructure.persistence.models.chat_message import ChatMessageModel, ChatSourceModel
+
+    async def compare() -> List[NetworkAnalysisRequestDTO]:
+        engine = create_async_engine(os.environ["TEST_DATABASE_URL"])
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(
+                    ChatSourceModel.metadata.create_all,
+                    tables=[ChatSourceModel.__table__, ChatMessageModel.__table__]
+                )
+            async with AsyncSession(engine) as session:
+                messages = SQLAlchemyChatMessageRepository(session)
+                await messages.load(SOURCE, list(CHAT.senders), IngestService.message_rows(CHAT))
+                network_service = NetworkService(ChatFile(), AnalysisCache(4), AnalysisCache(4), messages=messages)
+                mismatches = []
+                for params in CASES:
+                    try:
+                        graph = await network_service._analyze("chat.txt", params)
+                        analyzed = [asdict(node) for node in graph.nodes], [asdict(link) for link in graph.links]
+                    except ValueError as e:
+                        analyzed = str(e)
+                    if analyzed != _analyze_chat(params):
+                        mismatches.append(params)
+                # Nothing loaded by the test is kept
+                await session.rollback()
+                return mismatches
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(compare()) == []
@@ -0,0 +1,34 @@
+"""Coarsened views of directed graphs"""
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.coarsening import level_of_detail
+from application.dtos.network_dto import LinkDTO, NetworkGraphDTO, NodeDTO
+
+
+def _directed_star() -> GraphAnalysis:
+    """A hub sending to and receiving from leaves, plus one leaf pair in each direction"""
+    links = [("hub", "a", 3), ("b", "hub", 2), ("hub", "c", 1), ("d", "hub", 1), ("e", "f", 2), ("f", "e", 1)]
+    return GraphAnalysis(NetworkGraphDTO(
+        nodes=[NodeDTO(id=node_id, messages=1) for node_id in ("hub", "a", "b", "c", "d", "e", "f")],
+        links=[LinkDTO(source=source, target=target, weight=weight) for source, target, weight in links],
+        directed=True
+    ))
+
+
+def test_coarse_graph_of_directed_analysis_is_directed():
+    coarse = level_of_detail(_directed_star(), 4).coarse.graph
+
+    assert coarse.directed
+    assert len(coarse.nodes) <= 4
+
+
+def test_coarse_links_keep_their_direction():
+    analysis = _directed_star()
+    lod = level_of_detail(analysis, 6)
+    visible = dict(zip(analysis.adjacency.node_ids, lod.visible_ids))
+    expected = {}
+    for link in analysis.graph.links:
+        source, target = visible[link.source], visible[link.target]
+        if source != target:
+            expected[(source, target)] = expected.get((source, target), 0) + link.weight
+
+    assert {(link.source, link.target): link.weight for link in lod.coarse.graph.links} == expected
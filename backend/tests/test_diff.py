@@ -0,0 +1,33 @@
+"""Links compared by ``diff_analyses``"""
+from application.analytics.analysis import GraphAnalysis
+from application.analytics.diff import diff_analyses
+from application.dtos.network_dto import LinkDTO, NetworkGraphDTO, NodeDTO
+
+
+def _analysis(links, directed: bool) -> GraphAnalysis:
+    return GraphAnalysis(NetworkGraphDTO(
+        nodes=[NodeDTO(id="A"), NodeDTO(id="B")],
+        links=[LinkDTO(source=source, target=target, weight=weight) for source, target, weight in links],
+        directed=directed
+    ))
+
+
+def test_reversed_directed_link_is_removed_and_added():
+    diff = diff_analyses(_analysis([("A", "B", 2)], True), _analysis([("B", "A", 2)], True))
+
+    assert [(link.source, link.target, link.weight) for link in diff.removed_links] == [("A", "B", 2)]
+    assert [(link.source, link.target, link.weight) for link in diff.added_links] == [("B", "A", 2)]
+    assert diff.weight_changes == []
+
+
+def test_directed_links_keep_their_weights_apart():
+    diff = diff_analyses(_analysis([("A", "B", 2), ("B", "A", 1)], True), _analysis([("A", "B", 2)], True))
+
+    assert [(link.source, link.target, link.weight) for link in diff.removed_links] == [("B", "A", 1)]
+    assert diff.added_links == [] and diff.weight_changes == []
+
+
+def test_reversed_undirected_link_is_unchanged():
+    diff = diff_analyses(_analysis([("A", "B", 2)], False), _analysis([("B", "A", 2)], False))
+
+    assert diff.added_links == [] and diff.removed_links == [] and diff.weight_changes == []
@@ -59,16 +59,24 @@ class ApiService {
   }
 
   async listFiles(token: string): Promise<string[]> {
-    const response = await fetch(`${API_URL}/files`, {
-      headers: this.getHeaders(token)
-    });
+    const filenames: string[] = [];
+    // The file list is paged, follow the pages until every file is listed
+    while (true) {
+      const response = await fetch(`${API_URL}/files?offset=${filenames.length}`, {
+        headers: this.getHeaders(token)
+      });
 
-    if (!response.ok) {
-      const error = await response.json() as ApiError;
-      throw new Error(error.detail || 'Failed to list files');
-    }
+      if (!response.ok) {
+        const error = await response.json() as ApiError;
+        throw new Error(error.detail || 'Failed to list files');
+      }
 
-    return await response.json();
+      const page = await response.json() as { items: { filename: string }[], total: number };
+      filenames.push(...page.items.map(file => file.filename));
+      if (page.items.length === 0 || filenames.length >= page.total) {
+        return filenames;
+      }
+    }
   }
 
   async deleteFile(filename: string, token: string): Promise<void> {